@@ -0,0 +1,58 @@
+"""
+Synthetic notebooks for the benchmarks.
+
+The same count and seed always give the same notes. Note lengths follow a long-tailed
+distribution (most captures are a sentence or a paragraph, a few are whole merged documents),
+sources are Zipf-distributed (a handful of documents account for most captures) and a small
+share of notes are image notes.
+"""
+import random
+from datetime import datetime, timedelta
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "an", "el", "in", "or", "us",
+             "ber", "dan", "gor", "hil", "jas", "kem", "lin", "mar", "nor", "pel", "ros", "tan"]
+SOURCE_TEMPLATES = ["{} - Google Chrome", "{}.pdf - Adobe Acrobat Reader", "{} - Mozilla Firefox",
+                    "{}.docx - Word", "{} - Visual Studio Code", "{}.epub - Calibre"]
+
+def make_vocabulary(rng, size=5000):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+def make_sources(rng, vocabulary, count):
+    sources = []
+    for i in range(count):
+        title = " ".join(rng.choice(vocabulary).capitalize() for _ in range(rng.randint(2, 6)))
+        sources.append(rng.choice(SOURCE_TEMPLATES).format(f"{title} {i}"))
+    return sources
+
+def text_length(rng, large_ratio):
+    """Number of words in a note: log-normal (median about 27 words), plus rare huge merged notes."""
+    if rng.random() < large_ratio:
+        return rng.randint(3000, 20000)
+    return min(2000, int(rng.lognormvariate(3.3, 1.0)) + 1)
+
+def generate_notes(count, seed=0, image_ratio=0.02, large_ratio=0.001, years=3):
+    """Returns count note dicts in capture order, spread evenly over the given number of years."""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    sources = make_sources(rng, vocabulary, max(20, count // 200))
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(sources))]
+    start = datetime(2022, 1, 1)
+    step = years * 365 * 86400 / count
+    notes = []
+    for i, source in enumerate(rng.choices(sources, weights, k=count)):
+        # Her notun zaman damgası benzersizdir (not kimliği); mikrosaniye kısmı sıra numarasıdır
+        timestamp = (start + timedelta(seconds=int(i * step), microseconds=i % 1000000)).isoformat()
+        if rng.random() < image_ratio:
+            notes.append({"timestamp": timestamp, "source": source, "type": "image",
+                          "image_path": f"_assets/img_bench_{i}.png", "text": ""})
+            continue
+        words = rng.choices(vocabulary, k=text_length(rng, large_ratio))
+        notes.append({"timestamp": timestamp, "source": source, "text": " ".join(words)})
+    return notes
+
+def vocabulary_for(seed=0):
+    """The vocabulary generate_notes draws words from for this seed, for picking search terms."""
+    return make_vocabulary(random.Random(seed))
@@ -0,0 +1,172 @@
+"""
+Drives Note Harvester's capture pipeline with simulated hotkey presses, fake window titles and an
+in-memory clipboard, and reports how many captures per second it sustains as the notebook grows.
+
+    python benchmarks/load_test.py                              # 1k, 10k and 100k-note notebooks
+    python benchmarks/load_test.py --rate 50 --duration 20      # 50 hotkey presses per second
+    python benchmarks/load_test.py --rate 0 --captures 2000     # back to back, as fast as possible
+
+Like the app, the simulated hotkey listener is paused while a capture runs, so presses that arrive
+meanwhile are dropped. Presses that arrive between captures wait in the task queue, and that wait
+is part of the reported latency. The list refresh and the real clipboard, keyboard and window calls
+are not included. Runs headless on note_harvester_core, on a temporary data folder.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from corpus import generate_notes, vocabulary_for
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import note_harvester_core as nh # noqa: E402
+
+NOTEBOOK = "load"
+
+class FakeDesktop:
+    """Stands in for the active window and the selection: each copy shortcut puts a new selection on the clipboard."""
+    def __init__(self, clipboard, seed, sources):
+        self.clipboard = clipboard
+        self.vocabulary = vocabulary_for(seed)
+        self.sources = sources
+        self.copies = 0
+
+    def window_title(self):
+        return self.sources[self.copies % len(self.sources)]
+
+    def send_copy(self):
+        self.copies += 1
+        start = (self.copies * 7) % len(self.vocabulary)
+        self.clipboard.text = " ".join(self.vocabulary[start:start + 12 + self.copies % 40])
+
+class SimulatedHotkey:
+    """
+    Presses the hotkey at a fixed rate from a background thread, the way HotkeyService puts
+    ("CAPTURE_NOTE", perf_counter) tasks on the app's queue; presses made while paused are dropped.
+    """
+    def __init__(self, task_queue, rate, presses):
+        self.task_queue = task_queue
+        self.rate = rate
+        self.presses = presses
+        self.paused = threading.Event()
+        self.pressed = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        next_press = time.perf_counter()
+        for _ in range(self.presses):
+            delay = next_press - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_press += 1 / self.rate
+            self.pressed += 1
+            if self.paused.is_set():
+                self.dropped += 1
+            else:
+                self.task_queue.put(("CAPTURE_NOTE", time.perf_counter()))
+        self.task_queue.put(None)
+
+def run_load(nm, pipeline, args):
+    """Runs one load test on the prepared notebook; returns its result fields."""
+    recorder = nh.LatencyRecorder("capture")
+    recorder.WINDOW = 10 ** 9 # Tüm örnekler saklanır; yüzdelikler tüm koşunun üzerinden hesaplanır
+    outcomes = {}
+    task_queue = queue.Queue()
+    if args.rate > 0:
+        hotkey = SimulatedHotkey(task_queue, args.rate, int(args.rate * args.duration))
+        hotkey.thread.start()
+    else:
+        hotkey = None
+        for _ in range(args.captures):
+            task_queue.put(("CAPTURE_NOTE", None)) # Ardışık yakalamalar: kuyrukta bekleme yok
+        task_queue.put(None)
+
+    start = time.perf_counter()
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        # Uygulamadaki gibi: yakalama sürerken kısayol dinleyicisi durdurulur
+        if hotkey: hotkey.paused.set()
+        trace = recorder.start(task[1])
+        outcome = "error"
+        try:
+            outcome, _ = pipeline.capture(NOTEBOOK, trace)
+        except Exception as e:
+            logging.error(f"Capture failed: {e}", exc_info=True)
+        finally:
+            if hotkey: hotkey.paused.clear()
+            trace.finish(outcome=outcome)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    elapsed = time.perf_counter() - start
+
+    completed = sum(outcomes.values())
+    stages = {stage: {"count": count, "p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "p99_ms": p99 * 1000, "max_ms": worst * 1000}
+              for stage, count, p50, p95, p99, worst in recorder.summary()}
+    return {
+        "pressed": hotkey.pressed if hotkey else args.captures,
+        "completed": completed,
+        "dropped": hotkey.dropped if hotkey else 0,
+        "failed": completed - outcomes.get("text", 0),
+        "seconds": elapsed,
+        "captures_per_second": outcomes.get("text", 0) / elapsed if elapsed else None,
+        "final_notes": len(nm.load_notes(NOTEBOOK)),
+        "stages": stages,
+    }
+
+def run(args):
+    results = []
+    for size in args.sizes:
+        notes = generate_notes(size, seed=args.seed)
+        sources = sorted({n["source"] for n in notes[:1000]})
+        for layout in args.layouts:
+            data_folder = tempfile.mkdtemp(prefix="nh-load-")
+            try:
+                nm = nh.NoteManager(data_folder=data_folder, segment_new_notebooks=(layout == "segmented"))
+                nm.create_notebook(NOTEBOOK)
+                nm.save_notes(NOTEBOOK, notes)
+                nm.load_notes(NOTEBOOK) # Uygulamada etkin defter zaten yüklüdür
+                clipboard = nh.FakeClipboard("original clipboard text")
+                desktop = FakeDesktop(clipboard, args.seed, sources)
+                pipeline = nh.CapturePipeline(nm, clipboard, desktop.window_title, desktop.send_copy, copy_wait=args.copy_wait)
+                result = run_load(nm, pipeline, args)
+                result.update(size=size, layout=layout, rate=args.rate, copy_wait=args.copy_wait)
+                results.append(result)
+                total, persist = result["stages"].get("total", {}), result["stages"].get("persist", {})
+                print(f"  {layout:<10} {size:>8} notes  {result['captures_per_second']:8.1f} captures/s  "
+                      f"total p50 {total.get('p50_ms', 0):7.2f} p95 {total.get('p95_ms', 0):7.2f} p99 {total.get('p99_ms', 0):7.2f} ms  "
+                      f"persist p95 {persist.get('p95_ms', 0):7.2f} ms  dropped {result['dropped']}/{result['pressed']}  failed {result['failed']}")
+            finally:
+                shutil.rmtree(data_folder, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test Note Harvester's capture pipeline with simulated hotkey presses.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Notebook sizes in notes before the test.")
+    parser.add_argument("--layouts", nargs="+", default=["single", "segmented"], choices=["single", "segmented"])
+    parser.add_argument("--rate", type=float, default=20, help="Hotkey presses per second; 0 captures back to back.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of hotkey presses when --rate is set.")
+    parser.add_argument("--captures", type=int, default=1000, help="Number of captures when --rate is 0.")
+    parser.add_argument("--copy-wait", type=float, default=0.0,
+                        help=f"Seconds to wait for the clipboard after the copy shortcut (the app waits {nh.CapturePipeline.COPY_WAIT}).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_test_results.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    results = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"date": datetime.now().isoformat(timespec="seconds"), "seed": args.seed, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
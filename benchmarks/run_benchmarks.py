@@ -0,0 +1,223 @@
+"""
+Times Note Harvester's data paths on synthetic notebooks and writes the results to a JSON file.
+
+    python benchmarks/run_benchmarks.py                          # 10k and 100k notes
+    python benchmarks/run_benchmarks.py --sizes 1000000 --layouts single segmented archive
+    python benchmarks/run_benchmarks.py --compare old.json       # print the change against an earlier run
+
+Runs headless on note_harvester_core (no tkinter needed), on a temporary data folder. Every case reports its best wall time over --repeat runs and the peak
+memory allocated by one extra run under tracemalloc.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+
+from corpus import generate_notes, vocabulary_for
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import note_harvester_core as nh # noqa: E402
+
+NOTEBOOK = "bench"
+MUTATED_NOTES = 1000 # Silme, birleştirme ve kaynak değiştirme vakalarında dokunulan not sayısı
+
+def measure(fn, repeat, setup=None, trace_memory=True):
+    """Returns (best seconds over repeat runs, peak traced bytes of one more run or None). setup runs untimed before each run."""
+    best = None
+    for _ in range(repeat):
+        if setup: setup()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if trace_memory:
+        if setup: setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_cases(nm, notes, seed):
+    """Returns [(case name, fn, repeat, setup)] for one notebook; cases run in this order."""
+    vocabulary = [w for w in vocabulary_for(seed) if len(w) >= 6]
+    word, other = vocabulary[len(vocabulary) // 3], vocabulary[2 * len(vocabulary) // 3]
+    typo = word[1] + word[0] + word[2:] # İlk iki harfin yeri değişmiş: tek düzenleme
+    top_source = Counter(n["source"] for n in notes).most_common(1)[0][0]
+    last = datetime.fromisoformat(notes[-1]["timestamp"]).date()
+    last_month = (last - timedelta(days=30), last)
+    step = max(1, len(notes) // MUTATED_NOTES)
+    sample = [n["timestamp"] for n in notes[::step]][:MUTATED_NOTES]
+    probe = next(n for n in notes[len(notes) // 2:] if n.get("text")) # Benzer notları aranan not
+    added = iter(range(10 ** 9))
+
+    def restore():
+        # Değiştiren vakalardan önce defter başlangıç haline getirilir (süreye dahil değil)
+        if not nm.notebook_exists(NOTEBOOK):
+            nm.create_notebook(NOTEBOOK)
+        nm.save_notes(NOTEBOOK, notes)
+
+    def cold():
+        nm.drop_caches()
+
+    def warm_indexes():
+        for index_class in (nh.SearchIndex, nh.TrigramIndex, nh.TimelineIndex):
+            nm.get_search_index(NOTEBOOK, index_class)
+
+    def add_annotation():
+        i = next(added)
+        nm.add_annotation(NOTEBOOK, {"timestamp": f"2030-01-01T00:00:00.{i:06d}", "source": top_source, "text": f"{word} {other}"})
+
+    def merge(timestamps):
+        with nm.transaction(NOTEBOOK, label="Merge Notes") as tx:
+            merged = [n for n in tx.notes() if n.get("timestamp") in timestamps]
+            for note in merged:
+                tx.delete(note.get("timestamp"))
+            tx.insert({"timestamp": "2031-01-01T00:00:00", "source": "Merged Note",
+                       "text": "\n\n---\n\n".join(n.get("text", "") for n in merged)})
+
+    def merge_by_source():
+        merge({n.get("timestamp") for n in nm.load_notes(NOTEBOOK) if n.get("source") == top_source})
+
+    def rename_source():
+        with nm.transaction(NOTEBOOK, label="Rename Source") as tx:
+            for timestamp in sample:
+                tx.update(timestamp, source="Renamed Source")
+
+    def delete_notes():
+        with nm.transaction(NOTEBOOK, label="Delete Notes") as tx:
+            for timestamp in sample:
+                tx.delete(timestamp)
+
+    def rename_notebook():
+        nm.rename_notebook(NOTEBOOK, NOTEBOOK + " renamed")
+        nm.rename_notebook(NOTEBOOK + " renamed", NOTEBOOK)
+
+    def filter_case(**options):
+        return lambda: nm.filter_notes(NOTEBOOK, **options)
+
+    return [
+        ("save_notes", lambda: nm.save_notes(NOTEBOOK, notes), 3, None),
+        ("load_notes_cold", lambda: nm.load_notes(NOTEBOOK), 3, cold),
+        ("load_notes_warm", lambda: nm.load_notes(NOTEBOOK), 5, None),
+        ("add_annotation", add_annotation, 5, None),
+        ("build_search_index", lambda: nm.get_search_index(NOTEBOOK, nh.SearchIndex), 1, cold),
+        ("build_trigram_index", lambda: nm.get_search_index(NOTEBOOK, nh.TrigramIndex), 1, cold),
+        ("build_timeline_index", lambda: nm.get_search_index(NOTEBOOK, nh.TimelineIndex), 1, cold),
+        ("filter_none", filter_case(), 5, warm_indexes),
+        ("filter_text", filter_case(text=word), 5, None),
+        ("filter_text_whole_word", filter_case(text=word, whole_word=True), 5, None),
+        ("filter_source", filter_case(source=top_source), 5, None),
+        ("filter_date", filter_case(date_range=last_month), 5, None),
+        ("filter_regex", filter_case(text=f"{word}\\s+\\w+", use_regex=True, regex_time_budget=60), 5, None),
+        ("filter_fuzzy", filter_case(text=typo, fuzzy=True), 5, None),
+        ("filter_ranked", filter_case(text=f"{word} {other}", ranked=True), 5, None),
+        ("related_notes", lambda: nm.related_notes(NOTEBOOK, probe), 5, lambda: nm.get_search_index(NOTEBOOK)),
+        ("get_sources", lambda: nm.get_sources(NOTEBOOK), 5, None),
+        ("generate_markdown", lambda: nh.generate_markdown(nm.load_notes(NOTEBOOK), NOTEBOOK), 3, None),
+        ("merge_selected", lambda: merge(set(sample[:50])), 1, restore),
+        ("merge_by_source", merge_by_source, 1, restore),
+        ("rename_source", rename_source, 1, restore),
+        ("delete_notes", delete_notes, 1, restore),
+        ("undo_delete", lambda: nm.undo(NOTEBOOK), 1, lambda: (restore(), delete_notes())),
+        ("rename_notebook", rename_notebook, 3, None),
+        ("delete_notebook", lambda: nm.delete_notebook(NOTEBOOK), 1, restore),
+    ]
+
+def run(args):
+    results = []
+    for size in args.sizes:
+        start = time.perf_counter()
+        notes = generate_notes(size, seed=args.seed)
+        print(f"{size} notes generated in {time.perf_counter() - start:.1f} s")
+        for layout in args.layouts:
+            data_folder = tempfile.mkdtemp(prefix="nh-bench-")
+            try:
+                nm = nh.NoteManager(data_folder=data_folder, segment_new_notebooks=(layout == "segmented"))
+                nm.create_notebook(NOTEBOOK)
+                nm.save_notes(NOTEBOOK, notes)
+                if layout == "archive":
+                    nm.set_notebook_layout(NOTEBOOK, nm.LAYOUT_ARCHIVE)
+                for name, fn, repeat, setup in build_cases(nm, notes, args.seed):
+                    if args.cases and name not in args.cases:
+                        continue
+                    seconds, peak = measure(fn, min(repeat, args.repeat), setup, not args.no_memory)
+                    results.append({"case": name, "size": size, "layout": layout, "seconds": seconds,
+                                    "repeat": min(repeat, args.repeat), "peak_bytes": peak})
+                    memory = f"{peak / (1024 * 1024):9.1f} MB" if peak is not None else ""
+                    print(f"  {layout:<10} {name:<24} {seconds * 1000:10.1f} ms {memory}")
+            finally:
+                shutil.rmtree(data_folder, ignore_errors=True)
+    return results
+
+def max_rss_bytes():
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r["case"], r["size"], r["layout"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (ratio < 1 is faster):")
+    for r in results:
+        old = baseline.get((r["case"], r["size"], r["layout"]))
+        if old and old["seconds"]:
+            print(f"  {r['layout']:<10} {r['case']:<24} {r['size']:>8} {r['seconds'] / old['seconds']:6.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Note Harvester's data paths on synthetic notebooks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Notebook sizes in notes.")
+    parser.add_argument("--layouts", nargs="+", default=["single", "segmented"], choices=["single", "segmented", "archive"])
+    parser.add_argument("--cases", nargs="+", help="Run only these cases.")
+    parser.add_argument("--repeat", type=int, default=5, help="Upper bound on timed runs per case.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the extra tracemalloc run per case.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="An earlier results file to compare against.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    results = run(args)
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "max_rss_bytes": max_rss_bytes(),
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
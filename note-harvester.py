@@ -1,45 +1,145 @@
 
+import time
+_PROCESS_START = time.perf_counter() # --startup-trace için başlangıç noktası
 import os
-import json
 import threading
-import time
 from datetime import datetime, timedelta
-import pyperclip
-from pynput import keyboard
-import pygetwindow as gw
-from PIL import Image, ImageDraw, ImageTk
-from pystray import Icon as TrayIcon, Menu as TrayMenu, MenuItem as TrayMenuItem
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox, font
 import configparser
 import logging
+import multiprocessing
 import queue
-from tkcalendar import DateEntry
+from collections import OrderedDict
 import re
 import shutil
 import tempfile
 import subprocess
 import sys
-import time
-from datetime import datetime
-import pyperclip
-from pynput import keyboard
-import pygetwindow as gw
-from PIL import Image, ImageTk
-from pystray import Icon as TrayIcon, Menu as TrayMenu, MenuItem as TrayMenuItem
-# Dosyanın üst kısımlarına, importların yanına ekleyin
-try:
-    from PIL import Image, ImageDraw, ImageTk, ImageGrab
-except ImportError:
-    messagebox.showerror("Dependency Error", "Pillow library is not installed. Please install it using: pip install Pillow")
-    sys.exit(1)
-
-logging.basicConfig(
-    level=logging.ERROR,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='note_harvester_crash.log',
-    filemode='w'
-)
+import argparse
+import bisect
+import _tkinter
+from note_harvester_core import (NoteManager, NotebookArchive, NotebookWatcher, GlobalSearch,
+                                 SearchIndex, TrigramIndex, LatencyRecorder, ActionProfiler, CapturePipeline, PyperclipClipboard,
+                                 build_search_regex, generate_markdown, note_tags)
+# pyperclip, pynput, pygetwindow, Pillow, pystray ve tkcalendar ilk kullanıldıkları yerde
+# içe aktarılır; böylece pencere bu modüller yüklenmeden açılabilir.
+
+class StartupTrace:
+    """Records how long each startup phase takes and prints it when enabled."""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []
+        self._last = _PROCESS_START
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        if self.enabled:
+            print(f"[startup] {phase:<24} {(now - self._last) * 1000:8.1f} ms   (total {(now - _PROCESS_START) * 1000:8.1f} ms)")
+        self._last = now
+
+class ProfilingCallWrapper(tk.CallWrapper):
+    """
+    Tk's callback dispatcher, installed in place of tkinter.CallWrapper. While profiler is set,
+    every command, event binding and after() callback runs under it, named after the callback.
+    """
+    profiler = None
+
+    def __call__(self, *args):
+        profiler = ProfilingCallWrapper.profiler
+        if profiler is None:
+            return super().__call__(*args)
+        try:
+            if self.subst:
+                args = self.subst(*args)
+            return profiler.call(self.action_name(args), self.func, *args)
+        except SystemExit:
+            raise
+        except:
+            self.widget._report_exception()
+
+    def action_name(self, args=()):
+        func = self.func
+        name = getattr(func, '__qualname__', None) or type(func).__name__
+        if name.endswith('after.<locals>.callit'):
+            # after() sarmalayıcısı asıl fonksiyonu kapanışında tutar
+            cells = dict(zip(func.__code__.co_freevars, func.__closure__ or ()))
+            func = cells['func'].cell_contents if 'func' in cells else func
+            name = getattr(func, '__qualname__', None) or func.__name__
+        if name.endswith('<lambda>') and hasattr(func, '__code__'):
+            # Bütün lambdalar aynı adı taşır; satır numarası ve olay/pencere öğesi onları ayırır
+            name = f"{name}:{func.__code__.co_firstlineno}"
+            event = args[0] if args and isinstance(args[0], tk.Event) else None
+            if event is not None:
+                name += f" {getattr(event.type, 'name', event.type)} {event.widget}"
+            elif self.widget is not None:
+                name += f" {self.widget}"
+        return name
+
+class TkClipboard:
+    """
+    The system clipboard through Tk's own display connection, so reads and writes happen in
+    process instead of starting an xclip/xsel/wl-copy process per call as pyperclip does on Linux.
+    Text copied here lives only as long as the app; close() hands it over to pyperclip on exit.
+    A read or write that Tk cannot complete is retried through pyperclip.
+    """
+    name = "tk"
+
+    def __init__(self, widget):
+        self.widget = widget
+        self._fallback = None
+
+    def _fallback_clipboard(self):
+        # pyperclip yalnızca Tk panoya ulaşamadığında (ör. X seçimi kaybolduğunda) ilk kez yüklenir
+        if self._fallback is None:
+            self._fallback = PyperclipClipboard()
+        return self._fallback
+
+    def paste(self):
+        # Başka bir uygulama panoyu devraldığında Tk bunu SelectionClear olayını işleyince öğrenir;
+        # o zamana kadar kendi eski içeriğini döndürür. Bu yüzden bekleyen pencere olayları önce işlenir.
+        while self.widget.tk.dooneevent(_tkinter.WINDOW_EVENTS | _tkinter.DONT_WAIT):
+            pass
+        try:
+            return self.widget.clipboard_get()
+        except tk.TclError: # Pano boş, metin içermiyor ya da Tk ona ulaşamıyor
+            try:
+                return self._fallback_clipboard().paste()
+            except Exception as e:
+                logging.warning(f"Could not read the clipboard: {e}")
+                return ""
+
+    def copy(self, text):
+        try:
+            self.widget.clipboard_clear()
+            self.widget.clipboard_append(text)
+        except tk.TclError as e:
+            logging.warning(f"Tk could not write the clipboard, using pyperclip: {e}")
+            self._fallback_clipboard().copy(text)
+
+    def owns_clipboard(self):
+        try:
+            return bool(self.widget.selection_own_get(selection='CLIPBOARD'))
+        except tk.TclError:
+            return False
+
+    def close(self):
+        if not self.owns_clipboard():
+            return
+        try:
+            self._fallback_clipboard().copy(self.paste())
+        except Exception as e:
+            logging.warning(f"Could not keep the clipboard contents after exit: {e}")
+
+def open_clipboard(widget, backend="auto"):
+    """
+    Returns the clipboard backend named in config.ini ('tk' or 'pyperclip'). 'auto' picks Tk's
+    in-process clipboard except on Windows, where pyperclip already calls the clipboard API directly.
+    """
+    if backend == "pyperclip" or (backend == "auto" and sys.platform == "win32"):
+        return PyperclipClipboard()
+    return TkClipboard(widget)
 
 class ConfigManager:
     def __init__(self, filename="config.ini"):
@@ -57,101 +157,19 @@ class ConfigManager:
         self.config['Settings'] = {'hotkey': self.default_hotkey}
         with open(self.filename, 'w') as configfile: self.config.write(configfile)
 
-    def get_setting(self, section, key):
-        return self.config.get(section, key)
+    def get_setting(self, section, key, fallback=None):
+        if fallback is None:
+            return self.config.get(section, key)
+        return self.config.get(section, key, fallback=fallback)
+
+    def get_bool(self, section, key, fallback=False):
+        return self.config.getboolean(section, key, fallback=fallback)
 
     def set_setting(self, section, key, value):
         if not self.config.has_section(section): self.config.add_section(section)
         self.config.set(section, key, value)
         with open(self.filename, 'w') as configfile: self.config.write(configfile)
 
-# NoteManager sınıfının tamamı (güncellenmiş hali)
-
-class NoteManager:
-    def __init__(self, data_folder="Note_Harvester_Data"):
-        self.user_data_path = os.path.join(os.path.expanduser("~"), data_folder)
-        self.image_assets_path = os.path.join(self.user_data_path, "_assets") # Resimler için yeni klasör
-        os.makedirs(self.user_data_path, exist_ok=True)
-        os.makedirs(self.image_assets_path, exist_ok=True) # Bu klasörü de oluştur
-
-    def get_notebooks(self):
-        try:
-            files = [f.replace('.json', '') for f in os.listdir(self.user_data_path) if f.endswith('.json')]
-            return sorted(files)
-        except FileNotFoundError: return []
-
-    def create_notebook(self, name):
-        filepath = os.path.join(self.user_data_path, f"{name}.json")
-        if not os.path.exists(filepath):
-            with open(filepath, 'w', encoding='utf-8') as f: json.dump([], f)
-            return True
-        return False
-
-    def delete_notebook(self, name):
-        filepath = os.path.join(self.user_data_path, f"{name}.json")
-        if os.path.exists(filepath):
-            # İsteğe bağlı: Defter silinince ilgili resimleri de silmek isterseniz burada ek mantık gerekir.
-            # Şimdilik basit tutuyoruz.
-            os.remove(filepath)
-            return True
-        return False
-        
-    def rename_notebook(self, old_name, new_name):
-        """Renames a notebook file."""
-        if old_name == new_name:
-            return True, "Names are the same."
-
-        old_filepath = os.path.join(self.user_data_path, f"{old_name}.json")
-        new_filepath = os.path.join(self.user_data_path, f"{new_name}.json")
-
-        if not os.path.exists(old_filepath):
-            return False, f"Notebook '{old_name}' not found."
-        
-        if os.path.exists(new_filepath):
-            return False, f"A notebook named '{new_name}' already exists."
-        
-        try:
-            os.rename(old_filepath, new_filepath)
-            return True, "Notebook renamed successfully."
-        except OSError as e:
-            return False, f"Error renaming notebook: {e}"
-
-    def load_notes(self, notebook_name):
-        filepath = os.path.join(self.user_data_path, f"{notebook_name}.json")
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f: return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError): return []
-
-    def save_notes(self, notebook_name, notes_data):
-        filepath = os.path.join(self.user_data_path, f"{notebook_name}.json")
-        with open(filepath, 'w', encoding='utf-8') as f: json.dump(notes_data, f, ensure_ascii=False, indent=4)
-
-    def add_annotation(self, notebook_name, annotation):
-        notes = self.load_notes(notebook_name)
-        notes.append(annotation)
-        self.save_notes(notebook_name, notes)
-
-    # --- YENİ METOT ---
-    def save_image_from_clipboard(self, image):
-        """Saves a PIL image to the assets folder and returns its relative path."""
-        try:
-            # Benzersiz bir dosya adı oluştur
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"img_{timestamp}.png"
-            
-            # Tam kayıt yolu
-            full_path = os.path.join(self.image_assets_path, filename)
-            
-            # Resmi kaydet
-            image.save(full_path, "PNG")
-            
-            # JSON'da saklanacak göreli yolu döndür
-            relative_path = os.path.join("_assets", filename)
-            return relative_path
-        except Exception as e:
-            logging.error(f"Failed to save image from clipboard: {e}", exc_info=True)
-            return None
-
 class HotkeyService:
     def __init__(self, hotkey_str, callback):
         self.hotkey_str = hotkey_str
@@ -162,6 +180,7 @@ class HotkeyService:
     def start(self):
         if self.is_running(): self.stop()
         try:
+            from pynput import keyboard
             clean_hotkey_str = self.hotkey_str.replace(' ', '')
             self.listener = keyboard.GlobalHotKeys({clean_hotkey_str: self.callback})
             self.thread = threading.Thread(target=self.listener.run, daemon=True)
@@ -267,6 +286,7 @@ class DateRangeWindow(tk.Toplevel):
         self.parent = parent
         self.title("Select Date Range")
         self.transient(parent); self.grab_set()
+        from tkcalendar import DateEntry
         ttk.Label(self, text="Start Date:").grid(row=0, column=0, padx=10, pady=5)
         self.start_date_entry = DateEntry(self, date_pattern='y-mm-dd', selectmode='day')
         self.start_date_entry.grid(row=0, column=1, padx=10, pady=5)
@@ -285,14 +305,43 @@ class DateRangeWindow(tk.Toplevel):
         self.destroy()
 
 class SinglePageViewWindow(tk.Toplevel):
+    """
+    Shows a notebook as one continuous document.
+    Notes are rendered lazily: the first screenful right away, the rest in idle-time
+    chunks and on demand when the user scrolls close to the end of what is rendered.
+    """
+    FIRST_SCREEN_NOTES = 30    # Pencere açılır açılmaz gösterilen not sayısı
+    CHUNK_SIZE = 100           # Her parçada eklenen not sayısı
+    IDLE_RENDER_LIMIT = 1000   # Arka planda en fazla bu kadar not işlenir, sonrası kaydırmayla
+    IDLE_DELAY_MS = 15
+    PREFETCH_FRACTION = 0.85   # Görünür alanın sonu bu orana ulaşınca yeni parça eklenir
+
     def __init__(self, parent, notebook_name, notes):
         super().__init__(parent)
         self.parent = parent
         self.title(f"Single Page View - {notebook_name}")
         self.geometry("800x600")
-        
+
+        # Notes arrive in list order (see populate_notes_treeview): most recent first, or by relevance for ranked/fuzzy results
+        self.notes = notes
+        self._date_sorted = None # _index_for_date ilk çağrıldığında belirlenir
+        self._start_index = 0   # İlk işlenen notun indeksi (tarihe atlama sonrası değişir)
+        self._next_index = 0    # Sıradaki işlenecek notun indeksi
+        self._render_job = None
+
         ttk.Label(self, text=f"Notes from '{notebook_name}'", font=("Segoe UI", 14, "bold")).pack(pady=10)
-        
+
+        from tkcalendar import DateEntry
+        jump_frame = ttk.Frame(self)
+        jump_frame.pack(fill=tk.X, padx=10)
+        ttk.Label(jump_frame, text="Jump to date:").pack(side=tk.LEFT)
+        self.jump_date_entry = DateEntry(jump_frame, date_pattern='y-mm-dd', selectmode='day')
+        self.jump_date_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Button(jump_frame, text="Go", command=self.jump_to_selected_date).pack(side=tk.LEFT)
+        ttk.Button(jump_frame, text="Back to Top", command=lambda: self._restart_rendering(0)).pack(side=tk.LEFT, padx=5)
+        self.progress_label = ttk.Label(jump_frame, text="", foreground="gray")
+        self.progress_label.pack(side=tk.RIGHT)
+
         text_frame = ttk.Frame(self)
         text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
@@ -309,13 +358,43 @@ class SinglePageViewWindow(tk.Toplevel):
         # *** FIX: Use a font object and remove the pale foreground color for the separator ***
         self.text_widget.tag_configure("separator", font=self.separator_font, spacing3=10)
         
-        scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=self.text_widget.yview)
-        self.text_widget.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=self.text_widget.yview)
+        self.text_widget.configure(yscrollcommand=self._on_text_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         self.text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        for note in notes:
+        self.text_widget.config(state="disabled")
+        self._create_zoom_bindings()
+
+        self._restart_rendering(0)
+
+    def destroy(self):
+        # Bekleyen parça işleme görevini iptal et, yoksa yok edilmiş widget'a yazmaya çalışır
+        if self._render_job:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+        super().destroy()
+
+    def _restart_rendering(self, start_index):
+        """Clears the view and starts rendering from the note at start_index."""
+        if self._render_job:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+        self._start_index = self._next_index = start_index
+        self.text_widget.config(state="normal")
+        self.text_widget.delete("1.0", tk.END)
+        self.text_widget.config(state="disabled")
+        self._render_notes(self.FIRST_SCREEN_NOTES)
+        self.text_widget.yview_moveto(0)
+        self._schedule_idle_render()
+
+    def _render_notes(self, count):
+        """Appends the next `count` notes to the text widget."""
+        end_index = min(self._next_index + count, len(self.notes))
+        if end_index <= self._next_index:
+            return
+        self.text_widget.config(state="normal")
+        for note in self.notes[self._next_index:end_index]:
             try:
                 timestamp = datetime.fromisoformat(note.get("timestamp", "")).strftime('%Y-%m-%d %H:%M:%S')
             except:
@@ -326,9 +405,65 @@ class SinglePageViewWindow(tk.Toplevel):
             self.text_widget.insert(tk.END, f"{timestamp} | {source}\n", "metadata")
             self.text_widget.insert(tk.END, content + "\n", "content")
             self.text_widget.insert(tk.END, "---\n\n", "separator")
-        
         self.text_widget.config(state="disabled")
-        self._create_zoom_bindings()
+        self._next_index = end_index
+        self._update_progress_label()
+
+    def _update_progress_label(self):
+        total = len(self.notes)
+        if self._start_index == 0 and self._next_index >= total:
+            text = f"{total} notes"
+        else:
+            text = f"Showing notes {self._start_index + 1}-{self._next_index} of {total}"
+        self.progress_label.config(text=text)
+
+    def _schedule_idle_render(self):
+        """Keeps appending chunks in the background until the idle render limit is reached."""
+        if self._render_job:
+            return
+        rendered = self._next_index - self._start_index
+        if self._next_index < len(self.notes) and rendered < self.IDLE_RENDER_LIMIT:
+            self._render_job = self.after(self.IDLE_DELAY_MS, self._idle_render_step)
+
+    def _idle_render_step(self):
+        self._render_job = None
+        self._render_notes(self.CHUNK_SIZE)
+        self._schedule_idle_render()
+
+    def _on_text_scroll(self, first, last):
+        """yscrollcommand hook: updates the scrollbar and loads more notes near the end."""
+        self.scrollbar.set(first, last)
+        if float(last) >= self.PREFETCH_FRACTION and self._next_index < len(self.notes) and not self._render_job:
+            # Doğrudan burada eklemek yscrollcommand'ı yeniden tetikler, bu yüzden olay döngüsüne bırakıyoruz
+            self._render_job = self.after_idle(self._idle_render_step)
+
+    def _index_for_date(self, target_date):
+        """
+        The first note captured on or before target_date: a binary search when the notes are newest
+        first, otherwise (ranked or fuzzy results) the first such note in list order.
+        """
+        cutoff = (target_date + timedelta(days=1)).isoformat()
+        if self._date_sorted is None:
+            timestamps = [n.get("timestamp", "") for n in self.notes]
+            self._date_sorted = all(a >= b for a, b in zip(timestamps, timestamps[1:]))
+        if not self._date_sorted:
+            return next((i for i, n in enumerate(self.notes) if n.get("timestamp", "") < cutoff), len(self.notes))
+        lo, hi = 0, len(self.notes)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.notes[mid].get("timestamp", "") >= cutoff:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def jump_to_selected_date(self):
+        """Restarts rendering at the selected date without rendering the notes before it."""
+        index = self._index_for_date(self.jump_date_entry.get_date())
+        if index >= len(self.notes):
+            messagebox.showinfo("Information", "No notes on or before the selected date.", parent=self)
+            return
+        self._restart_rendering(index)
 
     def _create_zoom_bindings(self):
         # Bind directly to the new _zoom method
@@ -424,32 +559,351 @@ class EditNoteWindow(tk.Toplevel):
         self.save_callback(updated_text)
         self.destroy()
 
+class TagRulesWindow(tk.Toplevel):
+    """Edits the rules that tag captures by their source, one 'pattern -> tag, tag' line per rule."""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.title("Tag Rules")
+        self.geometry("520x320")
+        self.transient(parent)
+        self.grab_set()
+
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(main_frame, justify=tk.LEFT, text="One rule per line: text found in the source window title (* and ? wildcards\n"
+                  "allowed), then '->' and the tags to add, separated by commas. For example:\n"
+                  "    .pdf -> paper, reading").pack(side=tk.TOP, fill=tk.X, pady=(0, 10))
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(10, 0))
+        self.text_widget = tk.Text(main_frame, wrap=tk.NONE, padx=5, pady=5, undo=True)
+        self.text_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.text_widget.insert("1.0", "\n".join(f"{rule['pattern']} -> {', '.join(rule['tags'])}"
+                                                 for rule in parent.note_manager.get_tag_rules()))
+        ttk.Button(button_frame, text="Save", command=self.on_save).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=self.destroy).pack(side=tk.RIGHT)
+        self.text_widget.focus_set()
+
+    @staticmethod
+    def parse_rules(text):
+        """Parses the rule lines; raises ValueError naming the first malformed line."""
+        rules = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            pattern, arrow, tags = line.partition("->")
+            tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+            if not arrow or not pattern.strip() or not tags:
+                raise ValueError(f"Line {number} should look like 'pattern -> tag, tag':\n{line}")
+            rules.append({"pattern": pattern.strip(), "tags": tags})
+        return rules
+
+    def on_save(self):
+        try:
+            rules = self.parse_rules(self.text_widget.get("1.0", tk.END))
+            self.parent.note_manager.set_tag_rules(rules)
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Tag Rules", str(e), parent=self)
+            return
+        self.parent.flash_status(f"{len(rules)} tag rule(s) saved; they apply to new captures.")
+        self.destroy()
+
+class GlobalSearchWindow(tk.Toplevel):
+    """Searches all notebooks at once and lists matches as they arrive."""
+    DEBOUNCE_MS = 250
+    POLL_MS = 50
+    MAX_RESULTS = 5000
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.title("Search All Notebooks")
+        self.geometry("900x500")
+        self.search = GlobalSearch(parent.note_manager)
+        self._generation = 0
+        self._pending_notebooks = 0
+        self._total_notebooks = 0
+        self._result_count = 0
+        self._debounce_job = None
+        self._poll_job = None
+        self._result_notes = {} # Treeview iid -> (defter, zaman damgası)
+
+        top_frame = ttk.Frame(self, padding=5)
+        top_frame.pack(fill=tk.X)
+        ttk.Label(top_frame, text="Search Text:").pack(side=tk.LEFT)
+        self.query_var = tk.StringVar()
+        query_entry = ttk.Entry(top_frame, textvariable=self.query_var)
+        query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.case_sensitive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Case Sensitive", variable=self.case_sensitive_var).pack(side=tk.LEFT, padx=5)
+        self.whole_word_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Whole Word", variable=self.whole_word_var).pack(side=tk.LEFT, padx=5)
+
+        self.status_label = ttk.Label(self, text="Type to search every notebook. Double-click a result to open it.", anchor=tk.W, padding=5)
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+
+        tree_frame = ttk.Frame(self)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=5)
+        cols = ("Notebook", "Date", "Source", "Snippet")
+        self.results_tree = ttk.Treeview(tree_frame, columns=cols, show="headings", selectmode="browse")
+        for col in cols: self.results_tree.heading(col, text=col)
+        self.results_tree.column("Notebook", width=130, stretch=False); self.results_tree.column("Date", width=140, stretch=False)
+        self.results_tree.column("Source", width=180, stretch=False); self.results_tree.column("Snippet", width=400)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
+        self.results_tree.configure(yscroll=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.results_tree.bind("<Double-1>", self._open_selected_result)
+        self.results_tree.bind("<Return>", self._open_selected_result)
+
+        self.query_var.trace_add("write", lambda *args: self._schedule_search())
+        self.case_sensitive_var.trace_add("write", lambda *args: self._schedule_search())
+        self.whole_word_var.trace_add("write", lambda *args: self._schedule_search())
+        query_entry.focus_set()
+
+    def destroy(self):
+        for job in (self._debounce_job, self._poll_job):
+            if job: self.after_cancel(job)
+        self.search.shutdown()
+        super().destroy()
+
+    def _schedule_search(self):
+        # Her tuş vuruşunda değil, yazma durunca ara; önceki arama hemen iptal edilir
+        self.search.cancel()
+        if self._debounce_job: self.after_cancel(self._debounce_job)
+        self._debounce_job = self.after(self.DEBOUNCE_MS, self._start_search)
+
+    def _start_search(self):
+        self._debounce_job = None
+        for item in self.results_tree.get_children(): self.results_tree.delete(item)
+        self._result_notes.clear()
+        self._result_count = 0
+        query = self.query_var.get()
+        if not query:
+            self.search.cancel()
+            self.status_label.config(text="Type to search every notebook.")
+            return
+        regex = build_search_regex(query, self.case_sensitive_var.get(), self.whole_word_var.get())
+        notebooks = self.parent.note_manager.get_notebooks()
+        self._total_notebooks = self._pending_notebooks = len(notebooks)
+        self._generation = self.search.start(regex, notebooks)
+        self._update_status()
+        if not self._poll_job:
+            self._poll_job = self.after(self.POLL_MS, self._poll_results)
+
+    def _poll_results(self):
+        self._poll_job = None
+        try:
+            while True:
+                generation, kind, payload = self.search.results.get_nowait()
+                if generation != self._generation: continue # Eski aramadan kalan sonuç
+                if kind == "done":
+                    self._pending_notebooks -= 1
+                elif self._result_count < self.MAX_RESULTS:
+                    self._insert_results(payload)
+        except queue.Empty:
+            pass
+        if self._result_count >= self.MAX_RESULTS and self._pending_notebooks:
+            self.search.cancel()
+            self._pending_notebooks = 0
+        self._update_status()
+        if self._pending_notebooks > 0:
+            self._poll_job = self.after(self.POLL_MS, self._poll_results)
+
+    def _insert_results(self, results):
+        for result in results[:self.MAX_RESULTS - self._result_count]:
+            try: timestamp = datetime.fromisoformat(result["timestamp"]).strftime('%Y-%m-%d %H:%M:%S')
+            except ValueError: timestamp = "Invalid Date"
+            iid = self.results_tree.insert("", tk.END, values=(result["notebook"], timestamp, result["source"], result["snippet"]))
+            self._result_notes[iid] = (result["notebook"], result["timestamp"])
+            self._result_count += 1
+
+    def _update_status(self):
+        searched = self._total_notebooks - self._pending_notebooks
+        text = f"{self._result_count:,} result(s) in {searched}/{self._total_notebooks} notebooks"
+        if self._pending_notebooks > 0:
+            text += " - searching..."
+        elif self._result_count >= self.MAX_RESULTS:
+            text += f" (showing the first {self.MAX_RESULTS:,}, refine the query to see more)"
+        self.status_label.config(text=text)
+
+    def _open_selected_result(self, event=None):
+        selection = self.results_tree.focus()
+        if selection in self._result_notes:
+            notebook, timestamp = self._result_notes[selection]
+            self.parent.reveal_note(notebook, timestamp)
+
+class DiagnosticsWindow(tk.Toplevel):
+    """Rolling capture latency per stage (p50/p95/p99) and a histogram of the selected stage."""
+    REFRESH_MS = 1000
+    # Histogram kovalarının üst sınırları (ms); son kova bunların üstündeki her şey
+    BUCKET_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.recorder = parent.capture_latency
+        self.title("Capture Diagnostics")
+        self.geometry("640x460")
+        self._refresh_job = None
+
+        ttk.Label(self, text=f"Last {self.recorder.WINDOW} captures. Every capture is also logged to {self.recorder.log_path}",
+                  anchor=tk.W, padding=5, wraplength=620).pack(side=tk.BOTTOM, fill=tk.X)
+        self.histogram_canvas = tk.Canvas(self, height=120, background="white", highlightthickness=0)
+        self.histogram_canvas.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        cols = ("Stage", "Samples", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)")
+        self.stats_tree = ttk.Treeview(self, columns=cols, show="headings", selectmode="browse")
+        for col in cols:
+            self.stats_tree.heading(col, text=col)
+            self.stats_tree.column(col, width=80, anchor=tk.E)
+        self.stats_tree.column("Stage", width=170, anchor=tk.W)
+        self.stats_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.stats_tree.bind("<<TreeviewSelect>>", lambda e: self._draw_histogram())
+        self.histogram_canvas.bind("<Configure>", lambda e: self._draw_histogram())
+        self._refresh()
+
+    def destroy(self):
+        if self._refresh_job: self.after_cancel(self._refresh_job)
+        super().destroy()
+
+    def _refresh(self):
+        selected = self.stats_tree.selection()
+        for item in self.stats_tree.get_children(): self.stats_tree.delete(item)
+        for stage, count, p50, p95, p99, worst in self.recorder.summary():
+            self.stats_tree.insert("", tk.END, iid=stage, values=(stage.replace("_", " ").capitalize(), count,
+                                   *(f"{value * 1000:.1f}" for value in (p50, p95, p99, worst))))
+        if selected and self.stats_tree.exists(selected[0]):
+            self.stats_tree.selection_set(selected[0])
+        elif self.stats_tree.exists("total"):
+            self.stats_tree.selection_set("total")
+        self._draw_histogram()
+        self._refresh_job = self.after(self.REFRESH_MS, self._refresh)
+
+    def _draw_histogram(self):
+        canvas = self.histogram_canvas
+        canvas.delete("all")
+        selection = self.stats_tree.selection()
+        if not selection: return
+        counts = [0] * (len(self.BUCKET_EDGES_MS) + 1)
+        for seconds in self.recorder.samples(selection[0]):
+            counts[bisect.bisect_left(self.BUCKET_EDGES_MS, seconds * 1000)] += 1
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        labels = [f"≤{edge}" for edge in self.BUCKET_EDGES_MS] + [f">{self.BUCKET_EDGES_MS[-1]}"]
+        bar_width = width / len(counts)
+        peak = max(counts) or 1
+        for i, (count, label) in enumerate(zip(counts, labels)):
+            bar_height = count / peak * (height - 30)
+            canvas.create_rectangle(i * bar_width + 2, height - 16 - bar_height, (i + 1) * bar_width - 2, height - 16,
+                                    fill="#4a90d9", outline="")
+            canvas.create_text((i + 0.5) * bar_width, height - 8, text=label, font=("TkDefaultFont", 7))
+            if count:
+                canvas.create_text((i + 0.5) * bar_width, height - 22 - bar_height, text=str(count), font=("TkDefaultFont", 7))
+
 class NoteHarvesterApp(tk.Tk):
-    def __init__(self):
+    DETAIL_PREVIEW_CHARS = 20000     # Detay panelinde hemen gösterilen karakter sayısı
+    DETAIL_CHUNK_CHARS = 100000      # Büyük notların kalanı bu boyutta parçalarla eklenir
+    DETAIL_CHUNK_DELAY_MS = 10
+    DETAIL_CACHE_SIZE = 4            # Önbellekte tutulan büyük not widget'ı sayısı
+    DETAIL_IMAGE_CACHE_SIZE = 16
+
+    RANKED_RESULT_LIMIT = 200        # "Rank by Relevance" açıkken listelenen en fazla not
+    REGEX_TIME_BUDGET = 0.25         # Düzenli ifade aramasının arayüzü bekletebileceği en uzun süre (sn)
+    SEARCH_INDEX_POLL_MS = 500
+
+    RELATED_LIMIT = 10               # Detay panelinin altında listelenen benzer not sayısı
+    RELATED_DELAY_MS = 150           # Ok tuşlarıyla gezinirken her not için ayrı arama yapılmasın
+    RELATED_INDEX_POLL_MS = 500
+
+    CAPTURE_LATENCY_LOG = "_capture_latency.jsonl" # Veri klasöründe; her yakalama için bir satır
+    PROFILES_FOLDER = "_profiles" # Veri klasöründe; her profil oturumu için tarihli bir alt klasör
+
+    ASSET_GC_DELAY_MS = 60 * 1000            # Açılıştan sonra ilk toplama
+    ASSET_GC_INTERVAL_MS = 60 * 60 * 1000
+
+    FACET_FILTERS = (("tag", "Tags"), ("source", "Sources"), ("month", "Months")) # Not listesindeki çoklu seçim menüleri
+
+    TIMELINE_HEIGHT = 40
+    TIMELINE_DAILY_MAX_DAYS = 120    # Daha uzun aralıklarda histogram haftalık çubuklarla çizilir
+
+    ICON_SIZE = 64
+
+    def __init__(self, startup_trace=None, profile=False):
+        self.startup_trace = startup_trace or StartupTrace()
+        self.startup_trace.mark("imports")
+        # Geri çağrılar kaydedildikleri anda sarmalanır; bu yüzden kök pencereden önce kurulur
+        tk.CallWrapper = ProfilingCallWrapper
+        if profile:
+            ProfilingCallWrapper.profiler = ActionProfiler()
         super().__init__()
+        self.startup_trace.mark("tk root")
         self.config_manager = ConfigManager()
-        self.note_manager = NoteManager()
+        self.note_manager = NoteManager(segment_new_notebooks=self.config_manager.get_bool('Storage', 'split_by_month'))
+        self.capture_latency = LatencyRecorder("capture", os.path.join(self.note_manager.user_data_path, self.CAPTURE_LATENCY_LOG))
+        self.clipboard_backend = open_clipboard(self, self.config_manager.get_setting('Settings', 'clipboard_backend', fallback='auto'))
+        self.capture_pipeline = None # İlk yakalamada kurulur (pygetwindow, pynput ve Pillow o zaman yüklenir)
         self.hotkey_service = None
+        self.tray_icon = None
         self.active_notebook = None
         self.all_notes_cache = {}
         self.detail_view_visible = True
         self.task_queue = queue.Queue()
         self.is_capturing = False
         self.custom_date_filter = None
+        self._detail_load_job = None
+        self._search_index_poll_job = None
+        self._related_job = None
+        self._related_notes = {} # Benzer notlar listesindeki satır -> (defter adı, zaman damgası)
+        self.notebook_watcher = None
+        self._detail_widget_cache = OrderedDict()
+        self._detail_image_cache = OrderedDict()
+        self._detail_view_images = []
+
+        self.startup_trace.mark("config + storage")
 
         self.setup_window()
+        self.startup_trace.mark("window + icon")
         self.create_menu()
         self.create_widgets()
-        self.create_tray_icon()
-        
-        self.populate_notebook_list()
-        self.restart_hotkey_service()
+        self.startup_trace.mark("widgets")
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.poll_queue()
 
         self.search_var.trace_add("write", lambda *args: self._apply_filters())
         self.case_sensitive_var.trace_add("write", lambda *args: self._apply_filters())
         self.whole_word_var.trace_add("write", lambda *args: self._apply_filters())
+        self.ranked_search_var.trace_add("write", lambda *args: self._apply_filters())
+        self.fuzzy_search_var.trace_add("write", lambda *args: self._apply_filters())
+        self.regex_search_var.trace_add("write", self._on_regex_toggled)
+
+        # Önce pencere çizilsin; defter yükleme ve kısayol dinleyicisi olay döngüsü başladıktan sonra.
+        # Tepsi ikonu ise ancak pencere tepsiye küçültüldüğünde oluşturulur.
+        self.after_idle(lambda: self.after(0, self._finish_startup))
+
+    def _finish_startup(self):
+        """Second startup stage, run once the window is on screen."""
+        self.startup_trace.mark("window shown")
+        self.populate_notebook_list()
+        self.startup_trace.mark("first notebook loaded")
+        self.restart_hotkey_service()
+        self.startup_trace.mark("hotkey listener")
+        # Senkronizasyon araçları veya betikler defterleri değiştirirse liste canlı güncellenir
+        self.notebook_watcher = NotebookWatcher(self.note_manager, lambda names, assets_changed:
+                                                self.task_queue.put(("EXTERNAL_CHANGES", names, assets_changed)))
+        self.notebook_watcher.start()
+        self.startup_trace.mark("file watcher")
+        self.after(self.ASSET_GC_DELAY_MS, self._collect_unused_assets)
+
+    def _collect_unused_assets(self):
+        """Starts the asset collector on a background thread and schedules the next run."""
+        def run():
+            try:
+                count, freed = self.note_manager.collect_unused_assets()
+            except OSError as e:
+                logging.error(f"Asset collection failed: {e}", exc_info=True)
+                return
+            self.task_queue.put(("ASSETS_COLLECTED", count, freed))
+        threading.Thread(target=run, daemon=True).start()
+        self.after(self.ASSET_GC_INTERVAL_MS, self._collect_unused_assets)
 
     def merge_notes_by_source(self):
         """
@@ -472,43 +926,41 @@ class NoteHarvesterApp(tk.Tk):
                                    parent=self):
             return
 
-        # IMPORTANT: Load the full, unfiltered list of notes from the file
-        full_note_list = self.note_manager.load_notes(self.active_notebook)
-
-        notes_to_merge = []
-        notes_to_keep = []
-        for note in full_note_list:
-            if note.get('source') in target_sources:
-                notes_to_merge.append(note)
-            else:
-                notes_to_keep.append(note)
-
-        if len(notes_to_merge) < 1:
+        # IMPORTANT: Search the full, unfiltered list of notes, not the current view
+        if not any(note.get('source') in target_sources for note in self.note_manager.load_notes(self.active_notebook)):
             messagebox.showinfo("Information", "No notes found for the selected source(s).", parent=self)
             return
 
-        # Sort notes by timestamp to merge them in chronological order
-        notes_to_merge.sort(key=lambda x: x.get("timestamp", ""))
-        
-        # Ask for the new source name, providing a sensible default
+        # Ask for the new source name, providing a sensible default. Dialogs are shown before the
+        # transaction opens so no transaction is held while the user is answering
         default_new_source = f"Merged from '{source_list_str}'"
-        new_source = simpledialog.askstring("New Source", "Enter a source for the merged note:", 
+        new_source = simpledialog.askstring("New Source", "Enter a source for the merged note:",
                                             initialvalue=default_new_source, parent=self)
         if not new_source:
             return # User cancelled
 
-        # Create the merged note
-        merged_text = "\n\n---\n\n".join(note.get("text", "") for note in notes_to_merge)
-        new_note = {"timestamp": datetime.now().isoformat(), "source": new_source, "text": merged_text}
-        
-        # The new list of notes is the ones we kept plus the new merged one
-        final_notes = notes_to_keep + [new_note]
-        
-        self.note_manager.save_notes(self.active_notebook, final_notes)
+        try:
+            with self.note_manager.transaction(self.active_notebook, label="Merge by Source") as tx:
+                notes_to_merge = [note for note in tx.notes() if note.get('source') in target_sources]
+                if not notes_to_merge:
+                    return # The notes were removed meanwhile; the empty transaction writes nothing
+
+                # Sort notes by timestamp to merge them in chronological order
+                notes_to_merge.sort(key=lambda x: x.get("timestamp", ""))
+
+                # Replace the originals with one merged note
+                merged_text = "\n\n---\n\n".join(note.get("text", "") for note in notes_to_merge)
+                for note in notes_to_merge:
+                    tx.delete(note.get('timestamp'))
+                tx.insert({"timestamp": datetime.now().isoformat(), "source": new_source, "text": merged_text})
+        except (KeyError, ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Could not merge notes; the notebook was not changed.\n\n{e}", parent=self)
+            return
 
         # Clear all filters to ensure the new merged note is visible
         self.search_var.set("")
         self.source_filter_var.set("All Sources")
+        self._reset_facet_filters()
         self.custom_date_filter = None
         self.date_filter_btn.config(text="All Time")
         
@@ -526,28 +978,6 @@ class NoteHarvesterApp(tk.Tk):
             
         self.flash_status(f"{len(notes_to_merge)} notes merged successfully!")
 
-    def _escape_latex(self, text):
-        """Escapes special LaTeX characters in a given string."""
-        # Bu karakterler LaTeX'te özel anlamlara sahiptir.
-        # Onları bir ters eğik çizgi ile "kaçarak" etkisiz hale getiriyoruz.
-        # Ters eğik çizginin kendisi en karmaşık olanıdır ve \textbackslash{} ile değiştirilmelidir.
-        conv = {
-            '&': r'\&',
-            '%': r'\%',
-            '$': r'\$',
-            '#': r'\#',
-            '_': r'\_',
-            '{': r'\{',
-            '}': r'\}',
-            '~': r'\textasciitilde{}',
-            '^': r'\textasciicircum{}',
-            '\\': r'\textbackslash{}',
-        }
-        # Regex kullanarak bu karakterleri bulup değiştiriyoruz.
-        # Bu, basit replace() çağrılarından daha güvenlidir.
-        regex = re.compile('|'.join(re.escape(key) for key in sorted(conv.keys(), key=len, reverse=True)))
-        return regex.sub(lambda match: conv[match.group()], text)
-
 # NoteHarvesterApp sınıfına eklenecek YENİ metotlar
 
     def _copy_detail_content(self):
@@ -566,7 +996,7 @@ class NoteHarvesterApp(tk.Tk):
         note_type = note.get("type", "text")
 
         if note_type == "text":
-            pyperclip.copy(note.get("text", ""))
+            self.clipboard_backend.copy(note.get("text", ""))
             self.flash_status("Note text copied to clipboard!")
         elif note_type == "image":
             image_path = note.get("image_path")
@@ -583,7 +1013,7 @@ class NoteHarvesterApp(tk.Tk):
                 self.flash_status("Image copied to clipboard!")
             else:
                 # Yedek mekanizma: dosya yolunu kopyala
-                pyperclip.copy(full_path)
+                self.clipboard_backend.copy(full_path)
                 self.flash_status("Image copied to clipboard (as file path).")
                 messagebox.showinfo(
                     "Image Path Copied",
@@ -602,6 +1032,7 @@ class NoteHarvesterApp(tk.Tk):
                 from io import BytesIO
                 import win32clipboard
                 import win32con
+                from PIL import Image
 
                 image = Image.open(image_path)
                 # RGBA formatını DIB (Device Independent Bitmap) formatının anlayacağı RGB'ye çevir
@@ -632,28 +1063,33 @@ class NoteHarvesterApp(tk.Tk):
         self.title("Note Harvester v2.5 (Final)")
         self.geometry("1100x700")
 
-        # --- BAŞLANGIÇ: PNG İKON YÜKLEMEK İÇİN YENİ VE GÜVENİLİR YÖNTEM ---
         try:
-            # Önceki çözümdeki gibi, betiğin/exe'nin yolunu buluyoruz.
-            if getattr(sys, 'frozen', False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.abspath(__file__))
-
-            # Bu sefer .png dosyasını arıyoruz
-            icon_path = os.path.join(base_path, 'icon.png')
-            
-            # Pillow kullanarak PNG dosyasını açıp bir PhotoImage nesnesine dönüştürüyoruz
-            icon_image = tk.PhotoImage(file=icon_path)
-            
-            # iconphoto metodu ile ikonu ayarlıyoruz. 'True' parametresi,
-            # bunun varsayılan pencere ikonu olacağını belirtir.
-            self.iconphoto(True, icon_image)
-
+            # Referansı saklıyoruz; iconphoto verinin kopyasını alsa da nesne erken silinmesin
+            self._icon_image = tk.PhotoImage(file=self._get_small_icon_path())
+            self.iconphoto(True, self._icon_image)
         except Exception as e:
             # Herhangi bir hata durumunda program çökmesin
             print(f"Could not set window icon: {e}")
-        # --- SON: PNG İKON YÜKLEMEK İÇİN YENİ VE GÜVENİLİR YÖNTEM ---
+
+    def _get_small_icon_path(self):
+        """
+        Returns a pre-scaled copy of icon.png kept in the data folder, creating it on first run.
+        The bundled icon is 1024x1024, which is slow to decode on every startup.
+        """
+        cached_path = os.path.join(self.note_manager.cache_path, f"icon_{self.ICON_SIZE}.png")
+        if os.path.exists(cached_path):
+            return cached_path
+
+        # Betiğin/exe'nin yolunu buluyoruz
+        if getattr(sys, 'frozen', False):
+            base_path = sys._MEIPASS
+        else:
+            base_path = os.path.dirname(os.path.abspath(__file__))
+        full_icon = tk.PhotoImage(file=os.path.join(base_path, 'icon.png'))
+        small_icon = full_icon.subsample(max(1, full_icon.width() // self.ICON_SIZE))
+        os.makedirs(self.note_manager.cache_path, exist_ok=True)
+        small_icon.write(cached_path, format='png')
+        return cached_path
 
     def create_menu(self):
         menu_bar = tk.Menu(self)
@@ -661,19 +1097,33 @@ class NoteHarvesterApp(tk.Tk):
         file_menu = tk.Menu(menu_bar, tearoff=0)
         menu_bar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="View as Single Page (P)", command=self.show_as_single_page)
+        file_menu.add_command(label="Search All Notebooks... (Ctrl+Shift+F)", command=self.open_global_search)
         file_menu.add_command(label="Export to PDF/HTML", command=self.export_to_pandoc)
-        file_menu.add_command(label="Minimize to Tray", command=self.withdraw)
+        file_menu.add_command(label="Minimize to Tray", command=self.minimize_to_tray)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.quit_app)
         self.show_date_var = tk.BooleanVar(value=True)
         self.show_source_var = tk.BooleanVar(value=True)
+        self.edit_menu = tk.Menu(menu_bar, tearoff=0, postcommand=self._update_edit_menu)
+        menu_bar.add_cascade(label="Edit", menu=self.edit_menu)
+        self.edit_menu.add_command(label="Undo (Ctrl+Z)", command=self.undo_last_change)
+        self.edit_menu.add_command(label="Redo (Ctrl+Y)", command=self.redo_last_change)
         view_menu = tk.Menu(menu_bar, tearoff=0)
         menu_bar.add_cascade(label="View", menu=view_menu)
         view_menu.add_checkbutton(label="Show Date Column", variable=self.show_date_var, command=self._update_visible_columns)
         view_menu.add_checkbutton(label="Show Source Column", variable=self.show_source_var, command=self._update_visible_columns)
+        view_menu.add_separator()
+        view_menu.add_command(label="Memory Usage...", command=self.show_memory_usage)
+        view_menu.add_command(label="Capture Diagnostics...", command=lambda: DiagnosticsWindow(self))
         settings_menu = tk.Menu(menu_bar, tearoff=0)
         menu_bar.add_cascade(label="Settings", menu=settings_menu)
         settings_menu.add_command(label="Change Hotkey...", command=self.open_settings)
+        settings_menu.add_command(label="Tag Rules...", command=lambda: TagRulesWindow(self))
+        self.split_by_month_var = tk.BooleanVar(value=self.note_manager.segment_new_notebooks)
+        settings_menu.add_checkbutton(label="Split New Notebooks by Month", variable=self.split_by_month_var, command=self._toggle_split_by_month)
+        settings_menu.add_separator()
+        self.profile_var = tk.BooleanVar(value=ProfilingCallWrapper.profiler is not None)
+        settings_menu.add_checkbutton(label="Profile Next Actions", variable=self.profile_var, command=self._toggle_profiling)
 
 # NoteHarvesterApp sınıfına eklenecek YENİ metotlar
 
@@ -691,14 +1141,72 @@ class NoteHarvesterApp(tk.Tk):
             context_menu = tk.Menu(self, tearoff=0)
             context_menu.add_command(label="Rename...", command=self._rename_selected_notebook)
             context_menu.add_command(label="Delete", command=self.delete_selected_notebook)
+            context_menu.add_separator()
+            layout = self.note_manager.get_layout(self.notebook_names[selection[0]])
+            if layout != NoteManager.LAYOUT_SINGLE_FILE:
+                context_menu.add_command(label="Store as Single File", command=lambda: self._set_selected_notebook_layout(NoteManager.LAYOUT_SINGLE_FILE))
+            if layout != NoteManager.LAYOUT_SEGMENTED:
+                context_menu.add_command(label="Split by Month", command=lambda: self._set_selected_notebook_layout(NoteManager.LAYOUT_SEGMENTED))
+            if layout != NoteManager.LAYOUT_ARCHIVE:
+                context_menu.add_command(label="Compact into Archive", command=lambda: self._set_selected_notebook_layout(NoteManager.LAYOUT_ARCHIVE))
             context_menu.tk_popup(event.x_root, event.y_root)
 
+    def _set_selected_notebook_layout(self, layout):
+        """Rewrites the selected notebook as a single file, per-month segments or a compressed archive."""
+        selection = self.notebook_listbox.curselection()
+        if not selection: return
+        name = self.notebook_names[selection[0]]
+        old_stats = self.note_manager.get_notebook_stats(name)
+        try:
+            self.note_manager.set_notebook_layout(name, layout)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to convert notebook layout: {e}", exc_info=True)
+            messagebox.showerror("Error", f"Could not convert notebook '{name}': {e}", parent=self)
+            return
+        self._refresh_notebook_entry(name)
+        if layout == NoteManager.LAYOUT_ARCHIVE and old_stats:
+            new_size = self.note_manager.get_notebook_stats(name)['byte_size']
+            self.flash_status(f"Notebook '{name}' compacted: {old_stats['byte_size'] / 1024:,.0f} KB -> {new_size / 1024:,.0f} KB.")
+        else:
+            self.flash_status(f"Notebook '{name}' is now stored {'by month' if layout == NoteManager.LAYOUT_SEGMENTED else 'as a single file'}.")
+
+    def _toggle_split_by_month(self):
+        split = self.split_by_month_var.get()
+        self.note_manager.segment_new_notebooks = split
+        self.config_manager.set_setting('Storage', 'split_by_month', 'yes' if split else 'no')
+
+    def _toggle_profiling(self):
+        if self.profile_var.get():
+            ProfilingCallWrapper.profiler = ActionProfiler()
+            self.flash_status("Profiling is on. Use the app as usual, then turn it off in Settings to save the results.")
+            return
+        folder = self._save_profile()
+        if folder:
+            messagebox.showinfo("Profiling", f"Profiles were saved to:\n{folder}\n\nOpen the .pstats files with "
+                                "snakeviz or flameprof, or read summary.txt.", parent=self)
+        else:
+            self.flash_status("Profiling stopped; no action took long enough to be recorded.")
+
+    def _save_profile(self):
+        """Stops profiling and saves what was recorded; returns the folder, or None if nothing was."""
+        profiler, ProfilingCallWrapper.profiler = ProfilingCallWrapper.profiler, None
+        if profiler is None or not profiler.actions:
+            return None
+        folder = os.path.join(self.note_manager.user_data_path, self.PROFILES_FOLDER, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        try:
+            profiler.save(folder)
+        except OSError as e:
+            logging.error(f"Could not save profiles to {folder}: {e}", exc_info=True)
+            messagebox.showerror("Profiling", f"Could not save the profiles:\n{e}", parent=self)
+            return None
+        return folder
+
     def _rename_selected_notebook(self):
         """Handles the logic for renaming a notebook."""
         selection = self.notebook_listbox.curselection()
         if not selection: return
 
-        old_name = self.notebook_listbox.get(selection[0])
+        old_name = self.notebook_names[selection[0]]
         new_name = simpledialog.askstring("Rename Notebook", 
                                           f"Enter new name for '{old_name}':",
                                           initialvalue=old_name,
@@ -714,11 +1222,7 @@ class NoteHarvesterApp(tk.Tk):
                 
                 # Listeyi yenile ve yeni adı seç
                 self.populate_notebook_list(select_first=False)
-                for i, item in enumerate(self.notebook_listbox.get(0, tk.END)):
-                    if item == new_name:
-                        self.notebook_listbox.selection_set(i)
-                        self.on_notebook_select()
-                        break
+                self._select_notebook(new_name)
                 self.flash_status(f"Notebook '{old_name}' renamed to '{new_name}'.")
             else:
                 messagebox.showerror("Error", message, parent=self)
@@ -741,17 +1245,14 @@ class NoteHarvesterApp(tk.Tk):
             return
 
         new_source = new_source.strip()
-        full_note_list = self.note_manager.load_notes(self.active_notebook)
-        
-        # Seçilen notların benzersiz kimliklerini (timestamp) al
-        timestamps_to_update = {all_notes_in_view[int(i)]['timestamp'] for i in selection}
-
-        # Tam listede bu notları bul ve kaynağını güncelle
-        for note in full_note_list:
-            if note.get('timestamp') in timestamps_to_update:
-                note['source'] = new_source
-
-        self.note_manager.save_notes(self.active_notebook, full_note_list)
+        # Seçilen notlar benzersiz kimlikleriyle (timestamp) tek bir işlemde güncellenir
+        try:
+            with self.note_manager.transaction(self.active_notebook, label="Rename Source") as tx:
+                for i in selection:
+                    tx.update(all_notes_in_view[int(i)]['timestamp'], source=new_source)
+        except (KeyError, OSError) as e:
+            messagebox.showerror("Error", f"Could not rename the source; the notebook was not changed.\n\n{e}", parent=self)
+            return
         
         # Kaynak filtresini ve not listesini güncelle
         self._update_source_filter()
@@ -776,24 +1277,20 @@ class NoteHarvesterApp(tk.Tk):
 
     def _save_edited_note(self, original_timestamp, new_text):
         """Saves the changes made in the EditNoteWindow."""
-        full_note_list = self.note_manager.load_notes(self.active_notebook)
-        
-        note_found = False
-        for note in full_note_list:
-            if note.get('timestamp') == original_timestamp:
-                note['text'] = new_text
-                note_found = True
-                break
-        
-        if note_found:
-            self.note_manager.save_notes(self.active_notebook, full_note_list)
-            # Görünümü yenile
-            self.populate_notes_treeview()
-            # Detay görünümünü de güncelle
-            self.on_note_select() 
-            self.flash_status("Note updated successfully.")
-        else:
+        try:
+            with self.note_manager.transaction(self.active_notebook, label="Edit Note") as tx:
+                tx.update(original_timestamp, text=new_text)
+        except KeyError:
             messagebox.showerror("Error", "Could not find the original note to save changes.", parent=self)
+            return
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save changes: {e}", parent=self)
+            return
+        # Görünümü yenile
+        self.populate_notes_treeview()
+        # Detay görünümünü de güncelle
+        self.on_note_select() 
+        self.flash_status("Note updated successfully.")
 
 # NoteHarvesterApp sınıfı içindeki create_widgets metodunun tamamı
 
@@ -808,6 +1305,11 @@ class NoteHarvesterApp(tk.Tk):
         self.notebook_listbox.bind("<<ListboxSelect>>", self.on_notebook_select)
         self.notebook_listbox.bind("<Delete>", lambda e: self.delete_selected_notebook())
         self.notebook_listbox.bind("<Button-3>", self._show_notebook_context_menu)
+        self.notebook_listbox.bind("<Motion>", self._on_notebook_list_hover)
+        self.notebook_listbox.bind("<Leave>", self._on_notebook_list_leave)
+        self.notebook_names = []
+        self.notebook_stats_label = ttk.Label(left_frame, text="", foreground="gray", justify=tk.LEFT, wraplength=230)
+        self.notebook_stats_label.pack(fill=tk.X, pady=(0, 5))
         btn_frame = ttk.Frame(left_frame)
         btn_frame.pack(fill=tk.X)
         ttk.Button(btn_frame, text="New", command=self.create_new_notebook).pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0,2))
@@ -826,6 +1328,12 @@ class NoteHarvesterApp(tk.Tk):
         ttk.Checkbutton(filter_frame, text="Case Sensitive", variable=self.case_sensitive_var).grid(row=0, column=2, padx=5, pady=5)
         self.whole_word_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(filter_frame, text="Whole Word", variable=self.whole_word_var).grid(row=0, column=3, padx=5, pady=5)
+        self.ranked_search_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Rank by Relevance", variable=self.ranked_search_var).grid(row=0, column=4, padx=5, pady=5)
+        self.fuzzy_search_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Fuzzy", variable=self.fuzzy_search_var).grid(row=0, column=5, padx=5, pady=5)
+        self.regex_search_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Regex", variable=self.regex_search_var).grid(row=0, column=6, padx=5, pady=5)
         ttk.Label(filter_frame, text="Source:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
         self.source_filter_var = tk.StringVar()
         self.source_filter_combo = ttk.Combobox(filter_frame, textvariable=self.source_filter_var, state="readonly")
@@ -834,7 +1342,30 @@ class NoteHarvesterApp(tk.Tk):
         ttk.Label(filter_frame, text="Date Range:").grid(row=1, column=2, padx=5, pady=5, sticky="w")
         self.date_filter_btn = ttk.Button(filter_frame, text="All Time", command=self.open_date_range_window)
         self.date_filter_btn.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
-        filter_frame.columnconfigure(1, weight=1); filter_frame.columnconfigure(3, weight=1)
+        # Etiket, kaynak ve ay menüleri: birden çok değer seçilebilir ya da dışlanabilir
+        self.facet_filter_include = {kind: set() for kind, _ in self.FACET_FILTERS}
+        self.facet_filter_exclude = {kind: set() for kind, _ in self.FACET_FILTERS}
+        self.tag_match_all_var = tk.BooleanVar(value=False)
+        self._facet_filter_vars = []
+        self.facet_filter_btns, self.facet_filter_menus = {}, {}
+        for i, (kind, title) in enumerate(self.FACET_FILTERS):
+            ttk.Label(filter_frame, text=f"{title}:").grid(row=2, column=2 * i, padx=5, pady=5, sticky="w")
+            button = ttk.Menubutton(filter_frame, text=f"All {title}")
+            # Menü her açılışta etkin defterin değerleriyle yeniden doldurulur
+            menu = tk.Menu(button, tearoff=0, postcommand=lambda k=kind: self._build_facet_filter_menu(k))
+            button["menu"] = menu
+            button.grid(row=2, column=2 * i + 1, columnspan=2 if i == len(self.FACET_FILTERS) - 1 else 1, padx=5, pady=5, sticky="ew")
+            self.facet_filter_btns[kind], self.facet_filter_menus[kind] = button, menu
+        filter_frame.columnconfigure(1, weight=1); filter_frame.columnconfigure(3, weight=1); filter_frame.columnconfigure(5, weight=1)
+        # Yakalama histogramı: çubuğa tıklamak o gün/haftaya filtreler
+        self.timeline_canvas = tk.Canvas(notes_frame, height=self.TIMELINE_HEIGHT, highlightthickness=0)
+        self.timeline_canvas.pack(fill=tk.X, padx=5, pady=(0, 5))
+        self.timeline_canvas.bind("<Configure>", self._draw_timeline)
+        self.timeline_canvas.bind("<Motion>", self._on_timeline_hover)
+        self.timeline_canvas.bind("<Leave>", lambda e: self.status_bar.config(text=f"Active Notebook: {self.active_notebook}"))
+        self.timeline_canvas.bind("<Button-1>", self._on_timeline_click)
+        self._timeline_bins = []
+        self._timeline_bin_days = 1
         tree_frame = ttk.Frame(notes_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=5)
         cols = ("Date", "Source", "Summary")
@@ -869,11 +1400,30 @@ class NoteHarvesterApp(tk.Tk):
         self.detail_copy_btn.pack(side=tk.LEFT, padx=10)
         # --- SON: DÜĞMEYİ BAŞLIĞIN YANINA YERLEŞTİREN DÜZENLEME ---
 
-        self.note_detail_text = tk.Text(self.detail_frame, wrap=tk.WORD, padx=5, pady=5)
+        # Seçili nota en çok benzeyen notlar (birleştirme adayları); metin widget'ları değiştirilse de altta kalır
+        related_frame = ttk.Frame(self.detail_frame)
+        related_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        related_header_frame = ttk.Frame(related_frame)
+        related_header_frame.pack(fill=tk.X)
+        ttk.Label(related_header_frame, text="Related Notes", font=("Segoe UI", 10, "bold")).pack(side=tk.LEFT)
+        self.related_all_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(related_header_frame, text="All Notebooks", variable=self.related_all_var,
+                        command=self._refresh_related_notes).pack(side=tk.LEFT, padx=10)
+        self.related_status_label = ttk.Label(related_header_frame, text="")
+        self.related_status_label.pack(side=tk.LEFT)
+        related_cols = ("Similarity", "Notebook", "Source", "Summary")
+        self.related_tree = ttk.Treeview(related_frame, columns=related_cols, show="headings", height=5, selectmode="browse")
+        for col in related_cols: self.related_tree.heading(col, text=col)
+        self.related_tree.column("Similarity", width=70, stretch=False); self.related_tree.column("Notebook", width=120, stretch=False)
+        self.related_tree.column("Source", width=180, stretch=False); self.related_tree.column("Summary", width=300)
+        self.related_tree.bind("<Double-1>", self._open_related_note)
+        self.related_tree.bind("<Return>", self._open_related_note)
+        self.related_tree.pack(fill=tk.X, pady=(5, 0))
+
         self.detail_font = font.Font(family="Segoe UI", size=10)
-        self.note_detail_text.configure(font=self.detail_font)
-        self.note_detail_text.config(state="disabled")
-        self._create_zoom_bindings(self.note_detail_text, self.detail_font)
+        # Küçük notlar her zaman bu ana widget'ta gösterilir; büyük notlar kendi önbellekli widget'larını alır
+        self._detail_primary_text = self._create_detail_text_widget()
+        self.note_detail_text = self._detail_primary_text
         self.note_detail_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=(5,0))
         
         bottom_frame = ttk.Frame(self)
@@ -886,6 +1436,9 @@ class NoteHarvesterApp(tk.Tk):
         self.after(20, lambda: self.right_pane.sashpos(0, 400))
         
         self.bind("<p>", self.on_p_key)
+        self.bind("<Control-Shift-F>", lambda e: self.open_global_search())
+        self.bind("<Control-z>", self.undo_last_change)
+        self.bind("<Control-y>", self.redo_last_change)
 
     def on_p_key(self, event):
         if self.focus_get() != self.search_entry:
@@ -893,102 +1446,174 @@ class NoteHarvesterApp(tk.Tk):
 
     def populate_notebook_list(self, select_first=True):
         self.notebook_listbox.delete(0, tk.END)
-        notebooks = self.note_manager.get_notebooks()
-        for nb in notebooks:
-            self.notebook_listbox.insert(tk.END, nb)
-        if notebooks and select_first:
+        # İstatistikler katalogdan gelir; defterlerin hiçbiri açılmaz
+        catalog = self.note_manager.get_catalog()
+        self.notebook_names = sorted(catalog)
+        for nb in self.notebook_names:
+            self.notebook_listbox.insert(tk.END, self._format_notebook_entry(nb))
+        self.notebook_stats_label.config(text="")
+        if self.notebook_names and select_first:
             self.notebook_listbox.selection_set(0)
             self.on_notebook_select()
 
+    def _select_notebook(self, name):
+        if name in self.notebook_names:
+            self.notebook_listbox.selection_clear(0, tk.END)
+            self.notebook_listbox.selection_set(self.notebook_names.index(name))
+            self.on_notebook_select()
+
+    def _format_notebook_entry(self, name):
+        stats = self.note_manager.get_notebook_stats(name)
+        return f"{name}  ({stats['note_count']:,})" if stats else name
+
+    def _format_notebook_stats(self, name):
+        stats = self.note_manager.get_notebook_stats(name)
+        if not stats: return ""
+        size = stats['byte_size']
+        size_text = f"{size / (1024 * 1024):.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.0f} KB"
+        lines = [f"{stats['note_count']:,} notes, {stats['image_count']:,} images, {size_text}"]
+        if stats['last_capture']:
+            try: last_capture = datetime.fromisoformat(stats['last_capture']).strftime('%Y-%m-%d %H:%M')
+            except ValueError: last_capture = stats['last_capture']
+            lines.append(f"Last capture: {last_capture}")
+        if stats['top_sources']:
+            sources = ", ".join(f"{src[:30]} ({count})" for src, count in stats['top_sources'])
+            lines.append(f"Top sources: {sources}")
+        return "\n".join(lines)
+
+    def _refresh_notebook_entry(self, name):
+        """Updates the sidebar row and stats of a notebook from the catalog after it changed."""
+        if name not in self.notebook_names: return
+        index = self.notebook_names.index(name)
+        entry_text = self._format_notebook_entry(name)
+        if self.notebook_listbox.get(index) != entry_text:
+            was_selected = index in self.notebook_listbox.curselection()
+            self.notebook_listbox.delete(index)
+            self.notebook_listbox.insert(index, entry_text)
+            if was_selected: self.notebook_listbox.selection_set(index)
+        if name == self.active_notebook:
+            self.notebook_stats_label.config(text=self._format_notebook_stats(name))
+
+    def _on_notebook_list_hover(self, event):
+        if not self.notebook_names: return
+        index = self.notebook_listbox.nearest(event.y)
+        self.notebook_stats_label.config(text=self._format_notebook_stats(self.notebook_names[index]))
+
+    def _on_notebook_list_leave(self, event):
+        self.notebook_stats_label.config(text=self._format_notebook_stats(self.active_notebook) if self.active_notebook else "")
+
     def poll_queue(self):
         try:
             task = self.task_queue.get_nowait()
-            if task == "CAPTURE_NOTE":
-                self.execute_annotation_capture()
+            if isinstance(task, tuple) and task[0] == "CAPTURE_NOTE":
+                self.execute_annotation_capture(queued_at=task[1])
+            elif isinstance(task, tuple) and task[0] == "EXTERNAL_CHANGES":
+                self._handle_external_changes(task[1], task[2])
+            elif isinstance(task, tuple) and task[0] == "ASSETS_COLLECTED" and task[1]:
+                self.flash_status(f"Removed {task[1]} unused image/note files, freeing {task[2] / (1024 * 1024):.1f} MB.")
         except queue.Empty:
             pass
         finally:
             self.after(100, self.poll_queue)
 
+    def _handle_external_changes(self, notebook_names, assets_changed):
+        """Reloads notebooks changed outside the app; the app's own writes are ignored."""
+        if assets_changed:
+            self._detail_image_cache.clear()
+        changed = {name for name in notebook_names if self.note_manager.is_changed_externally(name)}
+        if not changed: return
+        self.note_manager.get_catalog() # Değişen defterlerin istatistikleri yeniden hesaplanır
+        if any(name not in self.notebook_names or not self.note_manager.notebook_exists(name) for name in changed):
+            # Defter eklenmiş veya silinmiş; liste yeniden kurulur, etkin defter korunur
+            active = self.active_notebook
+            self.populate_notebook_list(select_first=False)
+            if active in self.notebook_names:
+                self.notebook_listbox.selection_set(self.notebook_names.index(active))
+                self.notebook_stats_label.config(text=self._format_notebook_stats(active))
+            elif self.notebook_names:
+                self._select_notebook(self.notebook_names[0])
+                return
+        else:
+            for name in changed: self._refresh_notebook_entry(name)
+        if self.active_notebook in changed:
+            self._update_source_filter()
+            self.populate_notes_treeview()
+            self.flash_status(f"Notebook '{self.active_notebook}' was changed outside the app and has been reloaded.")
+
 # execute_annotation_capture metodunun tamamı (güncellenmiş hali)
-    def execute_annotation_capture(self):
+    def execute_annotation_capture(self, queued_at=None):
         if self.is_capturing:
             return
         self.is_capturing = True
-        self.hotkey_service.stop()
+        # Her aşamanın süresi ölçülür; Diagnostics penceresi ve _capture_latency.jsonl bunlardan beslenir
+        trace = self.capture_latency.start(queued_at)
+        outcome = "error"
+        with trace.span("hotkey_pause"):
+            self.hotkey_service.stop()
         
         try:
             if not self.active_notebook:
+                outcome = "no_notebook"
                 self.flash_status("Error: Please select a notebook in the UI.")
                 return
 
-            source = gw.getActiveWindow().title if gw.getActiveWindow() else "Unknown Source"
-            
-            # 1. Panoda resim var mı diye kontrol et
-            clipboard_image = ImageGrab.grabclipboard()
-
-            if isinstance(clipboard_image, Image.Image):
-                # Resim bulundu!
-                relative_path = self.note_manager.save_image_from_clipboard(clipboard_image)
-                if relative_path:
-                    annotation = {
-                        "timestamp": datetime.now().isoformat(),
-                        "source": source,
-                        "type": "image",
-                        "image_path": relative_path,
-                        "text": "" # Resimler için metin alanı şimdilik boş
-                    }
-                    self.note_manager.add_annotation(self.active_notebook, annotation)
-                    self.flash_status(f"Image saved to '{self.active_notebook}'!")
-                else:
-                    self.flash_status("Capture failed: Could not save image.")
+            pipeline = self.capture_pipeline or self._create_capture_pipeline()
+            outcome, _ = pipeline.capture(self.active_notebook, trace)
+            if outcome == "image":
+                self.flash_status(f"Image saved to '{self.active_notebook}'!")
+            elif outcome == "text":
+                self.flash_status(f"Note saved to '{self.active_notebook}'!")
+            elif outcome == "empty":
+                self.flash_status("Capture failed: No text or image selected.")
             else:
-                # 2. Resim yoksa, metin yakalamaya devam et
-                original_clipboard = pyperclip.paste()
-                pyperclip.copy('')
-
-                if sys.platform == 'darwin':
-                    modifier = keyboard.Key.cmd
-                else:
-                    modifier = keyboard.Key.ctrl
-
-                controller = keyboard.Controller()
-                with controller.pressed(modifier):
-                    controller.press('c')
-                    controller.release('c')
-
-                time.sleep(0.1) # Panonun güncellenmesi için kısa bir bekleme
-                selected_text = pyperclip.paste()
-                pyperclip.copy(original_clipboard)
-
-                if selected_text and not selected_text.isspace():
-                    annotation = {
-                        "timestamp": datetime.now().isoformat(),
-                        "source": source,
-                        "type": "text", # Tipini belirt
-                        "text": selected_text
-                    }
-                    self.note_manager.add_annotation(self.active_notebook, annotation)
-                    self.flash_status(f"Note saved to '{self.active_notebook}'!")
-                else:
-                    self.flash_status("Capture failed: No text or image selected.")
+                self.flash_status("Capture failed: Could not save image.")
 
             # Her iki durumda da arayüzü güncelle
             if self.state() == 'normal':
-                self._update_source_filter()
-                self.populate_notes_treeview()
+                with trace.span("ui_refresh"):
+                    self._update_source_filter()
+                    self.populate_notes_treeview()
 
+        except ImportError as e:
+            logging.error(f"Missing dependency during capture: {e}", exc_info=True)
+            messagebox.showerror("Dependency Error", f"A required library is not installed: {e.name}\nPlease install the requirements using: pip install -r requirements.txt")
         except Exception as e:
             logging.error(f"Error during annotation execution: {e}", exc_info=True)
             self.flash_status("An error occurred during capture.")
         finally:
-            self.hotkey_service.start()
+            with trace.span("hotkey_resume"):
+                self.hotkey_service.start()
             self.is_capturing = False
+            trace.finish(outcome=outcome, notebook=self.active_notebook, clipboard=self.clipboard_backend.name)
  
+    def _create_capture_pipeline(self):
+        import pygetwindow as gw
+        from pynput import keyboard
+        from PIL import Image, ImageGrab
+
+        modifier = keyboard.Key.cmd if sys.platform == 'darwin' else keyboard.Key.ctrl
+        controller = keyboard.Controller()
+
+        def window_title():
+            active_window = gw.getActiveWindow()
+            return active_window.title if active_window else None
+
+        def grab_image():
+            image = ImageGrab.grabclipboard()
+            return image if isinstance(image, Image.Image) else None # Dosya listeleri de dönebilir
+
+        def send_copy():
+            with controller.pressed(modifier):
+                controller.press('c')
+                controller.release('c')
+
+        self.capture_pipeline = CapturePipeline(self.note_manager, self.clipboard_backend, window_title, send_copy, grab_image)
+        return self.capture_pipeline
+
     def restart_hotkey_service(self):
         if self.hotkey_service: self.hotkey_service.stop()
         hotkey_str = self.config_manager.get_setting('Settings', 'hotkey')
-        callback = lambda: self.task_queue.put("CAPTURE_NOTE")
+        callback = lambda: self.task_queue.put(("CAPTURE_NOTE", time.perf_counter()))
         self.hotkey_service = HotkeyService(hotkey_str, callback)
         self.hotkey_service.start()
 
@@ -996,31 +1621,26 @@ class NoteHarvesterApp(tk.Tk):
     def populate_notes_treeview(self):
         if not self.active_notebook: return
         for i in self.notes_tree.get_children(): self.notes_tree.delete(i)
-        self.note_detail_text.config(state="normal"); self.note_detail_text.delete("1.0", tk.END); self.note_detail_text.config(state="disabled")
-        
-        # self.note_detail_text içindeki eski resimleri temizle
-        if hasattr(self, '_detail_view_images'):
-            self._detail_view_images.clear()
-            
-        notes = self.note_manager.load_notes(self.active_notebook)
-        # ... filtreleme mantığı aynı kalıyor ...
+        self._clear_detail_view()
+
         filter_text = self.search_var.get()
         filter_source = self.source_filter_var.get()
-        if filter_text:
-            flags = 0 if self.case_sensitive_var.get() else re.IGNORECASE
-            if self.whole_word_var.get():
-                pattern = r'\b' + re.escape(filter_text) + r'\b'
-            else:
-                pattern = re.escape(filter_text)
-            regex = re.compile(pattern, flags)
-            notes = [n for n in notes if regex.search(n.get('text', '')) or regex.search(n.get('source', ''))]
-        if filter_source and filter_source != "All Sources": notes = [n for n in notes if n.get('source') == filter_source]
-        if self.custom_date_filter:
-            start, end = self.custom_date_filter
-            end_of_day = end + timedelta(days=1)
-            notes = [n for n in notes if start <= datetime.fromisoformat(n.get('timestamp')).date() < end_of_day]
-        
-        notes.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        use_regex = bool(filter_text) and self.regex_search_var.get()
+        notes, notice = self.note_manager.filter_notes(
+            self.active_notebook, filter_text,
+            source=filter_source if filter_source and filter_source != "All Sources" else None,
+            date_range=self.custom_date_filter,
+            case_sensitive=self.case_sensitive_var.get(), whole_word=self.whole_word_var.get(),
+            use_regex=use_regex, fuzzy=self.fuzzy_search_var.get(), ranked=self.ranked_search_var.get(),
+            ranked_limit=self.RANKED_RESULT_LIMIT, regex_time_budget=self.REGEX_TIME_BUDGET,
+            facets=self._filter_facets())
+        if notice:
+            self.flash_status(notice)
+        index_class = self._search_index_class()
+        if (index_class and not self._search_index_poll_job
+                and self.note_manager.get_search_index(self.active_notebook, index_class, wait=False) is None):
+            # İndeks arka planda kuruluyor; hazır olunca liste indeksle (aday notlar, sıralama, bulanık eşleşme) yeniden süzülür
+            self._search_index_poll_job = self.after(self.SEARCH_INDEX_POLL_MS, self._refresh_when_search_index_ready, self.active_notebook)
         self.all_notes_cache[self.active_notebook] = notes
         style = ttk.Style()
         style.configure("Treeview", rowheight=20)
@@ -1035,11 +1655,79 @@ class NoteHarvesterApp(tk.Tk):
             if note_type == "image":
                 summary = "[Image Note]"
             else:
-                text = note.get("text", "")
-                summary = (text[:75] + '...' if len(text) > 75 else text)
+                # Listede yalnızca özet gerekir; dışarıda tutulan gövdeler okunmaz
+                summary = note.preview(75) + ('...' if note.text_length() > 75 else '')
+            tags = note_tags(note)
+            if tags:
+                summary = " ".join(f"#{tag}" for tag in tags) + "  " + summary
             
             self.notes_tree.insert("", tk.END, iid=i, values=(timestamp, source, summary.replace("\n", " ")))
 
+        # Yakalama, birleştirme ve silme işlemlerinden sonra kenar çubuğundaki istatistikleri tazele
+        self._refresh_notebook_entry(self.active_notebook)
+        self._draw_timeline()
+
+    def _draw_timeline(self, event=None):
+        """Draws the capture histogram of the active notebook (or of the selected date range) above the list."""
+        canvas = self.timeline_canvas
+        canvas.delete("all")
+        self._timeline_bins = []
+        if not self.active_notebook: return
+        # Tarih filtresi varken segmentli/arşivli defterlerde yalnızca o aralıkla çakışan kısımlar okunur
+        timeline = self.note_manager.get_timeline(self.active_notebook, self.custom_date_filter)
+        span = self.custom_date_filter or timeline.date_span()
+        if not span: return
+        start, end = span
+        self._timeline_bin_days = 1 if (end - start).days < self.TIMELINE_DAILY_MAX_DAYS else 7
+        self._timeline_bins = timeline.histogram(start, end, self._timeline_bin_days)
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        peak = max(count for _, count in self._timeline_bins) or 1
+        bar_width = width / len(self._timeline_bins)
+        gap = 1 if bar_width > 3 else 0
+        for i, (day, count) in enumerate(self._timeline_bins):
+            if count:
+                bar_height = max(1, count / peak * (height - 4))
+                canvas.create_rectangle(i * bar_width, height - bar_height, (i + 1) * bar_width - gap, height,
+                                        fill="#4a90d9", outline="")
+
+    def _timeline_bin_at(self, x):
+        if not self._timeline_bins: return None
+        i = int(x / max(1, self.timeline_canvas.winfo_width()) * len(self._timeline_bins))
+        return self._timeline_bins[min(max(i, 0), len(self._timeline_bins) - 1)]
+
+    def _on_timeline_hover(self, event):
+        hit = self._timeline_bin_at(event.x)
+        if not hit: return
+        day, count = hit
+        label = day.strftime('%Y-%m-%d') if self._timeline_bin_days == 1 else f"Week of {day.strftime('%Y-%m-%d')}"
+        self.status_bar.config(text=f"{label}: {count} note(s). Click to filter to this {'day' if self._timeline_bin_days == 1 else 'week'}.")
+
+    def _on_timeline_click(self, event):
+        hit = self._timeline_bin_at(event.x)
+        if hit and hit[1]:
+            day = hit[0]
+            self.apply_custom_date_filter(day, day + timedelta(days=self._timeline_bin_days - 1))
+
+    def _search_index_class(self):
+        """The index the current text filter uses (trigrams for regex, words for ranked/fuzzy search), or None."""
+        if not self.search_var.get():
+            return None
+        if self.regex_search_var.get():
+            return TrigramIndex
+        if self.ranked_search_var.get() or self.fuzzy_search_var.get():
+            return SearchIndex
+        return None
+
+    def _refresh_when_search_index_ready(self, notebook_name):
+        self._search_index_poll_job = None
+        index_class = self._search_index_class()
+        if notebook_name != self.active_notebook or not index_class:
+            return
+        if self.note_manager.get_search_index(notebook_name, index_class, wait=False) is None:
+            self._search_index_poll_job = self.after(self.SEARCH_INDEX_POLL_MS, self._refresh_when_search_index_ready, notebook_name)
+        else:
+            self._apply_filters()
+
     def _handle_drag_select(self, event):
         item = self.notes_tree.identify_row(event.y)
         if item: self.notes_tree.selection_add(item)
@@ -1069,6 +1757,14 @@ class NoteHarvesterApp(tk.Tk):
 
         if selection: # Herhangi bir not seçiliyse bu seçenekler görünsün
              context_menu.add_command(label="Rename Source...", command=self._rename_note_source)
+             context_menu.add_command(label="Add Tag...", command=self._add_tag_to_selection)
+             all_notes = self.all_notes_cache.get(self.active_notebook, [])
+             selected_tags = sorted({tag for i in selection for tag in note_tags(all_notes[int(i)])})
+             if selected_tags:
+                 remove_menu = tk.Menu(context_menu, tearoff=0)
+                 for tag in selected_tags:
+                     remove_menu.add_command(label=tag, command=lambda t=tag: self._change_selection_tags(remove=[t]))
+                 context_menu.add_cascade(label="Remove Tag", menu=remove_menu)
         
         if len(selection) > 1:
             context_menu.add_command(label="Merge Selected", command=self.merge_selected_notes)
@@ -1080,17 +1776,114 @@ class NoteHarvesterApp(tk.Tk):
         context_menu.add_command(label="Delete Selected", command=self.delete_selected_notes_from_context)
         context_menu.tk_popup(event.x_root, event.y_root)
 
+    def _add_tag_to_selection(self):
+        answer = simpledialog.askstring("Add Tag", "Tags for the selected note(s), separated by commas:", parent=self)
+        tags = [tag.strip() for tag in (answer or "").split(",") if tag.strip()]
+        if tags:
+            self._change_selection_tags(add=tags)
+
+    def _change_selection_tags(self, add=(), remove=()):
+        """Adds and removes tags on the selected notes in one undoable step."""
+        selection = self.notes_tree.selection()
+        if not selection: return
+        all_notes = self.all_notes_cache.get(self.active_notebook, [])
+        try:
+            changed = self.note_manager.tag_notes(self.active_notebook, [all_notes[int(i)]['timestamp'] for i in selection],
+                                                  add=add, remove=remove)
+        except (KeyError, OSError) as e:
+            messagebox.showerror("Error", f"Could not change the tags; the notebook was not changed.\n\n{e}", parent=self)
+            return
+        self.populate_notes_treeview()
+        self.flash_status(f"Tags updated on {changed} note(s).")
+
+    def _build_facet_filter_menu(self, kind):
+        title = dict(self.FACET_FILTERS)[kind]
+        menu = self.facet_filter_menus[kind]
+        menu.delete(0, tk.END)
+        for child in menu.winfo_children(): child.destroy()
+        values = self.note_manager.get_facet_values(self.active_notebook, kind) if self.active_notebook else []
+        if kind == "month":
+            values.reverse() # En yeni ay en üstte
+        self._facet_filter_vars = [] # Menü değişkenleri çöp toplayıcıya gitmesin
+        if not values:
+            menu.add_command(label=f"No {title.lower()} in this notebook", state="disabled")
+        exclude_menu = tk.Menu(menu, tearoff=0)
+        for value, count in values:
+            include_var = tk.BooleanVar(value=value in self.facet_filter_include[kind])
+            exclude_var = tk.BooleanVar(value=value in self.facet_filter_exclude[kind])
+            self._facet_filter_vars += [include_var, exclude_var]
+            menu.add_checkbutton(label=f"{value} ({count:,})", variable=include_var,
+                                 command=lambda v=value, var=include_var: self._set_facet_filter(kind, v, var.get(), exclude=False))
+            exclude_menu.add_checkbutton(label=value, variable=exclude_var,
+                                         command=lambda v=value, var=exclude_var: self._set_facet_filter(kind, v, var.get(), exclude=True))
+        menu.add_separator()
+        if values:
+            menu.add_cascade(label="Exclude", menu=exclude_menu)
+            if kind == "tag":
+                # Bir notun tek kaynağı ve tek ayı vardır; "hepsi" yalnızca etiketler için anlamlı
+                menu.add_checkbutton(label="Match All Selected Tags", variable=self.tag_match_all_var,
+                                     command=lambda: self._on_facet_filter_changed(kind))
+        menu.add_command(label=f"Clear {title[:-1]} Filter", command=lambda: self._clear_facet_filter(kind))
+
+    def _set_facet_filter(self, kind, value, selected, exclude):
+        include, excluded = self.facet_filter_include[kind], self.facet_filter_exclude[kind]
+        target, other = (excluded, include) if exclude else (include, excluded)
+        if selected:
+            target.add(value)
+            other.discard(value)
+        else:
+            target.discard(value)
+        self._on_facet_filter_changed(kind)
+
+    def _clear_facet_filter(self, kind):
+        self.facet_filter_include[kind].clear()
+        self.facet_filter_exclude[kind].clear()
+        self._on_facet_filter_changed(kind)
+
+    def _on_facet_filter_changed(self, kind):
+        self.facet_filter_btns[kind].config(text=self._facet_filter_label(kind))
+        self._apply_filters()
+
+    def _reset_facet_filters(self):
+        for kind, _ in self.FACET_FILTERS:
+            self.facet_filter_include[kind].clear()
+            self.facet_filter_exclude[kind].clear()
+            self.facet_filter_btns[kind].config(text=self._facet_filter_label(kind))
+
+    def _facet_filter_label(self, kind):
+        include, exclude = self.facet_filter_include[kind], self.facet_filter_exclude[kind]
+        if not include and not exclude:
+            return f"All {dict(self.FACET_FILTERS)[kind]}"
+        joiner = " & " if kind == "tag" and self.tag_match_all_var.get() else " | "
+        parts = [joiner.join(sorted(include))] if include else []
+        return ", ".join(parts + [f"not {value}" for value in sorted(exclude)])
+
+    def _filter_facets(self):
+        """
+        The tag, source and month menus as filter_notes facets: any included value of each menu
+        (every included tag with Match All), and none of the excluded ones.
+        """
+        groups, exclude = [], []
+        for kind, _ in self.FACET_FILTERS:
+            include = [(kind, value) for value in sorted(self.facet_filter_include[kind])]
+            if kind == "tag" and self.tag_match_all_var.get():
+                groups.extend([key] for key in include)
+            elif include:
+                groups.append(include)
+            exclude.extend((kind, value) for value in sorted(self.facet_filter_exclude[kind]))
+        return (groups, exclude) if groups or exclude else None
+
     def _copy_from_context(self, key, multi=False):
         selection = self.notes_tree.selection()
         if not selection: return
         if not multi:
             note = self.all_notes_cache.get(self.active_notebook, [])[int(selection[0])]
-            pyperclip.copy(note.get(key, ''))
+            self.clipboard_backend.copy(note.get(key, ''))
             self.flash_status(f"{key.capitalize()} copied to clipboard!")
         else:
             all_notes = self.all_notes_cache.get(self.active_notebook, [])
             texts = [all_notes[int(i)].get(key, '') for i in selection]
-            pyperclip.copy("\n\n---\n\n".join(texts))
+            self.clipboard_backend.copy("\n\n---\n\n".join(texts))
             self.flash_status(f"{len(selection)} texts copied to clipboard!")
 
     def _create_zoom_bindings(self, widget, font_obj):
@@ -1102,6 +1895,71 @@ class NoteHarvesterApp(tk.Tk):
             if font_obj.cget("size") > 6: font_obj.configure(size=font_obj.cget("size") - 1)
         return "break"
 
+    def show_memory_usage(self):
+        report = self.note_manager.memory_report()
+        if not report:
+            messagebox.showinfo("Memory Usage", "No notebook is loaded in memory.", parent=self)
+            return
+        def mb(size): return f"{size / (1024 * 1024):.1f} MB"
+        lines = [f"{name}: {count} notes, {mb(size)}" for name, count, size, _ in report]
+        total = sum(r[2] for r in report)
+        as_dicts = sum(r[3] for r in report)
+        lines.append("")
+        lines.append(f"Total: {mb(total)} (about {mb(as_dicts)} if every note were a separate dict)")
+        # Görünüm listeleri aynı Note nesnelerini paylaşır, yalnızca liste başına işaretçi tutulur
+        views = sum(len(notes) for notes in self.all_notes_cache.values())
+        lines.append(f"Filtered views: {views} references to the same notes")
+        messagebox.showinfo("Memory Usage", "\n".join(lines), parent=self)
+
+    def open_global_search(self):
+        GlobalSearchWindow(self)
+
+    def _update_edit_menu(self):
+        undo_label = self.note_manager.undo_label(self.active_notebook) if self.active_notebook else None
+        redo_label = self.note_manager.redo_label(self.active_notebook) if self.active_notebook else None
+        self.edit_menu.entryconfig(0, label=f"Undo {undo_label} (Ctrl+Z)" if undo_label else "Undo (Ctrl+Z)",
+                                   state=tk.NORMAL if undo_label else tk.DISABLED)
+        self.edit_menu.entryconfig(1, label=f"Redo {redo_label} (Ctrl+Y)" if redo_label else "Redo (Ctrl+Y)",
+                                   state=tk.NORMAL if redo_label else tk.DISABLED)
+
+    def undo_last_change(self, event=None):
+        self._replay_note_history(event, undo=True)
+
+    def redo_last_change(self, event=None):
+        self._replay_note_history(event, undo=False)
+
+    def _replay_note_history(self, event, undo):
+        # Arama kutusundaki Ctrl+Z/Ctrl+Y defteri etkilemesin
+        if event is not None and isinstance(self.focus_get(), (tk.Entry, tk.Text)): return
+        if not self.active_notebook: return
+        try:
+            if undo: label = self.note_manager.undo(self.active_notebook)
+            else: label = self.note_manager.redo(self.active_notebook)
+        except (KeyError, ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Could not {'undo' if undo else 'redo'} the last change:\n\n{e}", parent=self)
+            return
+        if label is None:
+            self.flash_status(f"Nothing to {'undo' if undo else 'redo'}.")
+            return
+        self._update_source_filter()
+        self.populate_notes_treeview()
+        self.flash_status(f"{'Undid' if undo else 'Redid'}: {label}")
+
+    def reveal_note(self, notebook_name, timestamp):
+        """Switches to a notebook, clears the filters and selects the note with the given timestamp."""
+        self.custom_date_filter = None
+        self.date_filter_btn.config(text="All Time")
+        self.search_var.set("")
+        self._select_notebook(notebook_name)
+        for i, note in enumerate(self.all_notes_cache.get(notebook_name, [])):
+            if note.get('timestamp') == timestamp:
+                self.notes_tree.selection_set(str(i))
+                self.notes_tree.focus(str(i))
+                self.notes_tree.see(str(i))
+                self.on_note_select()
+                break
+        self.show_window()
+
     def open_date_range_window(self):
         DateRangeWindow(self)
 
@@ -1113,12 +1971,24 @@ class NoteHarvesterApp(tk.Tk):
     def _apply_filters(self, *args):
         self.populate_notes_treeview()
 
+    def _on_regex_toggled(self, *args):
+        if self.regex_search_var.get():
+            # Düzenli ifadeler ayrı süreçte aranır; süreç, kullanıcı deseni yazarken açılsın
+            try:
+                self.note_manager.regex_worker.start()
+            except OSError as e:
+                logging.error(f"Could not start the regex worker: {e}")
+        self._apply_filters()
+
     def on_notebook_select(self, event=None):
         selection = self.notebook_listbox.curselection()
         if not selection: return
-        self.active_notebook = self.notebook_listbox.get(selection[0])
+        self.active_notebook = self.notebook_names[selection[0]]
         self.status_bar.config(text=f"Active Notebook: {self.active_notebook}")
+        self.notebook_stats_label.config(text=self._format_notebook_stats(self.active_notebook))
         self._update_source_filter()
+        # Etiket, kaynak ve aylar deftere özgüdür; defter değişince bu süzgeçler sıfırlanır
+        self._reset_facet_filters()
         self._apply_filters()
 
 # on_note_select metodunun tamamı (güncellenmiş hali)
@@ -1128,11 +1998,20 @@ class NoteHarvesterApp(tk.Tk):
         if not item_id: return
         
         note = self.all_notes_cache.get(self.active_notebook, [])[int(item_id)]
+        self._cancel_detail_loading()
+        self._schedule_related_notes(note)
         
+        note_type = note.get("type", "text")
+        text = note.get("text", "")
+
+        if note_type != "image" and len(text) > self.DETAIL_PREVIEW_CHARS:
+            # Büyük not: önizlemeyi hemen göster, kalanını parça parça yükle
+            self._show_large_note(note, text)
+            return
+
+        self._show_detail_widget(self._detail_primary_text)
         self.note_detail_text.config(state="normal")
         self.note_detail_text.delete("1.0", tk.END)
-        
-        note_type = note.get("type", "text")
 
         if note_type == "image" and "image_path" in note:
             # Resim notunu göster
@@ -1141,25 +2020,13 @@ class NoteHarvesterApp(tk.Tk):
                 full_image_path = os.path.join(self.note_manager.user_data_path, note['image_path'])
                 
                 if os.path.exists(full_image_path):
-                    # Resmi yeniden boyutlandırarak göster
-                    img = Image.open(full_image_path)
-                    
                     # Pencere genişliğine sığdır
                     max_width = self.note_detail_text.winfo_width() - 20 # Kenar boşlukları için pay
                     if max_width < 50: max_width = 400 # Başlangıçta genişlik 0 olabilir, varsayılan bir değer kullan
                     
-                    if img.width > max_width:
-                        ratio = max_width / img.width
-                        new_height = int(img.height * ratio)
-                        img = img.resize((max_width, new_height), Image.LANCZOS)
-
-                    # Tkinter'in anlayacağı formata çevir
+                    photo = self._get_detail_photo(full_image_path, max_width)
                     # Referansını saklamalıyız yoksa garbage collector siler!
-                    if not hasattr(self, '_detail_view_images'):
-                        self._detail_view_images = []
-                    
-                    photo = ImageTk.PhotoImage(img)
-                    self._detail_view_images.append(photo) # Referansı sakla
+                    self._detail_view_images = [photo]
                     
                     self.note_detail_text.image_create(tk.END, image=photo)
                 else:
@@ -1168,10 +2035,138 @@ class NoteHarvesterApp(tk.Tk):
                 self.note_detail_text.insert("1.0", f"[Error loading image: {e}]")
         else:
             # Metin notunu göster
-            self.note_detail_text.insert("1.0", note.get("text", ""))
+            self.note_detail_text.insert("1.0", text)
 
         self.note_detail_text.config(state="disabled")
 
+    def _create_detail_text_widget(self):
+        widget = tk.Text(self.detail_frame, wrap=tk.WORD, padx=5, pady=5, font=self.detail_font)
+        widget.config(state="disabled")
+        self._create_zoom_bindings(widget, self.detail_font)
+        return widget
+
+    def _show_detail_widget(self, widget):
+        """Swaps the visible detail Text widget without touching its content."""
+        if widget is self.note_detail_text: return
+        self.note_detail_text.pack_forget()
+        widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=(5,0))
+        self.note_detail_text = widget
+
+    def _clear_detail_view(self):
+        self._cancel_detail_loading()
+        self._show_detail_widget(self._detail_primary_text)
+        self.note_detail_text.config(state="normal"); self.note_detail_text.delete("1.0", tk.END); self.note_detail_text.config(state="disabled")
+        self._detail_view_images = []
+        self._clear_related_notes()
+
+    def _clear_related_notes(self):
+        if self._related_job:
+            self.after_cancel(self._related_job)
+            self._related_job = None
+        self.related_tree.delete(*self.related_tree.get_children())
+        self._related_notes = {}
+        self.related_status_label.config(text="")
+
+    def _schedule_related_notes(self, note):
+        if self._related_job:
+            self.after_cancel(self._related_job)
+        self._related_job = self.after(self.RELATED_DELAY_MS, self._show_related_notes, self.active_notebook, note)
+
+    def _refresh_related_notes(self):
+        item_id = self.notes_tree.focus()
+        if item_id and self.active_notebook and self.detail_view_visible:
+            self._schedule_related_notes(self.all_notes_cache.get(self.active_notebook, [])[int(item_id)])
+
+    def _show_related_notes(self, notebook_name, note):
+        """Lists the notes most similar to note; polls again while notebook indexes are being built."""
+        self._related_job = None
+        if notebook_name != self.active_notebook:
+            return
+        results, pending = self.note_manager.related_notes(notebook_name, note, self.RELATED_LIMIT,
+                                                           all_notebooks=self.related_all_var.get())
+        self.related_tree.delete(*self.related_tree.get_children())
+        self._related_notes = {}
+        for score, related_notebook, related in results:
+            summary = related.preview(75) + ('...' if related.text_length() > 75 else '')
+            iid = self.related_tree.insert("", tk.END, values=(f"{score:.0%}", related_notebook, related.get("source", ""),
+                                                               summary.replace("\n", " ")))
+            self._related_notes[iid] = (related_notebook, related.get("timestamp"))
+        if pending:
+            self.related_status_label.config(text=f"Indexing {pending} notebook(s)...")
+            self._related_job = self.after(self.RELATED_INDEX_POLL_MS, self._show_related_notes, notebook_name, note)
+        else:
+            self.related_status_label.config(text="" if results or note.get("type", "text") == "image" else "No similar notes.")
+
+    def _open_related_note(self, event=None):
+        selection = self.related_tree.focus()
+        if selection in self._related_notes:
+            self.reveal_note(*self._related_notes[selection])
+
+    def _cancel_detail_loading(self):
+        if self._detail_load_job:
+            self.after_cancel(self._detail_load_job)
+            self._detail_load_job = None
+
+    def _show_large_note(self, note, text):
+        """
+        Shows a large text note from the widget cache, creating it with a preview if needed.
+        The rest of the text is appended in chunks from the event loop.
+        """
+        key = (self.active_notebook, note.get("timestamp"), hash(text))
+        entry = self._detail_widget_cache.get(key)
+        if entry is None:
+            widget = self._create_detail_text_widget()
+            widget.config(state="normal")
+            widget.insert("1.0", text[:self.DETAIL_PREVIEW_CHARS])
+            widget.config(state="disabled")
+            # [widget, metin, şimdiye kadar yüklenen karakter sayısı]
+            entry = [widget, text, self.DETAIL_PREVIEW_CHARS]
+            self._detail_widget_cache[key] = entry
+            self._evict_detail_widgets()
+        else:
+            self._detail_widget_cache.move_to_end(key)
+        self._show_detail_widget(entry[0])
+        if entry[2] < len(text):
+            self._detail_load_job = self.after(self.DETAIL_CHUNK_DELAY_MS, lambda: self._load_detail_chunk(entry))
+
+    def _load_detail_chunk(self, entry):
+        self._detail_load_job = None
+        widget, text, offset = entry
+        end = offset + self.DETAIL_CHUNK_CHARS
+        widget.config(state="normal")
+        widget.insert(tk.END, text[offset:end])
+        widget.config(state="disabled")
+        entry[2] = min(end, len(text))
+        if entry[2] < len(text):
+            self._detail_load_job = self.after(self.DETAIL_CHUNK_DELAY_MS, lambda: self._load_detail_chunk(entry))
+
+    def _evict_detail_widgets(self):
+        while len(self._detail_widget_cache) > self.DETAIL_CACHE_SIZE:
+            _, (widget, _, _) = self._detail_widget_cache.popitem(last=False)
+            if widget is self.note_detail_text:
+                self._show_detail_widget(self._detail_primary_text)
+            widget.destroy()
+
+    def _get_detail_photo(self, image_path, max_width):
+        """Returns a PhotoImage scaled to max_width, decoding and resizing only on a cache miss."""
+        key = (image_path, max_width, os.path.getmtime(image_path))
+        photo = self._detail_image_cache.get(key)
+        if photo is not None:
+            self._detail_image_cache.move_to_end(key)
+            return photo
+        from PIL import Image, ImageTk
+        img = Image.open(image_path)
+        if img.width > max_width:
+            ratio = max_width / img.width
+            new_height = int(img.height * ratio)
+            img = img.resize((max_width, new_height), Image.LANCZOS)
+        # Tkinter'in anlayacağı formata çevir
+        photo = ImageTk.PhotoImage(img)
+        self._detail_image_cache[key] = photo
+        while len(self._detail_image_cache) > self.DETAIL_IMAGE_CACHE_SIZE:
+            self._detail_image_cache.popitem(last=False)
+        return photo
+
     def flash_status(self, message, duration=3000):
         self.status_bar.config(text=message)
         self.after(duration, lambda: self.status_bar.config(text=f"Active Notebook: {self.active_notebook}"))
@@ -1186,40 +2181,48 @@ class NoteHarvesterApp(tk.Tk):
 
 
     def create_tray_icon(self):
-        # --- BAŞLANGIÇ: TEPSİ İKONUNU DOSYADAN YÜKLEME ---
+        from pystray import Icon as TrayIcon, Menu as TrayMenu, MenuItem as TrayMenuItem
         try:
-            # Pencere ikonu için kullandığımız güvenilir yol bulma mantığının aynısı
-            if getattr(sys, 'frozen', False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.abspath(__file__))
-
-            # .png dosyasının tam yolunu oluştur
-            icon_path = os.path.join(base_path, 'icon.png')
-            
-            # Pillow (PIL) kullanarak ikonu dosyadan aç
-            image = Image.open(icon_path)
-
+            from PIL import Image
+            # Pencere ikonu için önbelleğe alınan küçük ikonu kullan
+            image = Image.open(self._get_small_icon_path())
         except Exception as e:
             # Eğer ikon dosyası bulunamazsa veya bir hata olursa, programın çökmesini engelle
             # ve eski, programatik olarak oluşturulan ikonu kullan.
             print(f"Could not load tray icon from file, generating default: {e}")
             image = self.generate_tray_icon_image()
-        # --- SON: TEPSİ İKONUNU DOSYADAN YÜKLEME ---
 
         menu = TrayMenu(TrayMenuItem("Show", self.show_window, default=True), TrayMenuItem("Exit", self.quit_app))
         self.tray_icon = TrayIcon("NoteHarvester", image, "Note Harvester", menu)
         threading.Thread(target=self.tray_icon.run, daemon=True).start()
 
+    def minimize_to_tray(self):
+        """Hides the window to the system tray, creating the tray icon on first use."""
+        if not self.tray_icon:
+            try:
+                self.create_tray_icon()
+            except Exception as e:
+                # Tepsi ikonu yoksa pencere gizlenmemeli, yoksa geri getirilemez
+                logging.error(f"Failed to create tray icon: {e}", exc_info=True)
+                messagebox.showerror("Tray Error", f"Could not create the system tray icon: {e}", parent=self)
+                return
+        self.withdraw()
+
     def on_closing(self):
         if messagebox.askyesno("Exit", "Do you want to exit the application completely?\n\n(Select 'No' to minimize to the system tray)"):
             self.quit_app()
         else:
-            self.withdraw()
+            self.minimize_to_tray()
 
     def quit_app(self):
         if self.hotkey_service: self.hotkey_service.stop()
         if self.tray_icon: self.tray_icon.stop()
+        if self.notebook_watcher: self.notebook_watcher.stop()
+        self.note_manager.save_asset_index()
+        folder = self._save_profile()
+        if folder: print(f"Profiles saved to {folder}")
+        self.clipboard_backend.close()
+        self.note_manager.regex_worker.stop()
         self.destroy()
 
     def show_window(self):
@@ -1227,6 +2230,7 @@ class NoteHarvesterApp(tk.Tk):
 
 
     def generate_tray_icon_image(self):
+        from PIL import Image, ImageDraw
         image = Image.new('RGB', (64, 64), '#333333')
         dc = ImageDraw.Draw(image)
         dc.text((18, 18), "H", fill='#FFFFFF', font_size=32)
@@ -1237,14 +2241,13 @@ class NoteHarvesterApp(tk.Tk):
         if name and name.strip():
             if self.note_manager.create_notebook(name.strip()):
                 self.populate_notebook_list(select_first=False)
-                for i, item in enumerate(self.notebook_listbox.get(0, tk.END)):
-                    if item == name.strip(): self.notebook_listbox.selection_set(i); self.on_notebook_select(); break
+                self._select_notebook(name.strip())
             else: messagebox.showwarning("Error", f"A notebook named '{name}' already exists.", parent=self)
 
     def delete_selected_notebook(self):
         selection = self.notebook_listbox.curselection()
         if not selection: messagebox.showinfo("Information", "Please select a notebook to delete.", parent=self); return
-        name = self.notebook_listbox.get(selection[0])
+        name = self.notebook_names[selection[0]]
         if messagebox.askyesno("Confirm Deletion", f"Are you sure you want to permanently delete the notebook '{name}' and all its contents?", parent=self):
             self.note_manager.delete_notebook(name)
             self.populate_notebook_list()
@@ -1270,29 +2273,23 @@ class NoteHarvesterApp(tk.Tk):
         merged_text = "\n\n---\n\n".join(note.get("text", "") for note in selected_notes)
         new_note = {"timestamp": datetime.now().isoformat(), "source": new_source, "text": merged_text}
         
-        # Get the full list of notes from the file to ensure we don't lose anything
-        # This is safer than relying on the potentially filtered cache
-        full_note_list = self.note_manager.load_notes(self.active_notebook)
-        
-        # Create a set of the texts of the notes to be deleted for accurate removal
-        texts_to_delete = {note['text'] for note in selected_notes}
-        timestamps_to_delete = {note['timestamp'] for note in selected_notes}
-
-        # Filter out the original notes from the full list
-        remaining_notes = [
-            note for note in full_note_list 
-            if not (note.get('text') in texts_to_delete and note.get('timestamp') in timestamps_to_delete)
-        ]
-        
-        remaining_notes.append(new_note)
-        
-        self.note_manager.save_notes(self.active_notebook, remaining_notes)
+        # Replace the originals (by their unique timestamps) with the merged note in one write.
+        # The transaction works on the full notebook, not the potentially filtered cache.
+        try:
+            with self.note_manager.transaction(self.active_notebook, label="Merge Notes") as tx:
+                for note in selected_notes:
+                    tx.delete(note['timestamp'])
+                tx.insert(new_note)
+        except (KeyError, ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Could not merge notes; the notebook was not changed.\n\n{e}", parent=self)
+            return
         
         # --- START OF FIX ---
         # Clear all active filters to ensure the new merged note is visible.
         # This prevents the "Item not found" error when filters would hide the new note.
         self.search_var.set("")
         self.source_filter_var.set("All Sources")
+        self._reset_facet_filters()
         self.custom_date_filter = None
         self.date_filter_btn.config(text="All Time")
         
@@ -1321,30 +2318,20 @@ class NoteHarvesterApp(tk.Tk):
             return
             
         if messagebox.askyesno("Confirm Deletion", f"Are you sure you want to delete {len(selection)} note(s)?", parent=self):
-            all_notes_from_file = self.note_manager.load_notes(self.active_notebook)
-            
             # Mevcut görünümdeki (filtrelenmiş) notlar
             notes_in_view = self.all_notes_cache.get(self.active_notebook, [])
-            
-            # Silinecek notların benzersiz kimliklerini (timestamp) topla
-            timestamps_to_delete = set()
-            for item_id in selection:
-                note_to_delete = notes_in_view[int(item_id)]
-                timestamps_to_delete.add(note_to_delete.get('timestamp'))
-                
-                # Eğer bu bir resim notuysa, dosyasını sil
-                if note_to_delete.get('type') == 'image' and 'image_path' in note_to_delete:
-                    try:
-                        image_path = os.path.join(self.note_manager.user_data_path, note_to_delete['image_path'])
-                        if os.path.exists(image_path):
-                            os.remove(image_path)
-                    except Exception as e:
-                        print(f"Could not delete image file {image_path}: {e}")
-
-            # Tam listeden bu notları çıkar
-            remaining_notes = [note for note in all_notes_from_file if note.get('timestamp') not in timestamps_to_delete]
-            
-            self.note_manager.save_notes(self.active_notebook, remaining_notes)
+            notes_to_delete = [notes_in_view[int(item_id)] for item_id in selection]
+
+            # Notlar benzersiz kimlikleriyle (timestamp) tek bir işlemde silinir
+            try:
+                with self.note_manager.transaction(self.active_notebook, label="Delete Notes") as tx:
+                    for note in notes_to_delete:
+                        tx.delete(note.get('timestamp'))
+            except (KeyError, OSError) as e:
+                messagebox.showerror("Error", f"Could not delete the notes; the notebook was not changed.\n\n{e}", parent=self)
+                return
+
+            # Resim dosyaları silme geri alınabilsin diye hemen değil, varlık toplayıcısı tarafından kaldırılır
             self.populate_notes_treeview()
             self.flash_status("Note(s) deleted.")
 
@@ -1369,55 +2356,10 @@ class NoteHarvesterApp(tk.Tk):
 
     def _update_source_filter(self):
         if not self.active_notebook: return
-        notes = self.note_manager.load_notes(self.active_notebook)
-        sources = sorted(list(set(n.get('source', 'Unknown') for n in notes)))
+        sources = self.note_manager.get_sources(self.active_notebook)
         self.source_filter_combo['values'] = ["All Sources"] + sources
         self.source_filter_var.set("All Sources")
 
-# generate_markdown metodunun tamamı (güncellenmiş hali)
-    def generate_markdown(self, notes, notebook_name, filter_description=""):
-        # ... (metodun başındaki YAML header kısmı aynı kalıyor) ...
-        yaml_header = """---
-geometry: "a4paper, margin=2.5cm"
-header-includes:
-  - \\usepackage{ragged2e}
-  - \\RaggedRight
-  - \\setlength{\\parindent}{0pt}
-  - \\usepackage{parskip}
-  - \\newcommand{\\fullwidthline}{\\noindent\\rule{\\linewidth}{0.4pt}}
----
-"""
-        md_lines = [yaml_header]
-        md_lines.append(f"# {self._escape_latex(notebook_name)}\n")
-        if filter_description:
-            md_lines.append(f"*{self._escape_latex(f'Filters: {filter_description}')}*\n")
-        md_lines.append("\\vspace{1em}\n")
-
-        for i, note in enumerate(notes):
-            if i > 0:
-                md_lines.append("\\fullwidthline\n")
-
-            timestamp = note.get("timestamp", "Unknown")
-            try:
-                timestamp = datetime.fromisoformat(timestamp).strftime('%Y-%m-%d %H:%M:%S')
-            except: pass
-            
-            source = self._escape_latex(note.get("source", "Unknown"))
-            
-            md_lines.append(f"### {timestamp} | {source}\n")
-
-            # Not tipine göre içeriği ekle
-            if note.get("type") == "image" and "image_path" in note:
-                # Markdown resim sözdizimi: ![alt text](path)
-                # Pandoc, geçici dizindeki göreli yolları anlar
-                image_filename = os.path.basename(note['image_path'])
-                md_lines.append(f"![{image_filename}]({image_filename})\n")
-            else:
-                text = self._escape_latex(note.get("text", ""))
-                md_lines.append(f"\n{text}\n")
-            
-        return "\n".join(md_lines)
-
     def _get_active_filters_description(self) -> str:
         """Generates a human-readable string describing active filters."""
         filters = []
@@ -1431,6 +2373,11 @@ header-includes:
         if source_filter and source_filter != "All Sources":
             filters.append(f"Source is '{source_filter}'")
 
+        # Tag, Source and Month Menus
+        for kind, title in self.FACET_FILTERS:
+            if self.facet_filter_include[kind] or self.facet_filter_exclude[kind]:
+                filters.append(f"{title}: {self._facet_filter_label(kind)}")
+
         # Date Filter
         if self.custom_date_filter:
             start, end = self.custom_date_filter
@@ -1462,7 +2409,7 @@ header-includes:
         
         notebook_name = self.active_notebook
         filter_desc = self._get_active_filters_description()
-        md_content = self.generate_markdown(notes, notebook_name, filter_desc)
+        md_content = generate_markdown(notes, notebook_name, filter_desc)
         
         with tempfile.TemporaryDirectory() as tmpdir:
             from tkinter import filedialog
@@ -1515,8 +2462,29 @@ header-includes:
                 messagebox.showerror("Error", f"An unexpected error occurred during export: {e}", parent=self)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Paketlenmiş Windows sürümünde düzenli ifade işçi süreci için
+    # Çekirdek modül günlüğü yapılandırmaz; dosyaya yazma yalnızca uygulama çalışırken açılır
+    logging.basicConfig(
+        level=logging.ERROR,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filename='note_harvester_crash.log',
+        filemode='w'
+    )
+    parser = argparse.ArgumentParser(description="Capture selected text from any application into notebooks.")
+    parser.add_argument("--startup-trace", action="store_true", help="print how long each startup phase takes")
+    parser.add_argument("--profile", action="store_true", help="profile every UI action (startup included) and save the results to the data folder on exit")
+    parser.add_argument("--compact", action="store_true", help="compress cold notebooks into archives and exit")
+    parser.add_argument("--cold-days", type=int, default=90, help="with --compact: archive notebooks with no capture in this many days (default: 90)")
+    parser.add_argument("--codec", choices=sorted(NotebookArchive.CODECS), default="zlib", help="with --compact: compression codec (default: zlib)")
+    args = parser.parse_args()
+    if args.compact:
+        results = NoteManager().compact_cold_notebooks(args.cold_days, args.codec)
+        for name, old_size, new_size in results:
+            print(f"{name}: {old_size / 1024:,.0f} KB -> {new_size / 1024:,.0f} KB")
+        print(f"Compacted {len(results)} notebook(s).")
+        sys.exit(0)
     try:
-        app = NoteHarvesterApp()
+        app = NoteHarvesterApp(startup_trace=StartupTrace(enabled=args.startup_trace), profile=args.profile)
         app.mainloop()
     except Exception as e:
         logging.critical("Application encountered a fatal error!", exc_info=True)
@@ -0,0 +1,3120 @@
+"""
+Note Harvester's engine: the note store (NoteManager and its storage layouts), search indexes,
+list filters, transactions and Markdown export. It imports only the standard library and
+has no GUI or input-hook dependencies, so CLI tools, benchmarks and worker processes can use
+it without loading tkinter; note-harvester.py is the Tk front end on top of it.
+"""
+import time
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+import logging
+import multiprocessing
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, Counter, deque
+import re
+import shutil
+import sys
+import hashlib
+import contextlib
+import mmap
+import struct
+import zlib
+import lzma
+import math
+import heapq
+import bisect
+import fnmatch
+import cProfile
+import pstats
+from array import array
+try:
+    from re import _parser as _sre_parse # Python 3.11+
+except ImportError:
+    import sre_parse as _sre_parse
+
+def build_search_regex(text, case_sensitive=False, whole_word=False):
+    """Compiles the search box text into the regex used by the note filters."""
+    flags = 0 if case_sensitive else re.IGNORECASE
+    if whole_word:
+        pattern = r'\b' + re.escape(text) + r'\b'
+    else:
+        pattern = re.escape(text)
+    return re.compile(pattern, flags)
+
+def compile_user_regex(pattern, case_sensitive=False, whole_word=False):
+    """
+    Compiles a regular expression typed into the search box. Raises re.error for invalid
+    patterns and for repeated alternations whose branches can match the same text, as in
+    (a|aa)* or (a|a)*, which backtrack exponentially. Other slow patterns are left to the
+    regex worker's time limit.
+    """
+    if _has_ambiguous_alternation(_sre_parse.parse(pattern), ignore_case=not case_sensitive):
+        raise re.error("repeated alternatives that can match the same text, such as (a|aa)*, are not allowed")
+    if whole_word:
+        pattern = r'\b(?:' + pattern + r')\b'
+    return re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+
+_REPEAT_OPS = {_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT, getattr(_sre_parse, "POSSESSIVE_REPEAT", None)}
+_ATOMIC_GROUP = getattr(_sre_parse, "ATOMIC_GROUP", None) # Python 3.11+
+
+def _subpatterns(op, av):
+    """Yields the nested pattern sequences of one parsed regex node."""
+    if op == _sre_parse.SUBPATTERN or op in _REPEAT_OPS:
+        yield av[-1]
+    elif op == _sre_parse.BRANCH:
+        yield from av[1]
+    elif op in (_sre_parse.ASSERT, _sre_parse.ASSERT_NOT):
+        yield av[1]
+    elif op is not None and op == _ATOMIC_GROUP:
+        yield av
+
+def _has_ambiguous_alternation(parsed, loop_first=None, ignore_case=True):
+    """
+    True if an alternation inside a repeat has two branches that can start with the same
+    character. loop_first is the first-character set of the innermost enclosing repeat
+    (None outside repeats): a branch that matches nothing is followed by the rest of the
+    repeat body or by the next round of the repeat.
+    """
+    for k, (op, av) in enumerate(parsed):
+        if op == _sre_parse.BRANCH and loop_first is not None:
+            follow, nullable = _first_chars(parsed[k + 1:], ignore_case)
+            if nullable:
+                follow = _union_chars(follow, loop_first)
+            firsts = []
+            for branch in av[1]:
+                first, empty = _first_chars(branch, ignore_case)
+                firsts.append(_union_chars(first, follow) if empty else first)
+            for a in range(len(firsts)):
+                for b in range(a + 1, len(firsts)):
+                    # (a|a)*, (a|aa)*: aynı metin katlanarak artan sayıda yoldan eşleşir
+                    if av[1][a] == av[1][b] or _chars_overlap(firsts[a], firsts[b]):
+                        return True
+        for sub in _subpatterns(op, av):
+            inner = loop_first
+            if op in _REPEAT_OPS and av[1] > 1:
+                inner = _first_chars(sub, ignore_case)[0]
+            if _has_ambiguous_alternation(sub, inner, ignore_case):
+                return True
+    return False
+
+def _first_chars(parsed, ignore_case):
+    """
+    (first, nullable) of a parsed sequence: the characters a match can start with, as
+    (characters, categories) with characters lower-cased when ignore_case, or None when they
+    cannot be listed (., negated sets, backreferences); and whether it can match nothing.
+    """
+    first = (set(), set())
+    for op, av in parsed:
+        if op == _sre_parse.AT: # ^, $, \b karakter tüketmez
+            continue
+        if op == _sre_parse.LITERAL or op == _sre_parse.IN:
+            return _union_chars(first, _set_chars(op, av, ignore_case)), False
+        if op == _sre_parse.SUBPATTERN or op in _REPEAT_OPS:
+            sub, nullable = _first_chars(av[-1], ignore_case)
+            nullable = nullable or (op in _REPEAT_OPS and av[0] == 0)
+        elif op == _sre_parse.BRANCH:
+            sub, nullable = (set(), set()), False
+            for branch in av[1]:
+                branch_first, branch_nullable = _first_chars(branch, ignore_case)
+                sub = _union_chars(sub, branch_first)
+                nullable = nullable or branch_nullable
+        else:
+            return None, False
+        first = _union_chars(first, sub)
+        if not nullable:
+            return first, False
+    return first, True
+
+def _set_chars(op, av, ignore_case):
+    fold = str.lower if ignore_case else str
+    if op == _sre_parse.LITERAL:
+        return {fold(chr(av))}, set()
+    chars, categories = set(), set()
+    for item_op, item in av:
+        if item_op == _sre_parse.LITERAL:
+            chars.add(fold(chr(item)))
+        elif item_op == _sre_parse.RANGE and item[1] - item[0] <= 512:
+            chars.update(fold(chr(c)) for c in range(item[0], item[1] + 1))
+        elif item_op == _sre_parse.CATEGORY and item in _CATEGORY_RES:
+            categories.add(item)
+        else:
+            return None
+    return chars, categories
+
+def _union_chars(a, b):
+    if a is None or b is None:
+        return None
+    return a[0] | b[0], a[1] | b[1]
+
+_CATEGORY_RES = {
+    _sre_parse.CATEGORY_DIGIT: re.compile(r'\d'),
+    _sre_parse.CATEGORY_NOT_DIGIT: re.compile(r'\D'),
+    _sre_parse.CATEGORY_WORD: re.compile(r'\w'),
+    _sre_parse.CATEGORY_NOT_WORD: re.compile(r'\W'),
+    _sre_parse.CATEGORY_SPACE: re.compile(r'\s'),
+    _sre_parse.CATEGORY_NOT_SPACE: re.compile(r'\S'),
+}
+_DISJOINT_CATEGORIES = {frozenset(pair) for pair in (
+    (_sre_parse.CATEGORY_SPACE, _sre_parse.CATEGORY_DIGIT), (_sre_parse.CATEGORY_SPACE, _sre_parse.CATEGORY_WORD),
+    (_sre_parse.CATEGORY_SPACE, _sre_parse.CATEGORY_NOT_SPACE), (_sre_parse.CATEGORY_DIGIT, _sre_parse.CATEGORY_NOT_DIGIT),
+    (_sre_parse.CATEGORY_WORD, _sre_parse.CATEGORY_NOT_WORD), (_sre_parse.CATEGORY_DIGIT, _sre_parse.CATEGORY_NOT_WORD))}
+
+def _chars_overlap(a, b):
+    # Sayılamayan kümeler çakışmıyor sayılır; böyle desenleri işçi sürecin süre sınırı durdurur
+    if a is None or b is None:
+        return False
+    if a[0] & b[0]:
+        return True
+    for chars, categories in ((a[0], b[1]), (b[0], a[1])):
+        if any(_CATEGORY_RES[category].match(c) for category in categories for c in chars):
+            return True
+    return any(x == y or frozenset((x, y)) not in _DISJOINT_CATEGORIES for x in a[1] for y in b[1])
+
+def regex_required_literals(regex):
+    """
+    Returns literal strings (lower-cased, at least 3 characters) that every match of the regex
+    must contain. Alternations and optional parts contribute nothing, so the result may be empty.
+    """
+    literals = []
+    def walk(parsed):
+        run = []
+        for op, av in parsed:
+            if op == _sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            if op == _sre_parse.AT: # ^, $, \b karakter tüketmez, literal dizisini bölmez
+                continue
+            if len(run) >= 3: literals.append(''.join(run).lower())
+            run = []
+            if op == _sre_parse.SUBPATTERN or (op in _REPEAT_OPS and av[0] >= 1):
+                walk(av[-1])
+        if len(run) >= 3: literals.append(''.join(run).lower())
+    walk(_sre_parse.parse(regex.pattern, regex.flags))
+    return literals
+
+def filter_notes_by_regex(notes, regex, time_budget):
+    """
+    Returns (matching notes, complete). Stops once time_budget seconds have passed so that an
+    expensive pattern cannot block the caller; complete is then False.
+    """
+    deadline = time.perf_counter() + time_budget
+    matches = []
+    for i, note in enumerate(notes):
+        if i % 64 == 0 and time.perf_counter() > deadline:
+            return matches, False
+        if regex.search(note.get('text', '')) or regex.search(note.get('source', '')):
+            matches.append(note)
+    return matches, True
+
+def _regex_worker_main(conn):
+    """Entry point of the RegexWorker process: answers search requests until the pipe is closed."""
+    texts = []
+    conn.send(("ready",))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == "texts":
+            texts = message[1]
+            continue
+        _, pattern, flags, positions = message
+        regex = re.compile(pattern, flags)
+        batch = []
+        for checked, position in enumerate(range(len(texts)) if positions is None else positions, 1):
+            text, source = texts[position]
+            if regex.search(text) or regex.search(source):
+                batch.append(position)
+            if checked % RegexWorker.BATCH_SIZE == 0:
+                # Eşleşmeler parça parça gönderilir; süre dolup süreç öldürülürse bulunanlar kaybolmaz
+                conn.send(("matches", batch))
+                batch = []
+        conn.send(("done", batch))
+
+class RegexWorker:
+    """
+    Runs user regular expressions in a separate process, so a pattern that backtracks for a
+    long time is stopped by killing the process instead of holding the calling thread (and the
+    GIL) until it finishes. The process keeps the texts of the last searched note list and
+    gets them again only when the list changes. It is started on first use (or earlier with
+    start()) and again after a timeout.
+    """
+    BATCH_SIZE = 256
+    START_TIMEOUT = 30.0 # Sürecin ilk açılışı (yorumlayıcı ve modüllerin yüklenmesi) için beklenen en uzun süre
+
+    def __init__(self):
+        self._process = None
+        self._conn = None
+        self._ready = False
+        self._texts_key = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker process unless it is running; does not wait for it to be ready."""
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._stop()
+        # fork, iş parçacıklı bir Tk uygulamasında güvenli değil; her platformda spawn kullanılır
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(target=_regex_worker_main, args=(child_conn,), name="regex-worker", daemon=True)
+        process.start()
+        child_conn.close()
+        self._process, self._conn, self._ready, self._texts_key = process, parent_conn, False, None
+
+    def stop(self):
+        with self._lock:
+            self._stop()
+
+    def _stop(self):
+        if self._process is None:
+            return
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._process = self._conn = self._texts_key = None
+        self._ready = False
+
+    def search(self, regex, notes, key, positions, time_budget):
+        """
+        Returns (indexes into notes of the matching notes, complete). key identifies the content
+        of notes; the texts are sent to the process only when it differs from the last call.
+        positions limits the search to those indexes (all notes if None). If time_budget seconds
+        pass first, the process is killed and the matches found so far are returned with
+        complete=False. Raises OSError if the process cannot be started or dies.
+        """
+        with self._lock:
+            try:
+                self._start()
+                if not self._ready:
+                    if not self._conn.poll(self.START_TIMEOUT):
+                        raise OSError("regex worker did not start")
+                    self._conn.recv()
+                    self._ready = True
+                if key != self._texts_key:
+                    self._texts_key = None
+                    self._conn.send(("texts", [(n.get('text', ''), n.get('source', '')) for n in notes]))
+                    self._texts_key = key
+                self._conn.send(("search", regex.pattern, regex.flags, positions))
+                deadline = time.perf_counter() + time_budget
+                matches = []
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not self._conn.poll(remaining):
+                        self._stop() # Çalışan bir eşleşme başka türlü durdurulamaz
+                        with contextlib.suppress(OSError):
+                            self._start() # Sonraki arama beklemesin diye yenisi hemen açılır
+                        return matches, False
+                    kind, batch = self._conn.recv()
+                    matches.extend(batch)
+                    if kind == "done":
+                        return matches, True
+            except (EOFError, BrokenPipeError, ValueError) as e:
+                self._stop()
+                raise OSError(f"regex worker failed: {e}") from e
+            except OSError:
+                self._stop()
+                raise
+
+# Bu karakterler LaTeX'te özel anlamlara sahiptir; ters eğik çizgiyle "kaçarak" etkisiz hale getirilir.
+# Ters eğik çizginin kendisi \textbackslash{} ile değiştirilmelidir.
+_LATEX_ESCAPES = {
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+    '\\': r'\textbackslash{}',
+}
+_LATEX_SPECIAL_RE = re.compile('|'.join(re.escape(key) for key in sorted(_LATEX_ESCAPES, key=len, reverse=True)))
+
+def escape_latex(text):
+    """Escapes special LaTeX characters in a given string."""
+    return _LATEX_SPECIAL_RE.sub(lambda match: _LATEX_ESCAPES[match.group()], text)
+
+def generate_markdown(notes, notebook_name, filter_description=""):
+    """Builds the Pandoc Markdown document (with a LaTeX YAML header) that notebooks are exported from."""
+    yaml_header = """---
+geometry: "a4paper, margin=2.5cm"
+header-includes:
+  - \\usepackage{ragged2e}
+  - \\RaggedRight
+  - \\setlength{\\parindent}{0pt}
+  - \\usepackage{parskip}
+  - \\newcommand{\\fullwidthline}{\\noindent\\rule{\\linewidth}{0.4pt}}
+---
+"""
+    md_lines = [yaml_header]
+    md_lines.append(f"# {escape_latex(notebook_name)}\n")
+    if filter_description:
+        md_lines.append(f"*{escape_latex(f'Filters: {filter_description}')}*\n")
+    md_lines.append("\\vspace{1em}\n")
+
+    for i, note in enumerate(notes):
+        if i > 0:
+            md_lines.append("\\fullwidthline\n")
+
+        timestamp = note.get("timestamp", "Unknown")
+        try:
+            timestamp = datetime.fromisoformat(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError: pass
+
+        source = escape_latex(note.get("source", "Unknown"))
+
+        md_lines.append(f"### {timestamp} | {source}\n")
+
+        # Not tipine göre içeriği ekle
+        if note.get("type") == "image" and "image_path" in note:
+            # Markdown resim sözdizimi: ![alt text](path)
+            # Pandoc, geçici dizindeki göreli yolları anlar
+            image_filename = os.path.basename(note['image_path'])
+            md_lines.append(f"![{image_filename}]({image_filename})\n")
+        else:
+            text = escape_latex(note.get("text", ""))
+            md_lines.append(f"\n{text}\n")
+
+    return "\n".join(md_lines)
+
+_MISSING = object()
+
+class Note:
+    """
+    One note in memory. Notebooks are stored as lists of JSON objects; loading them into plain
+    dicts costs a hash table per note, so notes are kept in __slots__ records instead and the
+    source title, repeated across many notes, is interned. The mapping interface (get, [], in,
+    keys, **note) matches the dicts it replaces, so code reading notes does not change.
+    Notes are not modified in place; NotebookTransaction replaces them.
+    """
+    __slots__ = ('timestamp', 'source', 'text', 'type', 'image_path', 'extra')
+    FIELDS = ('timestamp', 'source', 'text', 'type', 'image_path')
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, timestamp=None, source=None, text=None, type=None, image_path=None, extra=None):
+        # None, alanın notta hiç olmadığı anlamına gelir
+        self.timestamp = timestamp
+        self.source = sys.intern(source) if isinstance(source, str) else source
+        self.text = text
+        self.type = sys.intern(type) if isinstance(type, str) else type
+        self.image_path = image_path
+        self.extra = extra or None # Bilinmeyen anahtarlar kaybolmasın diye burada saklanır
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, Note):
+            return data
+        extra = None
+        if not data.keys() <= cls._FIELD_SET:
+            extra = {k: v for k, v in data.items() if k not in cls._FIELD_SET}
+        return cls(data.get('timestamp'), data.get('source'), data.get('text'), data.get('type'),
+                   data.get('image_path'), extra)
+
+    @classmethod
+    def from_records(cls, records):
+        """Notes for a JSON array read from a notebook file: every top-level element is one note."""
+        return [cls.from_dict(record) for record in records]
+
+    @staticmethod
+    def json_default(obj):
+        """default for json.dump, so lists mixing Notes and plain dicts serialize as before."""
+        if isinstance(obj, Note):
+            return obj.to_record()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def to_dict(self):
+        data = {}
+        for key in self.FIELDS:
+            value = self.get(key)
+            if value is not None:
+                data[key] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def to_record(self):
+        """The note as it is written to disk."""
+        return self.to_dict()
+
+    def preview(self, length):
+        """The first length characters of the text, without reading an out-of-line body."""
+        return (self.text or "")[:length]
+
+    def text_length(self):
+        return len(self.text or "")
+
+    def get(self, key, default=None):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def keys(self):
+        return [k for k in self.FIELDS if getattr(self, k) is not None] + list(self.extra or ())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Note, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Note) else other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_record()!r})"
+
+class BlobNote(Note):
+    """
+    A note whose body is kept out of line in a BlobStore. Its record on disk and in memory holds
+    only a summary (kept in the text slot) and the body length; the body is read from the store
+    when 'text' is asked for.
+    """
+    __slots__ = ('blob', 'length', 'store')
+    RECORD_FIELDS = frozenset(('summary', 'text_length', 'blob'))
+
+    def __init__(self, store, blob, length, summary, timestamp=None, source=None, type=None, image_path=None, extra=None):
+        super().__init__(timestamp, source, summary, type, image_path, extra)
+        self.blob = blob
+        self.length = length
+        self.store = store
+
+    @classmethod
+    def from_record(cls, store, data):
+        extra = {k: v for k, v in data.items() if k not in cls._FIELD_SET and k not in cls.RECORD_FIELDS}
+        return cls(store, data['blob'], data.get('text_length', 0), data.get('summary', ''), data.get('timestamp'),
+                   data.get('source'), data.get('type'), data.get('image_path'), extra)
+
+    def get(self, key, default=None):
+        if key == 'text':
+            return self.store.read(self.blob, fallback=self.text)
+        if key == 'blob':
+            return self.blob
+        return super().get(key, default)
+
+    def to_record(self):
+        data = {k: getattr(self, k) for k in self.FIELDS if k != 'text' and getattr(self, k) is not None}
+        data.update(summary=self.text, text_length=self.length, blob=self.blob)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def text_length(self):
+        return self.length
+
+class BlobStore:
+    """
+    Bodies of large notes, one UTF-8 file per body in _blobs/ named by the SHA-1 of the text, so
+    identical bodies (a merge undone and redone) share a file. Recently read bodies are kept in
+    an LRU cache bounded by total characters.
+    """
+    THRESHOLD = 8192 # Bundan uzun metinler ayrı dosyaya yazılır (karakter)
+    SUMMARY_CHARS = 200
+    CACHE_CHARS = 4 * 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._cache = OrderedDict()
+        self._cached_chars = 0
+        self._lock = threading.Lock() # Genel arama iş parçacıkları da gövde okur
+
+    def blob_path(self, blob):
+        return os.path.join(self.path, blob + ".txt")
+
+    def externalize(self, note):
+        """Returns note as a Note, moved out of line as a BlobNote if its text is over THRESHOLD."""
+        note = Note.from_dict(note)
+        text = note.text
+        if type(note) is not Note or not text or len(text) <= self.THRESHOLD:
+            return note
+        return BlobNote(self, self.write(text), len(text), text[:self.SUMMARY_CHARS], note.timestamp,
+                        note.source, note.type, note.image_path, note.extra)
+
+    def from_records(self, records):
+        """Like Note.from_records, but out-of-line records become BlobNotes."""
+        return [BlobNote.from_record(self, record) if 'blob' in record else Note.from_dict(record)
+                for record in records]
+
+    def write(self, text):
+        blob = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        path = self.blob_path(blob)
+        if not os.path.exists(path):
+            # Gövde, ona işaret eden defter yazılmadan önce diske ulaşmış olmalı
+            os.makedirs(self.path, exist_ok=True)
+            with open(path + ".tmp", 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+        self._remember(blob, text)
+        return blob
+
+    def read(self, blob, fallback=""):
+        with self._lock:
+            text = self._cache.get(blob)
+            if text is not None:
+                self._cache.move_to_end(blob)
+                return text
+        try:
+            with open(self.blob_path(blob), 'r', encoding='utf-8', newline='') as f: text = f.read()
+        except OSError as e:
+            logging.error(f"Could not read note body {blob}: {e}")
+            return fallback
+        self._remember(blob, text)
+        return text
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+            self._cached_chars = 0
+
+    def _remember(self, blob, text):
+        with self._lock:
+            if blob in self._cache:
+                return
+            self._cache[blob] = text
+            self._cached_chars += len(text)
+            while self._cached_chars > self.CACHE_CHARS and len(self._cache) > 1:
+                self._cached_chars -= len(self._cache.popitem(last=False)[1])
+
+# NoteManager sınıfının tamamı (güncellenmiş hali)
+
+class NotebookArchive:
+    """
+    Compressed, read-mostly storage for cold notebooks.
+
+    File layout: MAGIC | block 0 | block 1 | ... | index | footer
+    Every block is a compressed JSON array of up to BLOCK_SIZE notes in timestamp order. The index
+    (zlib-compressed JSON) records the offset, length and a summary (count, first/last timestamp,
+    sources) of each block, and the fixed-size footer says where the index starts. Readers map the
+    file with mmap and only decompress the blocks whose summary matches the query.
+
+    Appends never rewrite existing bytes: the new tail block, a new index and a new footer go after
+    the current end, so the file may hold replaced blocks and older indexes. Readers use the newest
+    valid footer; the index counts the dead bytes and compact() drops them.
+    """
+    MAGIC = b"NHARC001"
+    FOOTER = struct.Struct("<QI8s") # indeks ofseti, indeks uzunluğu, MAGIC
+    BLOCK_SIZE = 256
+    COMPACT_MIN_DEAD = 1 << 20 # Bundan az ölü bayt için dosyayı yeniden yazmaya değmez
+    CODECS = {
+        "zlib": (lambda data: zlib.compress(data, 9), zlib.decompress),
+        "lzma": (lzma.compress, lzma.decompress),
+    }
+
+    @classmethod
+    def write(cls, path, notes, codec="zlib"):
+        """Writes a whole archive, replacing any existing file at path only once it is complete."""
+        compress = cls.CODECS[codec][0]
+        ordered = sorted(notes, key=lambda n: n.get('timestamp', ''))
+        blocks = []
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.MAGIC)
+            for i in range(0, len(ordered), cls.BLOCK_SIZE):
+                blocks.append(cls._write_block(f, ordered[i:i + cls.BLOCK_SIZE], compress))
+            cls._write_index(f, {"codec": codec, "blocks": blocks})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read_index(cls, path):
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return cls._read_index(mm)[0]
+
+    @classmethod
+    def dead_bytes(cls, path):
+        """Bytes of replaced blocks and older indexes that compact() would reclaim."""
+        return cls.read_index(path).get("dead", 0)
+
+    @classmethod
+    def read(cls, path, block_filter=None, block_cache=None, decode=Note.from_records):
+        """
+        Returns the notes of every block for which block_filter(summary) is true (all blocks if None).
+        block_cache (a dict kept by the caller) holds already decoded blocks keyed by offset and CRC,
+        so after an append only the new or rewritten blocks are decompressed.
+        """
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            index, _, _ = cls._read_index(mm)
+            decompress = cls.CODECS[index["codec"]][1]
+            notes = []
+            used = set()
+            for block in index["blocks"]:
+                if block_filter is None or block_filter(block):
+                    raw = mm[block["offset"]:block["offset"] + block["length"]]
+                    if block_cache is None:
+                        notes.extend(decode(json.loads(decompress(raw))))
+                        continue
+                    key = (block["offset"], zlib.crc32(raw))
+                    used.add(key)
+                    if key not in block_cache:
+                        block_cache[key] = decode(json.loads(decompress(raw)))
+                    notes.extend(block_cache[key])
+            if block_cache is not None and block_filter is None:
+                for key in set(block_cache) - used:
+                    del block_cache[key]
+            return notes
+
+    @classmethod
+    def append(cls, path, note):
+        """
+        Adds one note, compressing again only the last block (while it has room) and the index.
+        Both are written after the current end of the file and the new footer only once they are
+        on disk, so an interrupted append leaves the previous footer as the newest valid one.
+        When the dead bytes outgrow the live blocks the archive is compacted.
+        """
+        with open(path, 'r+b') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                index, index_offset, end = cls._read_index(mm)
+                compress, decompress = cls.CODECS[index["codec"]]
+                blocks = index["blocks"]
+                if blocks and blocks[-1]["count"] < cls.BLOCK_SIZE:
+                    last = blocks.pop()
+                    notes = Note.from_records(json.loads(decompress(mm[last["offset"]:last["offset"] + last["length"]])))
+                    index["dead"] = index.get("dead", 0) + last["length"]
+                else:
+                    notes = []
+            notes.append(note)
+            # Önceki indeks ve altbilgi de artık kullanılmayan baytlardır
+            index["dead"] = index.get("dead", 0) + end - index_offset
+            # Geçerli altbilginin ardında yarıda kalmış bir eklemenin baytları varsa üzerine yazılır
+            f.seek(end)
+            blocks.append(cls._write_block(f, notes, compress))
+            cls._write_index(f, index)
+        if index["dead"] >= cls.COMPACT_MIN_DEAD and index["dead"] > sum(block["length"] for block in blocks):
+            cls.compact(path)
+
+    @classmethod
+    def compact(cls, path):
+        """Rewrites the archive without its dead bytes; blocks are copied as they are, not compressed again."""
+        tmp_path = path + ".tmp"
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, open(tmp_path, 'wb') as out:
+            index, _, _ = cls._read_index(mm)
+            out.write(cls.MAGIC)
+            blocks = []
+            for block in index["blocks"]:
+                offset = out.tell()
+                out.write(mm[block["offset"]:block["offset"] + block["length"]])
+                blocks.append(dict(block, offset=offset))
+            cls._write_index(out, {"codec": index["codec"], "blocks": blocks})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _write_block(cls, f, notes, compress):
+        data = compress(json.dumps(notes, ensure_ascii=False, separators=(',', ':'), default=Note.json_default).encode('utf-8'))
+        offset = f.tell()
+        f.write(data)
+        timestamps = [n.get('timestamp', '') for n in notes]
+        return {
+            "offset": offset,
+            "length": len(data),
+            "count": len(notes),
+            "image_count": sum(1 for n in notes if n.get('type') == 'image'),
+            "first": min(timestamps),
+            "last": max(timestamps),
+            "sources": dict(Counter(n.get('source', 'Unknown') for n in notes)),
+        }
+
+    @classmethod
+    def _write_index(cls, f, index):
+        """Writes the index and, once it and everything before it are on disk, the footer pointing at it."""
+        data = zlib.compress(json.dumps(index, ensure_ascii=False).encode('utf-8'))
+        offset = f.tell()
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        f.write(cls.FOOTER.pack(offset, len(data), cls.MAGIC))
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+
+    @classmethod
+    def _read_index(cls, mm):
+        """
+        Returns (index, index offset, end of footer) of the newest valid footer. A footer is only trusted if its
+        index ends right where it starts and decompresses; the bytes of an interrupted append
+        after the last valid footer are skipped.
+        """
+        if mm[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError("Not a Note Harvester archive")
+        end = len(mm)
+        while end - cls.FOOTER.size >= len(cls.MAGIC):
+            start = end - cls.FOOTER.size
+            offset, length, magic = cls.FOOTER.unpack(mm[start:end])
+            if magic == cls.MAGIC and offset >= len(cls.MAGIC) and offset + length == start:
+                try:
+                    return json.loads(zlib.decompress(mm[offset:start])), offset, end
+                except (zlib.error, ValueError):
+                    pass
+            # Geriye doğru bir önceki MAGIC aranır; sıkıştırılmış veride rastlantısal eşleşmeler yukarıda elenir
+            end = mm.rfind(cls.MAGIC, len(cls.MAGIC), end - 1) + len(cls.MAGIC)
+        raise ValueError("Archive has no valid index")
+
+_SEARCH_TOKEN_RE = re.compile(r'\w+')
+_HYPHENATION_RE = re.compile(r'(?<=\w)-[ \t]*\r?\n\s*(?=\w)') # PDF'lerden gelen satır sonu tirelemesi
+
+def tokenize(text):
+    """Splits text into the lower-cased word tokens used by the search index."""
+    return _SEARCH_TOKEN_RE.findall(_HYPHENATION_RE.sub('', text).lower())
+
+def edit_distance(a, b):
+    """Levenshtein distance of two strings using Myers' bit-parallel algorithm (one pass over b)."""
+    m = len(a)
+    if m == 0:
+        return len(b)
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for c in b:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # Global mesafe: üst satır her karakterde bir artar, bu yüzden kaydırılan bite 1 girer
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+def note_tags(note):
+    """The tags of a note as a tuple (notes without tags have no 'tags' key)."""
+    tags = note.get('tags') or ()
+    return (tags,) if isinstance(tags, str) else tuple(tags)
+
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+class Bitmap:
+    """
+    A compressed set of non-negative integers (note ordinals) laid out like a Roaring bitmap:
+    values are grouped into chunks of 65536 by their high bits, and each chunk is a sorted
+    array of 16-bit offsets while it is sparse or an 8 KB bit array once it holds more than
+    ARRAY_MAX values. &, | and - combine bitmaps chunk by chunk, dense chunks with integer
+    bitwise operations. Dense chunks keep a running count of their values, so len() and
+    emptiness checks after discard() need no pass over the bits. Results of these operators
+    share nothing with their operands.
+    """
+    __slots__ = ('chunks', 'counts')
+    CHUNK_BITS = 16
+    CHUNK_BYTES = (1 << CHUNK_BITS) // 8
+    ARRAY_MAX = 4096 # Bu sayıda değerde dizi ve bit dizisi aynı yeri (8 KB) kaplar
+    ARRAY_MIN = ARRAY_MAX // 2 # Bit dizisi bu sayıya inince diziye döner; eşik çevresinde gidip gelmesin diye daha düşük
+
+    def __init__(self, values=()):
+        self.chunks = {} # üst bitler -> array('H') (sıralı) ya da bytearray (bit dizisi)
+        self.counts = {} # üst bitler -> bit dizisi parçasındaki değer sayısı
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        key, low = value >> self.CHUNK_BITS, value & 0xFFFF
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            self.chunks[key] = array('H', (low,))
+        elif isinstance(chunk, bytearray):
+            bit = 1 << (low & 7)
+            if not chunk[low >> 3] & bit:
+                chunk[low >> 3] |= bit
+                self.counts[key] += 1
+        else:
+            if not chunk or chunk[-1] < low:
+                chunk.append(low) # Sıra numaraları çoğunlukla artan sırada eklenir
+            else:
+                i = bisect.bisect_left(chunk, low)
+                if i < len(chunk) and chunk[i] == low:
+                    return
+                chunk.insert(i, low)
+            if len(chunk) > self.ARRAY_MAX:
+                self.chunks[key] = self._dense(chunk)
+                self.counts[key] = len(chunk)
+
+    def discard(self, value):
+        key, low = value >> self.CHUNK_BITS, value & 0xFFFF
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return
+        if isinstance(chunk, bytearray):
+            bit = 1 << (low & 7)
+            if chunk[low >> 3] & bit:
+                chunk[low >> 3] &= ~bit & 0xFF
+                self.counts[key] -= 1
+                if self.counts[key] <= self.ARRAY_MIN:
+                    self._put(key, self._from_int(self._int(chunk)))
+            return
+        i = bisect.bisect_left(chunk, low)
+        if i < len(chunk) and chunk[i] == low:
+            del chunk[i]
+            if not chunk:
+                del self.chunks[key]
+
+    def __contains__(self, value):
+        key, low = value >> self.CHUNK_BITS, value & 0xFFFF
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return False
+        if isinstance(chunk, bytearray):
+            return bool(chunk[low >> 3] >> (low & 7) & 1)
+        i = bisect.bisect_left(chunk, low)
+        return i < len(chunk) and chunk[i] == low
+
+    def __len__(self):
+        return sum(self.counts[key] if isinstance(chunk, bytearray) else len(chunk) for key, chunk in self.chunks.items())
+
+    def __bool__(self):
+        return bool(self.chunks)
+
+    def __iter__(self):
+        """Values in ascending order."""
+        for key in sorted(self.chunks):
+            base = key << self.CHUNK_BITS
+            chunk = self.chunks[key]
+            if isinstance(chunk, bytearray):
+                for i, byte in enumerate(chunk):
+                    if byte:
+                        for bit in _BYTE_BITS[byte]:
+                            yield base + (i << 3) + bit
+            else:
+                for low in chunk:
+                    yield base + low
+
+    @classmethod
+    def _dense(cls, offsets):
+        bits = bytearray(cls.CHUNK_BYTES)
+        for low in offsets:
+            bits[low >> 3] |= 1 << (low & 7)
+        return bits
+
+    @staticmethod
+    def _int(chunk):
+        return int.from_bytes(chunk if isinstance(chunk, bytearray) else Bitmap._dense(chunk), 'little')
+
+    @classmethod
+    def _from_int(cls, bits):
+        """(chunk, value count) for an integer bit set; the chunk is None if it is empty."""
+        if not bits:
+            return None, 0
+        data = bits.to_bytes(cls.CHUNK_BYTES, 'little')
+        count = bin(bits).count('1')
+        if count > cls.ARRAY_MAX:
+            return bytearray(data), count
+        return array('H', [(i << 3) + bit for i, byte in enumerate(data) if byte for bit in _BYTE_BITS[byte]]), count
+
+    def _put(self, key, chunk_and_count):
+        """Stores a chunk made by _from_int, dropping the key if it is empty."""
+        chunk, count = chunk_and_count
+        self.counts.pop(key, None)
+        if chunk is None:
+            self.chunks.pop(key, None)
+            return
+        self.chunks[key] = chunk
+        if isinstance(chunk, bytearray):
+            self.counts[key] = count
+
+    def _copy_chunk(self, key, result):
+        chunk = self.chunks[key]
+        if isinstance(chunk, bytearray):
+            result.chunks[key] = bytearray(chunk)
+            result.counts[key] = self.counts[key]
+        else:
+            result.chunks[key] = array('H', chunk)
+
+    def __and__(self, other):
+        result = Bitmap()
+        small, large = (self, other) if len(self.chunks) <= len(other.chunks) else (other, self)
+        for key, a in small.chunks.items():
+            b = large.chunks.get(key)
+            if b is None:
+                continue
+            if isinstance(a, bytearray) and isinstance(b, bytearray):
+                result._put(key, self._from_int(self._int(a) & self._int(b)))
+                continue
+            if isinstance(a, bytearray):
+                a, b = b, a
+            if isinstance(b, bytearray):
+                chunk = array('H', [low for low in a if b[low >> 3] >> (low & 7) & 1])
+            else:
+                members = set(b)
+                chunk = array('H', [low for low in a if low in members])
+            if chunk:
+                result.chunks[key] = chunk
+        return result
+
+    def __or__(self, other):
+        result = Bitmap()
+        for key in self.chunks.keys() | other.chunks.keys():
+            a, b = self.chunks.get(key), other.chunks.get(key)
+            if a is None or b is None:
+                (self if b is None else other)._copy_chunk(key, result)
+            elif isinstance(a, array) and isinstance(b, array) and len(a) + len(b) <= self.ARRAY_MAX:
+                result.chunks[key] = array('H', sorted(set(a) | set(b)))
+            else:
+                result._put(key, self._from_int(self._int(a) | self._int(b)))
+        return result
+
+    def __sub__(self, other):
+        result = Bitmap()
+        for key, a in self.chunks.items():
+            b = other.chunks.get(key)
+            if b is None:
+                self._copy_chunk(key, result)
+                continue
+            if isinstance(a, bytearray):
+                result._put(key, self._from_int(self._int(a) & ~self._int(b)))
+                continue
+            if isinstance(b, bytearray):
+                chunk = array('H', [low for low in a if not b[low >> 3] >> (low & 7) & 1])
+            else:
+                members = set(b)
+                chunk = array('H', [low for low in a if low not in members])
+            if chunk:
+                result.chunks[key] = chunk
+        return result
+
+class NoteIndex:
+    """
+    Base class of the in-memory per-notebook indexes. Notes are keyed by timestamp; docs maps
+    each timestamp to index-specific data whose last item is a digest of the note's content.
+    Subclasses implement add/remove and are kept up to date with those and sync instead of
+    being rebuilt after every capture or edit.
+    """
+    def __init__(self):
+        self.docs = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    @staticmethod
+    def _digest(note):
+        # Dışarıda tutulan gövdeler okunmaz; içerik özetinden türeyen blob adı yeterli
+        return hash((note.get('blob') or note.get('text', ''), note.get('source', '')))
+
+    def add(self, note):
+        raise NotImplementedError
+
+    def remove(self, timestamp):
+        raise NotImplementedError
+
+    def sync(self, notes):
+        """Brings the index in line with the full note list, re-indexing only added, edited or deleted notes."""
+        seen = set()
+        for note in notes:
+            timestamp = note.get('timestamp', '')
+            seen.add(timestamp)
+            doc = self.docs.get(timestamp)
+            if doc is None or doc[-1] != self._digest(note):
+                self.add(note)
+        for timestamp in [t for t in self.docs if t not in seen]:
+            self.remove(timestamp)
+
+class SearchIndex(NoteIndex):
+    """Word index of one notebook with the BM25 term statistics of the text and source fields."""
+    K1 = 1.2
+    B = 0.75
+    SOURCE_BOOST = 2.0 # Kaynak (pencere başlığı) eşleşmeleri metindekilerden daha değerli sayılır
+    RELATED_QUERY_TERMS = 32 # Benzer not sorgusunda notun yalnızca en ağırlıklı terimleri aranır
+    RELATED_MAX_DF = 0.1 # Notların %10'undan fazlasında geçen terimler aranmaz (en az 50 not)
+    RELATED_RESCORE = 4 # Yaklaşık sıralamadaki en iyi k * 4 aday tüm terimlerle yeniden puanlanır
+
+    def __init__(self):
+        super().__init__() # docs: zaman damgası -> (terimler, metin uzunluğu, kaynak uzunluğu, içerik özeti)
+        self.postings = {} # terim -> {zaman damgası: (metindeki tf, kaynaktaki tf)}
+        self.term_trigrams = {} # trigram -> {terim}; bulanık aramada aday terimleri bulmak için
+        self.total_text_len = 0
+        self.total_source_len = 0
+        self.norms = {} # zaman damgası -> metnin log-tf vektörünün normu (benzer notlar için)
+        self.notes = {} # zaman damgası -> not; benzer not sonuçları defteri yeniden okumadan döner
+
+    def add(self, note):
+        timestamp = note.get('timestamp', '')
+        if timestamp in self.docs:
+            self.remove(timestamp)
+        self.notes[timestamp] = Note.from_dict(note)
+        text_terms = Counter(tokenize(note.get('text', '')))
+        source_terms = Counter(tokenize(note.get('source', '')))
+        terms = set(text_terms) | set(source_terms)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                for gram in self._trigrams(term):
+                    self.term_trigrams.setdefault(gram, set()).add(term)
+            posting[timestamp] = (text_terms.get(term, 0), source_terms.get(term, 0))
+        text_len, source_len = sum(text_terms.values()), sum(source_terms.values())
+        self.docs[timestamp] = (terms, text_len, source_len, self._digest(note))
+        self.norms[timestamp] = math.sqrt(sum((1 + math.log(tf)) ** 2 for tf in text_terms.values())) or 1.0
+        self.total_text_len += text_len
+        self.total_source_len += source_len
+
+    def remove(self, timestamp):
+        doc = self.docs.pop(timestamp, None)
+        if doc is None:
+            return
+        del self.norms[timestamp]
+        del self.notes[timestamp]
+        terms, text_len, source_len, _ = doc
+        for term in terms:
+            posting = self.postings[term]
+            del posting[timestamp]
+            if not posting:
+                del self.postings[term]
+                for gram in self._trigrams(term):
+                    grams = self.term_trigrams[gram]
+                    grams.discard(term)
+                    if not grams:
+                        del self.term_trigrams[gram]
+        self.total_text_len -= text_len
+        self.total_source_len -= source_len
+
+    @staticmethod
+    def _trigrams(term):
+        padded = f"^{term}$" # Sınır işaretleri sayesinde her terimin len(term) trigramı olur
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def max_edits(word):
+        """Typo budget of a query word: exact below 4 characters, one edit up to 7, then two."""
+        if len(word) < 4: return 0
+        return 1 if len(word) < 8 else 2
+
+    def fuzzy_terms(self, word):
+        """Returns the indexed terms within max_edits(word) edits of word."""
+        max_edits = self.max_edits(word)
+        if max_edits == 0:
+            return {word} if word in self.postings else set()
+        # Her düzenleme en fazla 3 trigramı bozar; bu kadar ortak trigramı olmayan terimler elenir
+        grams = self._trigrams(word)
+        min_shared = len(grams) - 3 * max_edits
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.term_trigrams.get(gram, ()))
+        return {term for term, count in shared.items()
+                if count >= min_shared and abs(len(term) - len(word)) <= max_edits
+                and edit_distance(word, term) <= max_edits}
+
+    def fuzzy_match(self, query):
+        """
+        Returns (timestamps, terms): the notes in which every query word appears with at most
+        a few typos, and the indexed terms that matched.
+        """
+        matched_terms = set()
+        timestamps = None
+        for word in set(tokenize(query)):
+            terms = self.fuzzy_terms(word)
+            matched_terms |= terms
+            word_matches = set()
+            for term in terms:
+                word_matches.update(self.postings[term])
+            timestamps = word_matches if timestamps is None else timestamps & word_matches
+            if not timestamps:
+                return set(), matched_terms
+        return timestamps or set(), matched_terms
+
+    def rank(self, query, k=200, candidates=None, terms=None):
+        """
+        Scores notes against the query with BM25F and returns the best k as (score, timestamp)
+        pairs, best first. candidates (any container of timestamps) restricts the notes scored;
+        terms overrides the query's own tokens (for instance with fuzzy_match's expansion).
+        """
+        terms = set(tokenize(query)) if terms is None else set(terms)
+        doc_count = len(self.docs)
+        if not terms or not doc_count:
+            return []
+        avg_text_len = self.total_text_len / doc_count or 1
+        avg_source_len = self.total_source_len / doc_count or 1
+        scores = {}
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for timestamp, (tf_text, tf_source) in posting.items():
+                if candidates is not None and timestamp not in candidates:
+                    continue
+                _, text_len, source_len, _ = self.docs[timestamp]
+                # BM25F: alanlar kendi uzunluklarına göre normalize edilip ağırlıklı toplanır, doygunluk en sonda
+                tf = (tf_text / (1 - self.B + self.B * text_len / avg_text_len)
+                      + self.SOURCE_BOOST * tf_source / (1 - self.B + self.B * source_len / avg_source_len))
+                scores[timestamp] = scores.get(timestamp, 0.0) + idf * tf / (self.K1 + tf)
+        # Tüm eşleşmeleri sıralamak yerine k boyutlu bir yığında yalnızca en iyileri tutulur
+        return heapq.nlargest(k, ((score, timestamp) for timestamp, score in scores.items()))
+
+    def related(self, note, k=10, exclude=None):
+        """
+        The k notes whose text is most similar to note's, as (similarity, timestamp) pairs, best
+        first. Similarity is the cosine of TF-IDF vectors in the lnc.ltc scheme: log tf for both,
+        idf on the query side only, so document norms never go stale as the notebook grows. note
+        need not be in this notebook; exclude is a timestamp to leave out, such as the note's own.
+        """
+        doc_count = len(self.docs)
+        query = {} # terim -> ağırlık
+        for term, tf in Counter(tokenize(note.get('text', ''))).items():
+            df = len(self.postings.get(term, ()))
+            query[term] = (1 + math.log(tf)) * (math.log((1 + doc_count) / (1 + df)) + 1)
+        query_norm = math.sqrt(sum(weight * weight for weight in query.values()))
+        if not doc_count or not query_norm:
+            return []
+        # Seyrek vektörlerin iç çarpımı ters indeks üzerinden biriktirilir; yalnızca notun en
+        # ağırlıklı ve çok yaygın olmayan terimlerini içeren notlara dokunulur
+        max_df = max(50, self.RELATED_MAX_DF * doc_count)
+        terms = heapq.nlargest(self.RELATED_QUERY_TERMS, (
+            (weight, term) for term, weight in query.items() if 0 < len(self.postings.get(term, ())) <= max_df))
+        dots = {}
+        for weight, term in terms:
+            for timestamp, (tf, _) in self.postings[term].items():
+                if tf:
+                    dots[timestamp] = dots.get(timestamp, 0.0) + weight * (1 + math.log(tf))
+        dots.pop(exclude, None)
+        candidates = heapq.nlargest(k * self.RELATED_RESCORE, dots, key=lambda t: dots[t] / self.norms[t])
+        # Yaklaşık sıralamanın en iyileri notun tüm terimleriyle kesin olarak puanlanır
+        scored = []
+        for timestamp in candidates:
+            dot = 0.0
+            for term in self.docs[timestamp][0]:
+                weight = query.get(term)
+                if weight is not None:
+                    tf = self.postings[term][timestamp][0]
+                    if tf:
+                        dot += weight * (1 + math.log(tf))
+            scored.append((dot / (query_norm * self.norms[timestamp]), timestamp))
+        return heapq.nlargest(k, scored)
+
+class TrigramIndex(NoteIndex):
+    """
+    Character trigram index of whole notes (text and source, lower-cased), used to narrow regex
+    searches down to the notes that can contain the pattern's required literals.
+    """
+    def __init__(self):
+        super().__init__()
+        self.postings = {} # trigram -> {zaman damgası}
+
+    @staticmethod
+    def _trigrams(text):
+        text = text.lower()
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, note):
+        timestamp = note.get('timestamp', '')
+        if timestamp in self.docs:
+            self.remove(timestamp)
+        grams = self._trigrams(note.get('text', '')) | self._trigrams(note.get('source', ''))
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(timestamp)
+        self.docs[timestamp] = (grams, self._digest(note))
+
+    def remove(self, timestamp):
+        doc = self.docs.pop(timestamp, None)
+        if doc is None:
+            return
+        for gram in doc[0]:
+            posting = self.postings[gram]
+            posting.discard(timestamp)
+            if not posting:
+                del self.postings[gram]
+
+    def candidates(self, literals):
+        """
+        Returns the timestamps of notes containing every trigram of the given literals, or None
+        when the literals give nothing to narrow by (every note is then a candidate).
+        """
+        grams = set()
+        for literal in literals:
+            grams |= self._trigrams(literal)
+        if not grams:
+            return None
+        result = None
+        # En seyrek trigramdan başlanır; kesişim hızla küçülür
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            result = set(posting) if result is None else result & posting
+            if not result:
+                break
+        return result
+
+class TimelineIndex(NoteIndex):
+    """
+    Capture times of one notebook as a sorted array of epoch seconds with the matching
+    timestamps, so date ranges are found by bisection and newest-first order needs no sort.
+    Notes with an unreadable timestamp sort first (epoch 0) and fall outside every date range.
+    Notes sharing a timestamp each keep their own entry, so counts include every note. Entries are
+    ordered by (epoch, timestamp), so different timestamps of the same instant never interleave.
+    """
+    def __init__(self):
+        super().__init__() # docs: zaman damgası -> (epoch, not sayısı, zaman damgası)
+        self.epochs = array('d')
+        self.timestamps = []
+
+    @staticmethod
+    def _digest(note):
+        return note.get('timestamp', '') # Metin düzenlemeleri sıralamayı etkilemez
+
+    @staticmethod
+    def _epoch(timestamp):
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _day_start(day):
+        return datetime.combine(day, datetime.min.time()).timestamp()
+
+    def add(self, note):
+        timestamp = note.get('timestamp', '')
+        doc = self.docs.get(timestamp)
+        epoch = doc[0] if doc else self._epoch(timestamp)
+        i = bisect.bisect_right(self.timestamps, timestamp, *self._epoch_run(epoch))
+        self.epochs.insert(i, epoch)
+        self.timestamps.insert(i, timestamp)
+        self.docs[timestamp] = (epoch, doc[1] + 1 if doc else 1, timestamp)
+
+    def remove(self, timestamp):
+        doc = self.docs.pop(timestamp, None)
+        if doc is None:
+            return
+        i = bisect.bisect_left(self.timestamps, timestamp, *self._epoch_run(doc[0]))
+        del self.epochs[i:i + doc[1]] # Aynı zaman damgalı kayıtlar yan yana durur
+        del self.timestamps[i:i + doc[1]]
+
+    def _epoch_run(self, epoch):
+        """(lo, hi) of the entries at epoch; their timestamps are sorted, so they can be bisected too."""
+        return bisect.bisect_left(self.epochs, epoch), bisect.bisect_right(self.epochs, epoch)
+
+    def sync(self, notes):
+        counts = Counter(n.get('timestamp', '') for n in notes)
+        if self.docs:
+            # Özet zaman damgasının kendisi olduğundan değişiklik, zaman damgası başına not sayısından anlaşılır
+            for timestamp in [t for t, doc in self.docs.items() if counts.get(t) != doc[1]]:
+                self.remove(timestamp)
+            for timestamp, count in counts.items():
+                if timestamp not in self.docs:
+                    for _ in range(count):
+                        self.add({'timestamp': timestamp})
+            return
+        # İlk kurulumda notları tek tek araya eklemek yerine bir kez sırala
+        entries = sorted(((self._epoch(timestamp), timestamp, count) for timestamp, count in counts.items()),
+                         key=lambda item: (item[0], item[1]))
+        self.epochs = array('d', (epoch for epoch, _, count in entries for _ in range(count)))
+        self.timestamps = [timestamp for _, timestamp, count in entries for _ in range(count)]
+        self.docs = {timestamp: (epoch, count, timestamp) for epoch, timestamp, count in entries}
+
+    def _bounds(self, date_range):
+        if not date_range:
+            return 0, len(self.epochs)
+        start, end = date_range
+        return (bisect.bisect_left(self.epochs, self._day_start(start)),
+                bisect.bisect_left(self.epochs, self._day_start(end + timedelta(days=1))))
+
+    def newest_first(self, date_range=None):
+        """
+        Timestamps captured between date_range=(start_date, end_date) inclusive, newest first. A
+        timestamp shared by several notes is repeated once per note.
+        """
+        lo, hi = self._bounds(date_range)
+        return self.timestamps[lo:hi][::-1]
+
+    def count_between(self, start_date, end_date):
+        lo, hi = self._bounds((start_date, end_date))
+        return hi - lo
+
+    def date_span(self):
+        """(first, last) capture date, or None if no note has a readable timestamp."""
+        first = bisect.bisect_right(self.epochs, 0.0)
+        if first == len(self.epochs):
+            return None
+        return (datetime.fromtimestamp(self.epochs[first]).date(), datetime.fromtimestamp(self.epochs[-1]).date())
+
+    def histogram(self, start_date, end_date, bin_days=1):
+        """Capture counts as [(bin start date, count)] in bins of bin_days, two bisections per bin."""
+        bins = []
+        day = start_date
+        while day <= end_date:
+            bins.append((day, self.count_between(day, day + timedelta(days=bin_days - 1))))
+            day += timedelta(days=bin_days)
+        return bins
+
+class FacetIndex(NoteIndex):
+    """
+    Bitmap index of the facets of one notebook: ("tag", tag), ("source", title) and ("month",
+    "YYYY-MM"). Each note gets an ordinal and each facet value a Bitmap of ordinals, so any
+    AND/OR/NOT combination of facets is resolved with bitwise operations instead of a pass
+    over the notes. Ordinals of removed notes are not reused; sync() renumbers the notes once
+    most ordinals are dead, so the bitmaps stay dense.
+    """
+    COMPACT_MIN_DEAD = 1024 # Bundan az boş sıra numarası için yeniden numaralandırmaya değmez
+
+    def __init__(self):
+        super().__init__() # docs: zaman damgası -> (sıra no, facet anahtarları, özet = facet anahtarları)
+        self.bitmaps = {} # (tür, değer) -> Bitmap
+        self.timestamps = [] # sıra no -> zaman damgası; silinen notların yerinde None kalır
+        self.live = Bitmap() # Tüm notlar; NOT işlemleri bunun üzerinden yapılır
+
+    @staticmethod
+    def _digest(note):
+        return FacetIndex.facet_keys(note) # Metin düzenlemeleri facet'leri etkilemez
+
+    @staticmethod
+    def facet_keys(note):
+        keys = [("source", note.get('source', 'Unknown'))]
+        timestamp = note.get('timestamp', '')
+        if len(timestamp) >= 7:
+            keys.append(("month", timestamp[:7]))
+        keys.extend(("tag", tag) for tag in note_tags(note))
+        return tuple(keys)
+
+    def add(self, note):
+        timestamp = note.get('timestamp', '')
+        if timestamp in self.docs:
+            self.remove(timestamp)
+        self._insert(timestamp, self.facet_keys(note))
+
+    def _insert(self, timestamp, keys):
+        ordinal = len(self.timestamps)
+        self.timestamps.append(timestamp)
+        for key in keys:
+            bitmap = self.bitmaps.get(key)
+            if bitmap is None:
+                bitmap = self.bitmaps[key] = Bitmap()
+            bitmap.add(ordinal)
+        self.live.add(ordinal)
+        self.docs[timestamp] = (ordinal, keys, keys)
+
+    def remove(self, timestamp):
+        doc = self.docs.pop(timestamp, None)
+        if doc is None:
+            return
+        ordinal, keys, _ = doc
+        self.timestamps[ordinal] = None
+        for key in keys:
+            bitmap = self.bitmaps[key]
+            bitmap.discard(ordinal)
+            if not bitmap:
+                del self.bitmaps[key]
+        self.live.discard(ordinal)
+
+    def sync(self, notes):
+        super().sync(notes)
+        dead = len(self.timestamps) - len(self.docs)
+        if dead >= self.COMPACT_MIN_DEAD and dead > len(self.docs):
+            self.compact()
+
+    def compact(self):
+        """Renumbers the live notes 0..n-1 in their current order and rebuilds the bitmaps."""
+        entries = sorted((ordinal, timestamp, keys) for timestamp, (ordinal, keys, _) in self.docs.items())
+        self.docs, self.bitmaps, self.timestamps, self.live = {}, {}, [], Bitmap()
+        for _, timestamp, keys in entries:
+            self._insert(timestamp, keys)
+
+    def values(self, kind):
+        """[(value, note count)] of one facet kind, sorted by value."""
+        return sorted((value, len(bitmap)) for (key_kind, value), bitmap in self.bitmaps.items() if key_kind == kind)
+
+    def select(self, groups=(), exclude=()):
+        """
+        The timestamps of the notes that match a facet filter. groups is a list of lists of
+        (kind, value) keys: a note must match at least one key of every group (OR inside a group,
+        AND between groups) and none of the keys in exclude (NOT).
+        """
+        empty = Bitmap()
+        result = self.live
+        for group in groups:
+            union = Bitmap()
+            for key in group:
+                union = union | self.bitmaps.get(key, empty)
+            result = result & union
+        for key in exclude:
+            result = result - self.bitmaps.get(key, empty)
+        return {self.timestamps[ordinal] for ordinal in result}
+
+class NotebookTransaction:
+    """
+    A batch of note inserts, updates and deletes keyed by timestamp (the note ID), created by
+    NoteManager.transaction(). Nothing is written until the with block exits; the whole batch
+    is then applied in one pass over the notebook and saved with one durable write.
+    """
+    def __init__(self, note_manager, notebook_name, label=None):
+        self.note_manager = note_manager
+        self.notebook_name = notebook_name
+        self.label = label # Verilirse işlem geri alma geçmişine bu adla kaydedilir
+        self.inserts = []
+        self.updates = {} # zaman damgası -> {alan: yeni değer}
+        self.deletes = set()
+        self.removed = [] # apply() sonrası: kaldırılan notlar (silinenler ve güncellenenlerin eski halleri)
+        self.added = []   # apply() sonrası: eklenen notlar (yeni notlar ve güncellenenlerin yeni halleri)
+        self._notes = None
+        self._signature = None
+
+    def notes(self):
+        """The notebook's notes, loaded once per transaction. Change them through insert/update/delete only."""
+        if self._notes is None:
+            self._signature = self.note_manager._file_signature(self.notebook_name)
+            self._notes = self.note_manager.load_notes(self.notebook_name)
+        return self._notes
+
+    def insert(self, note):
+        self.inserts.append(note)
+
+    def update(self, timestamp, **fields):
+        self.updates.setdefault(timestamp, {}).update(fields)
+
+    def delete(self, timestamp):
+        self.deletes.add(timestamp)
+
+    def __len__(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    def apply(self, notes):
+        """
+        Returns a new note list with the batch applied. Raises KeyError if an update or delete
+        refers to a missing note, and ValueError if an insert reuses an existing timestamp.
+        """
+        existing = {n.get('timestamp') for n in notes}
+        missing = (set(self.updates) | self.deletes) - existing
+        if missing:
+            raise KeyError(f"Notes not found in '{self.notebook_name}': {', '.join(sorted(missing))}")
+        new_ids = [n.get('timestamp') for n in self.inserts]
+        if len(set(new_ids)) != len(new_ids) or (existing - self.deletes) & set(new_ids):
+            raise ValueError(f"Duplicate note timestamp in transaction on '{self.notebook_name}'.")
+        result, removed, added = [], [], []
+        for note in notes:
+            timestamp = note.get('timestamp')
+            if timestamp in self.deletes:
+                removed.append(note)
+                continue
+            fields = self.updates.get(timestamp)
+            if fields:
+                # Not yerinde değiştirilmez; eski hali geri alma geçmişinde olduğu gibi kalır.
+                # None verilen alanlar nottan çıkarılır (ör. son etiketi kaldırılan notun 'tags' alanı)
+                updated = Note.from_dict({k: v for k, v in {**note, **fields}.items() if v is not None})
+                removed.append(note)
+                added.append(updated)
+                result.append(updated)
+            else:
+                result.append(note)
+        inserts = [Note.from_dict(n) for n in self.inserts]
+        result.extend(inserts)
+        added.extend(inserts)
+        self.removed, self.added = removed, added
+        return result
+
+class NoteManager:
+    CATALOG_FILENAME = "_catalog.manifest" # .json uzantısı verilmez, yoksa defter olarak listelenir
+    CATALOG_TOP_SOURCES = 3
+    SEGMENT_DIR_SUFFIX = ".segments"
+    SEGMENT_DIRECTORY_FILENAME = "segments.manifest"
+    UNDATED_SEGMENT = "undated"
+    ARCHIVE_SUFFIX = ".nharc"
+    HISTORY_LIMIT = 50 # Defter başına tutulan geri alınabilir işlem sayısı
+    NOTES_CACHE_SIZE = 8 # Bellekte tutulan en fazla defter
+    SEARCH_INDEX_CACHE_SIZE = 8 # İndeksleri bellekte tutulan en fazla defter
+    INDEX_BUILD_WORKERS = 2 # Arka planda aynı anda kurulan en fazla indeks
+    ASSET_INDEX_FILENAME = "_assets.manifest"
+    TAG_RULES_FILENAME = "_tag_rules.manifest" # [{"pattern", "tags"}]; yakalamada kaynağa göre etiket verir
+    ASSET_GC_GRACE = 600 # sn; henüz bir nota bağlanmamış olabilecek yeni dosyalar silinmez
+
+    # Defter saklama düzenleri
+    LAYOUT_SINGLE_FILE = "single_file"  # <ad>.json
+    LAYOUT_SEGMENTED = "segmented"      # <ad>.segments/YYYY-MM.json
+    LAYOUT_ARCHIVE = "archive"          # <ad>.nharc (sıkıştırılmış bloklar)
+
+    def __init__(self, data_folder="Note_Harvester_Data", segment_new_notebooks=False):
+        self.user_data_path = os.path.join(os.path.expanduser("~"), data_folder)
+        self.image_assets_path = os.path.join(self.user_data_path, "_assets") # Resimler için yeni klasör
+        self.cache_path = os.path.join(self.user_data_path, "_cache") # Küçültülmüş ikon gibi yeniden üretilebilir dosyalar
+        self.catalog_path = os.path.join(self.user_data_path, self.CATALOG_FILENAME)
+        self.asset_index_path = os.path.join(self.user_data_path, self.ASSET_INDEX_FILENAME)
+        self.tag_rules_path = os.path.join(self.user_data_path, self.TAG_RULES_FILENAME)
+        self._tag_rules = None # İlk get_tag_rules çağrısında diskten okunur
+        self.segment_new_notebooks = segment_new_notebooks
+        self._catalog = None # İlk get_catalog çağrısında diskten okunur
+        # defter adı -> {indeks sınıfı: (dosya imzası, indeks)}; ilk aramada kurulur, en son kullanılan
+        # SEARCH_INDEX_CACHE_SIZE defterinki tutulur
+        self._search_indexes = OrderedDict()
+        self._index_lock = threading.Lock() # İndeksler arka plan iş parçacıklarında da kurulur
+        self._index_builds = set() # Arka planda kurulmakta olan (defter adı, indeks sınıfı) çiftleri
+        self._index_executor = ThreadPoolExecutor(max_workers=self.INDEX_BUILD_WORKERS, thread_name_prefix="index-build")
+        self._range_indexes = {} # indeks sınıfı -> ((defter adı, imza, tarih aralığı), indeks): son kısmi indeks
+        # Defter önbelleği: defter adı -> {"signature", "notes"}; yalnızca tam okumalar girer. Dosya
+        # imzası tuttukça load_notes diske gitmez.
+        self._notes_cache = OrderedDict()
+        # Kısım önbelleği: defter adı -> {segment anahtarı ya da blok: okunan notlar}. Kısmi okumalar
+        # yalnızca buraya yazar; dışarıda değişen bir defterde de yalnızca değişen aylar ya da bloklar yeniden okunur.
+        self._parts_cache = OrderedDict()
+        self._cache_lock = threading.Lock() # Genel arama iş parçacıkları da load_notes çağırır
+        # Geri alma geçmişi: defter adı -> (geri alma yığını, yineleme yığını). Her kayıt
+        # (etiket, kaldırılan notlar, eklenen notlar) üçlüsüdür; notlar kopyalanmaz, aynı nesneler paylaşılır.
+        self._history = {}
+        # Varlık indeksi: defter adı -> {"signature", "assets": {göreli yol: o yola işaret eden not sayısı}}.
+        # Her yazmada güncellenir, toplayıcı çalışırken ve çıkışta diske yazılır; imzası tutmayan
+        # (dışarıda değişmiş) defterler toplayıcı tarafından yeniden sayılır.
+        self._asset_index = None
+        self._asset_index_dirty = False
+        self._asset_lock = threading.Lock() # Toplayıcı arka planda çalışır
+        self.blobs = BlobStore(os.path.join(self.user_data_path, "_blobs")) # Büyük not gövdeleri
+        self.regex_worker = RegexWorker() # Düzenli ifade aramaları ayrı süreçte, süre sınırıyla çalışır
+        os.makedirs(self.user_data_path, exist_ok=True)
+        os.makedirs(self.image_assets_path, exist_ok=True) # Bu klasörü de oluştur
+
+    def _notebook_path(self, name):
+        return os.path.join(self.user_data_path, f"{name}.json")
+
+    def _segment_dir(self, name):
+        return os.path.join(self.user_data_path, f"{name}{self.SEGMENT_DIR_SUFFIX}")
+
+    def _archive_path(self, name):
+        return os.path.join(self.user_data_path, f"{name}{self.ARCHIVE_SUFFIX}")
+
+    def _layout_path(self, name, layout):
+        if layout == self.LAYOUT_SEGMENTED: return self._segment_dir(name)
+        if layout == self.LAYOUT_ARCHIVE: return self._archive_path(name)
+        return self._notebook_path(name)
+
+    def is_segmented(self, name):
+        """True if the notebook is stored as per-month segments instead of a single JSON file."""
+        return os.path.isdir(self._segment_dir(name))
+
+    def is_archived(self, name):
+        return os.path.isfile(self._archive_path(name))
+
+    def get_layout(self, name):
+        if self.is_segmented(name): return self.LAYOUT_SEGMENTED
+        if self.is_archived(name): return self.LAYOUT_ARCHIVE
+        return self.LAYOUT_SINGLE_FILE
+
+    def notebook_exists(self, name):
+        return os.path.exists(self._notebook_path(name)) or self.is_segmented(name) or self.is_archived(name)
+
+    def get_notebooks(self):
+        try:
+            names = set()
+            for f in os.listdir(self.user_data_path):
+                if f.endswith('.json'):
+                    names.add(f[:-len('.json')])
+                elif f.endswith(self.ARCHIVE_SUFFIX):
+                    names.add(f[:-len(self.ARCHIVE_SUFFIX)])
+                elif f.endswith(self.SEGMENT_DIR_SUFFIX) and os.path.isdir(os.path.join(self.user_data_path, f)):
+                    names.add(f[:-len(self.SEGMENT_DIR_SUFFIX)])
+            return sorted(names)
+        except FileNotFoundError: return []
+
+    def create_notebook(self, name):
+        if self.notebook_exists(name):
+            return False
+        if self.segment_new_notebooks:
+            os.makedirs(self._segment_dir(name))
+            self._save_segment_directory(name, {})
+        else:
+            with open(self._notebook_path(name), 'w', encoding='utf-8') as f: json.dump([], f)
+        self._update_catalog_entry(name, [])
+        return True
+
+    def delete_notebook(self, name):
+        if not self.notebook_exists(name):
+            return False
+        # Defterin resimleri ve gövde dosyaları hemen silinmez; başka bir defter de onlara işaret
+        # edebilir, bu yüzden varlık toplayıcısına bırakılır
+        path = self._layout_path(name, self.get_layout(name))
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        self._remove_catalog_entry(name)
+        with self._index_lock: self._search_indexes.pop(name, None)
+        self._history.pop(name, None)
+        with self._cache_lock:
+            self._notes_cache.pop(name, None)
+            self._parts_cache.pop(name, None)
+        with self._asset_lock:
+            if self._load_asset_index().pop(name, None) is not None:
+                self._asset_index_dirty = True
+        return True
+        
+    def rename_notebook(self, old_name, new_name):
+        """Renames a notebook file (or segment folder / archive)."""
+        if old_name == new_name:
+            return True, "Names are the same."
+
+        if not self.notebook_exists(old_name):
+            return False, f"Notebook '{old_name}' not found."
+        
+        if self.notebook_exists(new_name):
+            return False, f"A notebook named '{new_name}' already exists."
+        
+        layout = self.get_layout(old_name)
+        try:
+            os.rename(self._layout_path(old_name, layout), self._layout_path(new_name, layout))
+        except OSError as e:
+            return False, f"Error renaming notebook: {e}"
+        catalog = self._load_catalog()
+        if old_name in catalog:
+            catalog[new_name] = catalog.pop(old_name)
+            self._save_catalog()
+        with self._index_lock:
+            if old_name in self._search_indexes:
+                signature = self._file_signature(new_name)
+                self._search_indexes[new_name] = {cls: (signature, index) for cls, (_, index)
+                                                  in self._search_indexes.pop(old_name).items()}
+        if old_name in self._history:
+            self._history[new_name] = self._history.pop(old_name)
+        with self._asset_lock:
+            index = self._load_asset_index()
+            if old_name in index:
+                index[new_name] = index.pop(old_name)
+                self._asset_index_dirty = True
+        with self._cache_lock:
+            self._notes_cache.pop(old_name, None)
+            self._parts_cache.pop(old_name, None)
+        return True, "Notebook renamed successfully."
+
+    def load_notes(self, notebook_name, date_range=None, source=None, cache=True, strict=False):
+        """
+        Loads the notes of a notebook. date_range=(start_date, end_date) and source are hints:
+        segmented and archived notebooks then skip segments/blocks that cannot match, so callers
+        still have to filter exactly. Full loads are served from memory while the notebook's file
+        signature is unchanged; the returned list is the caller's own. With cache=False a
+        notebook that is not in memory is read without being kept there. A missing or unreadable
+        notebook loads as empty unless strict is set, in which case the read error is raised.
+        """
+        signature = self._file_signature(notebook_name)
+        with self._cache_lock:
+            entry = self._notes_cache.get(notebook_name)
+            if entry is not None and signature is not None and entry["signature"] == signature:
+                self._notes_cache.move_to_end(notebook_name)
+                return list(entry["notes"])
+            parts = None
+            if cache:
+                parts = self._parts_cache.pop(notebook_name, None)
+                parts = {} if parts is None else parts
+                self._parts_cache[notebook_name] = parts
+                while len(self._parts_cache) > self.NOTES_CACHE_SIZE:
+                    self._parts_cache.popitem(last=False)
+        full_load = date_range is None and source is None
+        layout = self.get_layout(notebook_name)
+        if layout == self.LAYOUT_SEGMENTED:
+            notes = self._load_segmented_notes(notebook_name, date_range, source, parts, strict)
+        elif layout == self.LAYOUT_ARCHIVE:
+            try:
+                notes = NotebookArchive.read(self._archive_path(notebook_name),
+                                             None if full_load else lambda block: self._summary_matches(block, date_range, source),
+                                             parts, self.blobs.from_records)
+            except (OSError, ValueError, zlib.error, lzma.LZMAError) as e:
+                logging.error(f"Failed to read archive of notebook '{notebook_name}': {e}", exc_info=True)
+                if strict: raise
+                return []
+        else:
+            # Tek JSON dosyasında yalnızca değişen kısmı okumak mümkün değil, dosya baştan okunur
+            filepath = self._notebook_path(notebook_name)
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f: notes = self.blobs.from_records(json.load(f))
+            except (FileNotFoundError, json.JSONDecodeError):
+                if strict: raise
+                return []
+        if not full_load or not cache:
+            # İpuçlu (kısmi) okumalar tam listenin yerini almaz; okunan segment/bloklar kısım önbelleğinde kalır
+            return notes
+        self._cache_notes(notebook_name, signature, notes)
+        return list(notes)
+
+    def _cache_notes(self, notebook_name, signature, notes):
+        with self._cache_lock:
+            self._notes_cache[notebook_name] = {"signature": signature, "notes": notes}
+            self._notes_cache.move_to_end(notebook_name)
+            while len(self._notes_cache) > self.NOTES_CACHE_SIZE:
+                self._notes_cache.popitem(last=False)
+
+    def is_changed_externally(self, name):
+        """True if a notebook was created, changed or removed since the app last wrote or cataloged it."""
+        entry = self._load_catalog().get(name)
+        return (entry.get("signature") if entry else None) != self._file_signature(name)
+
+    def memory_report(self):
+        """
+        Approximate memory held by the notebooks kept in memory, as [(name, note count, bytes,
+        bytes the same notes would take as plain dicts)]. Strings shared between notes (interned
+        source titles) are counted once.
+        """
+        with self._cache_lock:
+            entries = [(name, entry["notes"]) for name, entry in self._notes_cache.items() if entry["notes"]]
+        seen = set()
+        report = []
+        for name, notes in entries:
+            size = dict_size = sys.getsizeof(notes)
+            for note in notes:
+                # Slotlar doğrudan okunur; BlobNote gövdesi bellekte olmadığından sayılmaz
+                values = [getattr(note, k) for k in Note.FIELDS if getattr(note, k) is not None]
+                strings = 0
+                for value in values:
+                    if id(value) not in seen:
+                        seen.add(id(value))
+                        strings += sys.getsizeof(value)
+                size += sys.getsizeof(note) + strings + (sys.getsizeof(note.extra) if note.extra else 0)
+                dict_size += sys.getsizeof(note.to_record()) + strings
+            report.append((name, len(notes), size, dict_size))
+        return report
+
+    def drop_caches(self):
+        """Forgets the in-memory notebooks, search indexes and note bodies, so the next reads go to disk."""
+        with self._cache_lock:
+            self._notes_cache.clear()
+            self._parts_cache.clear()
+        with self._index_lock: self._search_indexes.clear()
+        self._range_indexes.clear()
+        self.blobs.clear_cache()
+
+    def save_notes(self, notebook_name, notes_data):
+        notes_data = [self.blobs.externalize(n) for n in notes_data]
+        layout = self.get_layout(notebook_name)
+        if layout == self.LAYOUT_SEGMENTED:
+            self._save_segmented_notes(notebook_name, notes_data)
+        elif layout == self.LAYOUT_ARCHIVE:
+            path = self._archive_path(notebook_name)
+            NotebookArchive.write(path, notes_data, NotebookArchive.read_index(path)["codec"])
+        else:
+            self._save_single_file(notebook_name, notes_data)
+        self._update_catalog_entry(notebook_name, notes_data)
+        self._update_caches(notebook_name, notes=notes_data)
+
+    def _save_single_file(self, notebook_name, notes_data):
+        self._atomic_write(self._notebook_path(notebook_name),
+                           json.dumps(notes_data, ensure_ascii=False, indent=4, default=Note.json_default))
+
+    @staticmethod
+    def _atomic_write(path, data):
+        # Geçici dosyaya yazılıp diske zorlanır, sonra tek adımda yer değiştirilir; yarıda kalan
+        # bir yazma eski dosyayı bozmaz
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @contextlib.contextmanager
+    def transaction(self, notebook_name, label=None):
+        """
+        Collects note changes and commits them together when the with block exits:
+
+            with note_manager.transaction(name, label="Merge Notes") as tx:
+                tx.delete(timestamp); tx.update(other, source="New"); tx.insert(note)
+
+        An exception inside the block discards the batch, and a batch that cannot be applied
+        (see NotebookTransaction.apply) or written leaves the notebook untouched. Labelled
+        transactions can be undone with undo().
+        """
+        tx = NotebookTransaction(self, notebook_name, label)
+        yield tx
+        self.commit(tx)
+
+    def commit(self, tx):
+        if not len(tx):
+            return
+        notes = tx.notes()
+        if self._file_signature(tx.notebook_name) != tx._signature:
+            # Defter işlem açıkken değişti (ör. bir diyalog beklerken yeni yakalama geldi);
+            # işlemler kimlikle tutulduğu için güncel liste üzerine yeniden uygulanabilir
+            notes = self.load_notes(tx.notebook_name)
+        self.save_notes(tx.notebook_name, tx.apply(notes))
+        if tx.label:
+            undo_stack, redo_stack = self._history.setdefault(tx.notebook_name, (deque(maxlen=self.HISTORY_LIMIT), []))
+            undo_stack.append((tx.label, tx.removed, tx.added))
+            redo_stack.clear()
+
+    # --- Geri alma / yineleme ---
+    # Tam liste kopyası yerine her işlemin kaldırdığı ve eklediği notlar saklanır; geri almak
+    # eklenenleri silip kaldırılanları geri koyan tek bir işlemdir, yinelemek de bunun tersi.
+
+    def undo_label(self, notebook_name):
+        """Label of the change undo() would revert, or None."""
+        stacks = self._history.get(notebook_name)
+        return stacks[0][-1][0] if stacks and stacks[0] else None
+
+    def redo_label(self, notebook_name):
+        stacks = self._history.get(notebook_name)
+        return stacks[1][-1][0] if stacks and stacks[1] else None
+
+    def undo(self, notebook_name):
+        """Reverts the last recorded change of a notebook; returns its label, or None if there is nothing to undo."""
+        return self._replay_history(notebook_name, undo=True)
+
+    def redo(self, notebook_name):
+        """Re-applies the last undone change; returns its label, or None if there is nothing to redo."""
+        return self._replay_history(notebook_name, undo=False)
+
+    def _replay_history(self, notebook_name, undo):
+        stacks = self._history.get(notebook_name)
+        if not stacks:
+            return None
+        source, target = stacks if undo else stacks[::-1]
+        if not source:
+            return None
+        label, removed, added = source[-1]
+        to_delete, to_insert = (added, removed) if undo else (removed, added)
+        tx = NotebookTransaction(self, notebook_name)
+        for note in to_delete:
+            tx.delete(note.get('timestamp'))
+        for note in to_insert:
+            tx.insert(note)
+        self.commit(tx) # Başarısız olursa (KeyError/ValueError/OSError) yığınlar değişmez
+        source.pop()
+        target.append((label, removed, added))
+        return label
+
+    # --- Varlık indeksi ve toplayıcı ---
+    # _assets altındaki resimler ve _blobs altındaki not gövdeleri, onlara işaret eden notlar
+    # sayılarak izlenir. Sahipsiz dosyaları bulmak için defterleri okumak gerekmez; klasörleri
+    # listeleyip indekste olmayanları seçmek yeterlidir.
+
+    @staticmethod
+    def _note_assets(note):
+        """Paths (relative to the data folder, with forward slashes) of the files a note references."""
+        paths = []
+        image_path = note.get('image_path')
+        if image_path:
+            paths.append(image_path.replace('\\', '/'))
+        blob = note.get('blob')
+        if blob:
+            paths.append(f"_blobs/{blob}.txt")
+        return paths
+
+    def _count_assets(self, notes):
+        counts = Counter()
+        for note in notes:
+            counts.update(self._note_assets(note))
+        return dict(counts)
+
+    def _load_asset_index(self):
+        if self._asset_index is None:
+            try:
+                with open(self.asset_index_path, 'r', encoding='utf-8') as f: self._asset_index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._asset_index = {}
+        return self._asset_index
+
+    def save_asset_index(self):
+        with self._asset_lock:
+            if not self._asset_index_dirty:
+                return
+            data = json.dumps(self._asset_index, ensure_ascii=False)
+            self._asset_index_dirty = False
+        try:
+            self._atomic_write(self.asset_index_path, data)
+        except OSError as e:
+            logging.error(f"Failed to save asset index: {e}", exc_info=True)
+
+    def _update_asset_refs(self, notebook_name, signature, notes=None, added=None, previous_signature=None):
+        with self._asset_lock:
+            index = self._load_asset_index()
+            entry = index.get(notebook_name)
+            if notes is not None:
+                index[notebook_name] = {"signature": signature, "assets": self._count_assets(notes)}
+            elif entry is not None and entry["signature"] is not None and entry["signature"] == previous_signature:
+                for path in self._note_assets(added):
+                    entry["assets"][path] = entry["assets"].get(path, 0) + 1
+                entry["signature"] = signature
+            elif entry is not None:
+                entry["signature"] = None # Toplayıcı bu defteri yeniden saysın
+            else:
+                return # İndekste hiç yoksa toplayıcı ilk çalışmasında sayar
+            self._asset_index_dirty = True
+
+    def _referenced_assets(self):
+        """
+        Every path some note references; only notebooks changed since they were counted are read.
+        Returns None when a changed notebook cannot be read: its references are then unknown.
+        """
+        notebooks = self.get_notebooks()
+        with self._asset_lock:
+            index = self._load_asset_index()
+            for name in set(index) - set(notebooks):
+                del index[name]
+                self._asset_index_dirty = True
+            stale = [name for name in notebooks
+                     if name not in index or index[name]["signature"] is None
+                     or index[name]["signature"] != self._file_signature(name)]
+        for name in stale:
+            signature = self._file_signature(name)
+            try:
+                counts = self._count_assets(self.load_notes(name, strict=True))
+            except (OSError, ValueError, zlib.error, lzma.LZMAError) as e:
+                # Okunamayan defterin eski sayıları ve imzası olduğu gibi kalır; dosyaları silinmez
+                logging.error(f"Skipping unused asset collection, notebook '{name}' could not be read: {e}")
+                return None
+            with self._asset_lock:
+                index[name] = {"signature": signature, "assets": counts}
+                self._asset_index_dirty = True
+        with self._asset_lock:
+            referenced = set()
+            for entry in index.values():
+                referenced.update(entry["assets"])
+        # Geri alma geçmişindeki notların dosyaları da korunur; geri alma onları geri getirebilir.
+        # Yığınlar yalnızca arayüz iş parçacığında değişir, list() kopyası tek adımda alınır.
+        for undo_stack, redo_stack in list(self._history.values()):
+            for _, removed, added in list(undo_stack) + list(redo_stack):
+                for note in removed + added:
+                    referenced.update(self._note_assets(note))
+        return referenced
+
+    def collect_unused_assets(self):
+        """
+        Deletes the files in _assets and _blobs that no note and no undoable change references,
+        and returns (number of files, bytes freed). Meant to run on a background thread; it
+        yields regularly so capture and the UI are not slowed down.
+        """
+        referenced = self._referenced_assets()
+        if referenced is None:
+            self.save_asset_index()
+            return 0, 0
+        cutoff = time.time() - self.ASSET_GC_GRACE
+        count = freed = 0
+        for folder in (self.image_assets_path, self.blobs.path):
+            prefix = os.path.basename(folder) + "/"
+            try:
+                entries = list(os.scandir(folder))
+            except FileNotFoundError:
+                continue
+            for i, entry in enumerate(entries):
+                if i % 100 == 99:
+                    time.sleep(0.01)
+                if prefix + entry.name in referenced or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                    if st.st_mtime > cutoff:
+                        continue
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logging.error(f"Could not delete unused file {entry.path}: {e}")
+                    continue
+                count += 1
+                freed += st.st_size
+        self.save_asset_index()
+        if count:
+            logging.info(f"Removed {count} unused asset files, freeing {freed} bytes.")
+        return count, freed
+
+    def add_annotation(self, notebook_name, annotation):
+        annotation = self.blobs.externalize(annotation)
+        layout = self.get_layout(notebook_name)
+        previous_signature = self._file_signature(notebook_name)
+        if layout == self.LAYOUT_SEGMENTED:
+            # Sadece notun ait olduğu ay segmenti okunur ve yazılır
+            key = self._segment_key(annotation)
+            directory = self._load_segment_directory(notebook_name)
+            notes = self._load_segment(notebook_name, key, directory) if key in directory else []
+            notes.append(annotation)
+            self._write_segment(notebook_name, key, notes, directory)
+            self._save_segment_directory(notebook_name, directory)
+            self._update_catalog_entry(notebook_name)
+            self._update_caches(notebook_name, added=annotation, previous_signature=previous_signature)
+            return
+        if layout == self.LAYOUT_ARCHIVE:
+            NotebookArchive.append(self._archive_path(notebook_name), annotation)
+            self._update_catalog_entry(notebook_name)
+            self._update_caches(notebook_name, added=annotation, previous_signature=previous_signature)
+            return
+        notes = self.load_notes(notebook_name)
+        notes.append(annotation)
+        self.save_notes(notebook_name, notes)
+
+    def get_sources(self, notebook_name):
+        """Returns the distinct sources of a notebook, sorted. Segmented and archived notebooks answer from their summaries."""
+        summaries = self._storage_summaries(notebook_name)
+        if summaries is not None:
+            sources = set()
+            for entry in summaries:
+                sources.update(entry["sources"])
+        else:
+            sources = set(n.get('source', 'Unknown') for n in self.load_notes(notebook_name))
+        return sorted(sources)
+
+    # --- Etiketler ---
+
+    def get_tags(self, notebook_name):
+        """[(tag, note count)] of a notebook, sorted by tag."""
+        return self.get_facet_values(notebook_name, "tag")
+
+    def get_facet_values(self, notebook_name, kind):
+        """[(value, note count)] of one facet kind ("tag", "source" or "month") of a notebook, sorted by value."""
+        return self.get_search_index(notebook_name, FacetIndex).values(kind)
+
+    def tag_notes(self, notebook_name, timestamps, add=(), remove=()):
+        """Adds and removes tags on the given notes in one undoable transaction; returns how many notes changed."""
+        add, remove, wanted = set(add), set(remove), set(timestamps)
+        changed = 0
+        with self.transaction(notebook_name, label="Remove Tag" if remove and not add else "Add Tag") as tx:
+            for note in tx.notes():
+                if note.get('timestamp') not in wanted:
+                    continue
+                tags = note_tags(note)
+                new_tags = sorted((set(tags) | add) - remove)
+                if new_tags != sorted(tags):
+                    tx.update(note.get('timestamp'), tags=new_tags or None)
+                    changed += 1
+        return changed
+
+    def get_tag_rules(self):
+        """The capture tagging rules: [{"pattern": glob matched anywhere in the source title, "tags": [...]}]."""
+        if self._tag_rules is None:
+            try:
+                with open(self.tag_rules_path, 'r', encoding='utf-8') as f: self._tag_rules = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._tag_rules = []
+        return self._tag_rules
+
+    def set_tag_rules(self, rules):
+        self._atomic_write(self.tag_rules_path, json.dumps(rules, ensure_ascii=False, indent=2))
+        self._tag_rules = rules
+
+    def tags_for_source(self, source):
+        """The tags the rules give a capture from this source (window title), case-insensitively."""
+        title = (source or "").lower()
+        tags = []
+        for rule in self.get_tag_rules():
+            if fnmatch.fnmatchcase(title, f"*{rule['pattern'].lower()}*"):
+                tags.extend(tag for tag in rule['tags'] if tag not in tags)
+        return tags
+
+    def _storage_summaries(self, notebook_name):
+        """Segment or block summaries of a notebook, or None for single-file notebooks."""
+        layout = self.get_layout(notebook_name)
+        if layout == self.LAYOUT_SEGMENTED:
+            return list(self._load_segment_directory(notebook_name).values())
+        if layout == self.LAYOUT_ARCHIVE:
+            return NotebookArchive.read_index(self._archive_path(notebook_name))["blocks"]
+        return None
+
+    @staticmethod
+    def _summary_matches(summary, date_range, source):
+        """True if a segment/block summary may hold notes in date_range from source."""
+        if source is not None and source not in summary["sources"]:
+            return False
+        if date_range:
+            start, end = date_range
+            if summary["last"] < start.isoformat() or summary["first"] >= (end + timedelta(days=1)).isoformat():
+                return False
+        return True
+
+    def set_notebook_layout(self, notebook_name, layout, codec="zlib"):
+        """Rewrites a notebook in another storage layout; the old files are removed only after the new ones exist."""
+        current = self.get_layout(notebook_name)
+        if layout == current:
+            return
+        notes = self.load_notes(notebook_name)
+        old_path = self._layout_path(notebook_name, current)
+        if layout == self.LAYOUT_SEGMENTED:
+            os.makedirs(self._segment_dir(notebook_name))
+            self._save_segmented_notes(notebook_name, notes)
+        elif layout == self.LAYOUT_ARCHIVE:
+            NotebookArchive.write(self._archive_path(notebook_name), notes, codec)
+        else:
+            self._save_single_file(notebook_name, notes)
+        if os.path.isdir(old_path):
+            shutil.rmtree(old_path)
+        else:
+            os.remove(old_path)
+        self._update_catalog_entry(notebook_name, notes)
+
+    def compact_cold_notebooks(self, min_age_days=90, codec="zlib"):
+        """
+        Archives every notebook whose last capture is older than min_age_days, and drops the
+        bytes appends left behind in existing archives. Returns a list of (name, old_byte_size, new_byte_size).
+        """
+        cutoff = (datetime.now() - timedelta(days=min_age_days)).isoformat()
+        results = []
+        for name, stats in sorted(self.get_catalog().items()):
+            if self.is_archived(name):
+                path = self._archive_path(name)
+                if NotebookArchive.dead_bytes(path):
+                    NotebookArchive.compact(path)
+                    self._update_catalog_entry(name)
+                    results.append((name, stats["byte_size"], self.get_notebook_stats(name)["byte_size"]))
+                continue
+            if not stats["last_capture"] or stats["last_capture"] >= cutoff:
+                continue
+            old_size = stats["byte_size"]
+            self.set_notebook_layout(name, self.LAYOUT_ARCHIVE, codec)
+            results.append((name, old_size, self.get_notebook_stats(name)["byte_size"]))
+        return results
+
+    # --- Aylık segment düzeni ---
+    # Segmentli bir defter, "<ad>.segments" klasöründe her ay için bir "YYYY-MM.json" dosyası ve
+    # segment dizini (segments.manifest) olarak saklanır. Dizin her segmentin not sayısını, ilk/son
+    # zaman damgasını, kaynak sayılarını ve içerik özetini (digest) tutar. Tarih aralığı sorguları
+    # yalnızca çakışan segmentleri okur; içeriği değişmeyen segmentler asla yeniden yazılmaz.
+
+    @classmethod
+    def _segment_key(cls, note):
+        timestamp = note.get('timestamp', '')
+        return timestamp[:7] if re.match(r'\d{4}-\d{2}', timestamp) else cls.UNDATED_SEGMENT
+
+    def _segment_path(self, notebook_name, key, directory=None):
+        """Path of a segment; with the segment directory, the file its current entry names."""
+        entry = directory.get(key) if directory else None
+        # Eski dizin kayıtlarında dosya adı yoktu, segment dosyası ayın kendi adını taşıyordu
+        filename = entry.get("file", f"{key}.json") if entry else f"{key}.json"
+        return os.path.join(self._segment_dir(notebook_name), filename)
+
+    def _load_segment_directory(self, notebook_name, strict=False):
+        path = os.path.join(self._segment_dir(notebook_name), self.SEGMENT_DIRECTORY_FILENAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            if strict: raise
+            return {}
+
+    def _save_segment_directory(self, notebook_name, directory):
+        """
+        Switches the notebook to the segment files the directory names, then removes the files
+        it no longer names. Segment files are never overwritten, so a crash before the switch
+        leaves the previous set intact and one after it leaves only unused files behind.
+        """
+        folder = self._segment_dir(notebook_name)
+        self._atomic_write(os.path.join(folder, self.SEGMENT_DIRECTORY_FILENAME), json.dumps(directory, ensure_ascii=False))
+        live = {os.path.basename(self._segment_path(notebook_name, key, directory)) for key in directory}
+        for entry in os.scandir(folder):
+            if entry.name.endswith('.json') and entry.name not in live:
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    logging.warning(f"Could not remove old segment file {entry.path}: {e}")
+
+    def _load_segment(self, notebook_name, key, directory, parts=None, strict=False):
+        """Reads one segment; with parts (a per-notebook cache dict) unchanged segment files are not re-read."""
+        path = self._segment_path(notebook_name, key, directory)
+        if parts is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                if strict: raise
+                return []
+            stamp = (path, st.st_mtime_ns, st.st_size)
+            cached = parts.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        try:
+            with open(path, 'r', encoding='utf-8') as f: notes = self.blobs.from_records(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            if strict: raise
+            return []
+        if parts is not None:
+            parts[key] = (stamp, notes)
+        return notes
+
+    def _write_segment(self, notebook_name, key, notes, directory):
+        """
+        Writes one segment unless its content is unchanged, and updates its directory entry.
+        The notebook only uses the new file once the directory is saved.
+        """
+        if not notes:
+            directory.pop(key, None)
+            return
+        data = json.dumps(notes, ensure_ascii=False, indent=4, default=Note.json_default)
+        digest = hashlib.sha1(data.encode('utf-8')).hexdigest()
+        if key in directory and directory[key]["digest"] == digest:
+            return
+        # Dosya adı içerikten türetilir; dizindeki geçerli dosyanın üzerine hiçbir zaman yazılmaz
+        filename = f"{key}.{digest[:16]}.json"
+        path = os.path.join(self._segment_dir(notebook_name), filename)
+        self._atomic_write(path, data)
+        timestamps = [n.get('timestamp', '') for n in notes]
+        directory[key] = {
+            "file": filename,
+            "count": len(notes),
+            "image_count": sum(1 for n in notes if n.get('type') == 'image'),
+            "first": min(timestamps),
+            "last": max(timestamps),
+            "bytes": os.path.getsize(path),
+            "sources": dict(Counter(n.get('source', 'Unknown') for n in notes)),
+            "digest": digest,
+        }
+
+    def _load_segmented_notes(self, notebook_name, date_range=None, source=None, parts=None, strict=False):
+        directory = self._load_segment_directory(notebook_name, strict)
+        if parts is not None:
+            for key in set(parts) - set(directory):
+                del parts[key]
+        notes = []
+        for key in sorted(directory):
+            # Tarihsiz segmentin ilk/son değerleri anlamlı değil, tarih ipucu ona uygulanmaz
+            segment_range = None if key == self.UNDATED_SEGMENT else date_range
+            if self._summary_matches(directory[key], segment_range, source):
+                notes.extend(self._load_segment(notebook_name, key, directory, parts, strict))
+        return notes
+
+    def _save_segmented_notes(self, notebook_name, notes):
+        groups = {}
+        for note in notes:
+            groups.setdefault(self._segment_key(note), []).append(note)
+        directory = self._load_segment_directory(notebook_name)
+        for key in set(directory) - set(groups):
+            self._write_segment(notebook_name, key, [], directory)
+        for key, group in groups.items():
+            self._write_segment(notebook_name, key, group, directory)
+        self._save_segment_directory(notebook_name, directory)
+
+    # --- Defter kataloğu ---
+    # Katalog, her defter için not sayısı, resim sayısı, son yakalama zamanı, dosya boyutu ve
+    # en sık kaynakları tutar. Kayıtlar defter her kaydedildiğinde güncellenir; uygulama dışında
+    # değişen dosyalar (mtime/boyut imzası tutmayan) bir sonraki get_catalog çağrısında yeniden hesaplanır.
+
+    def get_catalog(self):
+        """Returns {notebook_name: stats} for every notebook, parsing only notebooks changed outside the app."""
+        catalog = self._load_catalog()
+        notebooks = self.get_notebooks()
+        changed = False
+        for name in notebooks:
+            entry = catalog.get(name)
+            if entry is None or entry.get("signature") != self._file_signature(name):
+                catalog[name] = self._compute_catalog_entry(name)
+                changed = True
+        for name in set(catalog) - set(notebooks):
+            del catalog[name]
+            changed = True
+        if changed:
+            self._save_catalog()
+        return catalog
+
+    def get_notebook_stats(self, name):
+        """Returns the catalog entry of one notebook without touching the disk, or None."""
+        return self._load_catalog().get(name)
+
+    def _file_signature(self, name):
+        layout = self.get_layout(name)
+        if layout == self.LAYOUT_SEGMENTED:
+            # Segmentli defterlerde segment dizini ve tüm ay dosyaları birlikte imzalanır; böylece
+            # dışarıdan yalnızca tek bir ay dosyası düzenlense de fark edilir
+            try:
+                stats = [e.stat() for e in os.scandir(self._segment_dir(name)) if not e.name.endswith('.tmp')]
+            except OSError:
+                return None
+            if not stats:
+                return None
+            return [max(st.st_mtime_ns for st in stats), sum(st.st_size for st in stats)]
+        try:
+            st = os.stat(self._layout_path(name, layout))
+            return [st.st_mtime_ns, st.st_size]
+        except OSError:
+            return None
+
+    def _compute_catalog_entry(self, name, notes=None):
+        signature = self._file_signature(name)
+        summaries = self._storage_summaries(name)
+        if summaries is not None:
+            # Segment dizini ve arşiv indeksi zaten özetleri tutar, notları okumaya gerek yok
+            source_counts = Counter()
+            for entry in summaries:
+                source_counts.update(entry["sources"])
+            if self.is_segmented(name):
+                byte_size = sum(e["bytes"] for e in summaries)
+            else:
+                byte_size = signature[1] if signature else 0
+            return {
+                "note_count": sum(e["count"] for e in summaries),
+                "image_count": sum(e["image_count"] for e in summaries),
+                "last_capture": max((e["last"] for e in summaries), default=None),
+                "byte_size": byte_size,
+                "top_sources": source_counts.most_common(self.CATALOG_TOP_SOURCES),
+                "signature": signature,
+            }
+        if notes is None:
+            notes = self.load_notes(name)
+        source_counts = Counter(n.get('source', 'Unknown') for n in notes)
+        return {
+            "note_count": len(notes),
+            "image_count": sum(1 for n in notes if n.get('type') == 'image'),
+            "last_capture": max((n.get('timestamp', '') for n in notes), default=None),
+            "byte_size": signature[1] if signature else 0,
+            "top_sources": source_counts.most_common(self.CATALOG_TOP_SOURCES),
+            "signature": signature,
+        }
+
+    def _update_catalog_entry(self, name, notes=None):
+        self._load_catalog()[name] = self._compute_catalog_entry(name, notes)
+        self._save_catalog()
+
+    def _remove_catalog_entry(self, name):
+        if self._load_catalog().pop(name, None) is not None:
+            self._save_catalog()
+
+    def _load_catalog(self):
+        if self._catalog is None:
+            try:
+                with open(self.catalog_path, 'r', encoding='utf-8') as f: self._catalog = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._catalog = {}
+        return self._catalog
+
+    def _save_catalog(self):
+        # Önce geçici dosyaya yaz, sonra yer değiştir; yarım yazılmış katalog kalmasın
+        tmp_path = self.catalog_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f: json.dump(self._catalog, f, ensure_ascii=False)
+            os.replace(tmp_path, self.catalog_path)
+        except OSError as e:
+            logging.error(f"Failed to save notebook catalog: {e}", exc_info=True)
+
+    # --- Arama indeksleri ---
+    # İndeksler bellekte tutulur ve bir defterde ilk sıralı aramada kurulur. Uygulama içindeki
+    # yakalama, düzenleme, birleştirme ve silmeler indeksi artımlı günceller; dosya imzası
+    # uyuşmazsa (defter dışarıda değişmiş) indeks baştan kurulur.
+
+    def get_search_index(self, notebook_name, index_class=SearchIndex, wait=True):
+        """
+        Returns the up-to-date index (SearchIndex or TrigramIndex) of a notebook, building it on
+        first use. With wait=False a missing or stale index is built on a background thread of a
+        small shared pool and None is returned until it is ready. Indexes of the
+        SEARCH_INDEX_CACHE_SIZE most recently used notebooks are kept.
+        """
+        signature = self._file_signature(notebook_name)
+        cached = self._cached_index(notebook_name, index_class)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        if wait:
+            return self._build_search_index(notebook_name, index_class)
+        key = (notebook_name, index_class)
+        with self._index_lock:
+            if key in self._index_builds:
+                return None
+            self._index_builds.add(key)
+        # Arka planda kurulan indeks defteri not önbelleğine almaz; açık defterlerin yerini kapmasın
+        self._index_executor.submit(self._build_search_index, notebook_name, index_class, False)
+        return None
+
+    def _cached_index(self, notebook_name, index_class):
+        """(signature, index) of a cached index, marked as recently used, or None."""
+        with self._index_lock:
+            indexes = self._search_indexes.get(notebook_name)
+            if indexes is None or index_class not in indexes:
+                return None
+            self._search_indexes.move_to_end(notebook_name)
+            return indexes[index_class]
+
+    def get_timeline(self, notebook_name, date_range=None):
+        """The TimelineIndex to answer date_range with (see get_range_index)."""
+        return self.get_range_index(notebook_name, TimelineIndex, date_range)
+
+    def get_range_index(self, notebook_name, index_class, date_range=None):
+        """
+        The index to answer a query limited to date_range with. For a segmented or archived
+        notebook that is not already in memory only the segments or blocks overlapping date_range
+        are read, and the index covers just their notes; otherwise it is the notebook's full index.
+        """
+        if not date_range or self.get_layout(notebook_name) == self.LAYOUT_SINGLE_FILE:
+            return self.get_search_index(notebook_name, index_class)
+        signature = self._file_signature(notebook_name)
+        cached = self._cached_index(notebook_name, index_class)
+        with self._cache_lock:
+            entry = self._notes_cache.get(notebook_name)
+            loaded = entry is not None and entry["signature"] is not None and entry["signature"] == signature
+        if loaded or (cached is not None and cached[0] == signature):
+            return self.get_search_index(notebook_name, index_class)
+        key = (notebook_name, signature, tuple(date_range))
+        last = self._range_indexes.get(index_class)
+        if last is not None and last[0] == key:
+            return last[1]
+        # Tarih aralığı dışındaki notlar sonuca giremez; çakışan kısımlar zaten okunmuş olduğundan bu okuma önbellekten gelir
+        index = index_class()
+        index.sync(self.load_notes(notebook_name, date_range=date_range))
+        self._range_indexes[index_class] = (key, index)
+        return index
+
+    def _build_search_index(self, notebook_name, index_class, cache_notes=True):
+        # İmza notlar okunmadan önce alınır; bu arada defter değişirse indeks bir sonraki erişimde yeniden kurulur
+        try:
+            signature = self._file_signature(notebook_name)
+            index = index_class()
+            index.sync(self.load_notes(notebook_name, cache=cache_notes))
+            with self._index_lock:
+                self._search_indexes.setdefault(notebook_name, {})[index_class] = (signature, index)
+                self._search_indexes.move_to_end(notebook_name)
+                while len(self._search_indexes) > self.SEARCH_INDEX_CACHE_SIZE:
+                    self._search_indexes.popitem(last=False)
+            return index
+        except Exception as e:
+            logging.error(f"Failed to build {index_class.__name__} of notebook '{notebook_name}': {e}", exc_info=True)
+            raise
+        finally:
+            with self._index_lock: self._index_builds.discard((notebook_name, index_class))
+
+    def _update_caches(self, notebook_name, notes=None, added=None, previous_signature=None):
+        """Brings the in-memory notebook, its asset references and search indexes up to date after the app wrote to it."""
+        new_signature = self._file_signature(notebook_name)
+        self._update_asset_refs(notebook_name, new_signature, notes, added, previous_signature)
+        if notes is not None:
+            self._cache_notes(notebook_name, new_signature, [Note.from_dict(n) for n in notes])
+        else:
+            with self._cache_lock:
+                entry = self._notes_cache.get(notebook_name)
+                if entry is not None and entry["signature"] is not None and entry["signature"] == previous_signature:
+                    entry["notes"].append(Note.from_dict(added))
+                    entry["signature"] = new_signature
+                elif entry is not None:
+                    entry["signature"] = None # Bir sonraki load_notes yeniden okusun
+        with self._index_lock:
+            indexes = self._search_indexes.get(notebook_name)
+        if not indexes:
+            return
+        for index_class, (signature, index) in list(indexes.items()):
+            if notes is not None:
+                index.sync(notes)
+            elif signature == previous_signature:
+                index.add(added)
+            else:
+                # Defter bu yazmadan önce dışarıda değişmiş; tek notu eklemek yetmez, bir sonraki aramada yeniden kurulsun
+                del indexes[index_class]
+                continue
+            indexes[index_class] = (new_signature, index)
+
+    def related_notes(self, notebook_name, note, k=10, all_notebooks=False):
+        """
+        The notes most similar to a note of notebook_name (see SearchIndex.related), best first, as
+        ([(similarity, notebook name, note)], pending). With all_notebooks other notebooks are
+        searched too, as many as fit in the index cache (SEARCH_INDEX_CACHE_SIZE), those with a
+        built index first; notebooks whose index is not built yet are started in the background
+        and counted in pending instead of waited for.
+        """
+        names = [notebook_name]
+        if all_notebooks:
+            # Tüm defterlerin indeksleri birlikte bellekte tutulmaz; önbelleğe sığmayanlar her aramada
+            # birbirini atıp yeniden kurulacağından aranmaz
+            with self._index_lock:
+                indexed = [name for name in reversed(self._search_indexes) if SearchIndex in self._search_indexes[name]]
+            others = [name for name in indexed if name != notebook_name]
+            others += [name for name in self.get_notebooks() if name != notebook_name and name not in indexed]
+            names += others[:self.SEARCH_INDEX_CACHE_SIZE - 1]
+        results, pending = [], 0
+        for name in names:
+            index = self.get_search_index(name, SearchIndex, wait=False)
+            if index is None:
+                pending += 1
+                continue
+            for score, timestamp in index.related(note, k, exclude=note.get('timestamp') if name == notebook_name else None):
+                results.append((score, name, index.notes[timestamp]))
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results[:k], pending
+
+    # --- Liste filtreleri ---
+
+    def filter_notes(self, notebook_name, text="", source=None, date_range=None, case_sensitive=False,
+                     whole_word=False, use_regex=False, fuzzy=False, ranked=False, ranked_limit=200,
+                     regex_time_budget=0.25, facets=None):
+        """
+        The notes of a notebook that pass the note list filters, newest first (most relevant first
+        when ranked), as (notes, notice). notice is a message for the user if the regular expression
+        is invalid or its search was cut short, or if the search index that ranked and fuzzy search
+        need is still being built in the background (plain text matches are returned meanwhile),
+        otherwise None. Fuzzy and ranked search do not apply in regex mode. facets is a (groups, exclude)
+        tag/source/month filter, see FacetIndex.select.
+        """
+        # Segmentli ve arşivlenmiş defterlerde yalnızca tarih/kaynak filtresiyle çakışan kısımlar okunur
+        notes = self.load_notes(notebook_name, date_range=date_range, source=source)
+        notice = None
+        use_regex = bool(text) and use_regex
+        ranked = bool(text) and ranked and not use_regex
+        fuzzy = bool(text) and fuzzy and not use_regex
+        fuzzy_terms = None
+        index = None
+        if ranked or fuzzy:
+            # Kelime indeksini kurmak büyük defterlerde saniyeler sürer; arka planda kurulurken düz metin araması yapılır
+            index = self.get_search_index(notebook_name, wait=False)
+            if index is None:
+                notice = "Building the search index; showing plain text matches until it is ready."
+        if use_regex:
+            # Aynı imza ve ipuçlarıyla okunan liste aynıdır; işçi süreç metinleri yeniden almaz
+            key = (notebook_name, self._file_signature(notebook_name), date_range, source, len(notes))
+            notes, notice = self._filter_notes_by_user_regex(notebook_name, notes, key, text, case_sensitive,
+                                                             whole_word, regex_time_budget)
+        elif fuzzy and index is not None:
+            # Bulanık arama kelime indeksinden yapılır; büyük/küçük harf ve tam kelime seçenekleri yok sayılır
+            matches, fuzzy_terms = index.fuzzy_match(text)
+            notes = [n for n in notes if n.get('timestamp', '') in matches]
+        elif text and not (ranked and index is not None):
+            # Bulanık arama beklenirken seçenekleri onun gibi yok sayılır
+            regex = build_search_regex(text, case_sensitive and not fuzzy, whole_word and not fuzzy)
+            notes = [n for n in notes if regex.search(n.get('text', '')) or regex.search(n.get('source', ''))]
+        if source:
+            # Tek kaynak seçimi de facet indeksinde diğer facet'lerle birlikte çözülür
+            groups, exclude = facets or ((), ())
+            facets = (list(groups) + [[("source", source)]], exclude)
+        # Tarih aralığı ikili aramayla bulunur, en yeniden eskiye sıra da zaman çizelgesi indeksinden gelir.
+        # Aynı (ya da boş) zaman damgalı notlar birlikte tutulur ve kayıt sırasıyla listelenir.
+        timeline = self.get_timeline(notebook_name, date_range)
+        notes_by_timestamp = {}
+        for note in notes:
+            notes_by_timestamp.setdefault(note.get('timestamp', ''), []).append(note)
+        allowed = None
+        if facets:
+            # Etiket/kaynak/ay birleşimleri bit eşlem indeksinde çözülür; sonuç sıralamayla aynı geçişte uygulanır
+            allowed = self.get_range_index(notebook_name, FacetIndex, date_range).select(*facets)
+        notes = []
+        for timestamp in timeline.newest_first(date_range):
+            group = notes_by_timestamp.pop(timestamp, None)
+            if group and (allowed is None or timestamp in allowed):
+                notes.extend(group)
+
+        if ranked and index is not None:
+            # Kaynak ve tarih filtresinden geçen notlar arasından yalnızca en alakalı ranked_limit not döner
+            notes_by_timestamp = {}
+            for note in notes:
+                notes_by_timestamp.setdefault(note.get('timestamp', ''), []).append(note)
+            ranking = index.rank(text, ranked_limit, candidates=notes_by_timestamp, terms=fuzzy_terms)
+            notes = [note for _, timestamp in ranking for note in notes_by_timestamp[timestamp]]
+        elif ranked:
+            notes = notes[:ranked_limit]
+        return notes, notice
+
+    def _filter_notes_by_user_regex(self, notebook_name, notes, key, pattern, case_sensitive, whole_word, time_budget):
+        try:
+            regex = compile_user_regex(pattern, case_sensitive, whole_word)
+        except re.error as e:
+            return [], f"Invalid regular expression: {e}"
+        # Yalnızca desenin zorunlu trigramlarını içeren notlar re ile denetlenir. Büyük defterlerde
+        # trigram indeksini kurmak saniyeler sürebilir; o sırada süre sınırlı tam tarama yapılır.
+        positions = None
+        index = self.get_search_index(notebook_name, TrigramIndex, wait=False)
+        if index is not None:
+            candidates = index.candidates(regex_required_literals(regex))
+            if candidates is not None:
+                positions = [i for i, n in enumerate(notes) if n.get('timestamp', '') in candidates]
+        try:
+            found, complete = self.regex_worker.search(regex, notes, key, positions, time_budget)
+            matches = [notes[i] for i in found]
+        except OSError as e:
+            # Süreç açılamıyorsa (kısıtlı ortamlar) eski yola dönülür: bu iş parçacığında, notlar arasında süre denetimiyle
+            logging.error(f"Regex worker unavailable, searching in process: {e}")
+            matches, complete = filter_notes_by_regex(notes if positions is None else [notes[i] for i in positions],
+                                                      regex, time_budget)
+        if not complete:
+            return matches, f"Regex search timed out after {time_budget:.2f} s; showing partial results. Try a more specific pattern."
+        return matches, None
+
+    # --- YENİ METOT ---
+    def save_image_from_clipboard(self, image):
+        """Saves a PIL image to the assets folder and returns its relative path."""
+        try:
+            # Benzersiz bir dosya adı oluştur
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"img_{timestamp}.png"
+            
+            # Tam kayıt yolu
+            full_path = os.path.join(self.image_assets_path, filename)
+            
+            # Resmi kaydet
+            image.save(full_path, "PNG")
+            
+            # JSON'da saklanacak göreli yolu döndür
+            relative_path = os.path.join("_assets", filename)
+            return relative_path
+        except Exception as e:
+            logging.error(f"Failed to save image from clipboard: {e}", exc_info=True)
+            return None
+
+class GlobalSearch:
+    """
+    Searches every notebook at once on a thread pool.
+    Matches are streamed through `results` as (generation, kind, payload) tuples, where kind is
+    "matches" (a list of result dicts) or "done" (the notebook name). Starting a new search
+    cancels the previous one; consumers drop items whose generation is stale.
+    """
+    MAX_WORKERS = min(8, os.cpu_count() or 2)
+    BATCH_SIZE = 50
+    SNIPPET_RADIUS = 40
+
+    def __init__(self, note_manager):
+        self.note_manager = note_manager
+        self.executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="global-search")
+        self.results = queue.Queue()
+        self.generation = 0
+        self._cancel_event = threading.Event()
+
+    def start(self, regex, notebooks):
+        """Cancels the running search and starts searching `notebooks`; returns the new generation."""
+        self.cancel()
+        self.generation += 1
+        self._cancel_event = threading.Event()
+        for notebook in notebooks:
+            self.executor.submit(self._search_notebook, self.generation, self._cancel_event, notebook, regex)
+        return self.generation
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _search_notebook(self, generation, cancel_event, notebook, regex):
+        batch = []
+        try:
+            if cancel_event.is_set(): return
+            for note in self.note_manager.load_notes(notebook):
+                if cancel_event.is_set(): return
+                text = note.get('text', '')
+                source = note.get('source', 'Unknown')
+                match = regex.search(text)
+                if match:
+                    snippet = self._make_snippet(text, match)
+                elif regex.search(source):
+                    snippet = text[:2 * self.SNIPPET_RADIUS]
+                else:
+                    continue
+                batch.append({"notebook": notebook, "timestamp": note.get('timestamp', ''), "source": source,
+                              "snippet": snippet.replace("\n", " ")})
+                if len(batch) >= self.BATCH_SIZE:
+                    self.results.put((generation, "matches", batch))
+                    batch = []
+        except Exception as e:
+            logging.error(f"Global search failed in notebook '{notebook}': {e}", exc_info=True)
+        finally:
+            if batch and not cancel_event.is_set():
+                self.results.put((generation, "matches", batch))
+            self.results.put((generation, "done", notebook))
+
+    @classmethod
+    def _make_snippet(cls, text, match):
+        start = max(0, match.start() - cls.SNIPPET_RADIUS)
+        end = min(len(text), match.end() + cls.SNIPPET_RADIUS)
+        return ("..." if start > 0 else "") + text[start:end] + ("..." if end < len(text) else "")
+
+class NotebookWatcher:
+    """
+    Watches the data folder for notebook and image changes made outside the app (sync tools,
+    scripts) and reports them from its own thread as callback(notebook_names, assets_changed).
+    Uses inotify on Linux and falls back to polling file signatures elsewhere. The app's own
+    writes are reported too; NoteManager.is_changed_externally tells them apart.
+    """
+    POLL_INTERVAL = 2.0
+    DEBOUNCE = 0.3 # Geçici dosyaya yazma + yer değiştirme gibi olay dizileri tek bildirimde toplanır
+
+    # linux/inotify.h
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    _ASSETS = object() # Resim klasörü izleyicisinin işareti
+
+    def __init__(self, note_manager, callback):
+        self.note_manager = note_manager
+        self.callback = callback
+        self.backend = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="notebook-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        if sys.platform.startswith('linux'):
+            try:
+                self.backend = "inotify"
+                self._run_inotify()
+                return
+            except (OSError, AttributeError) as e:
+                logging.error(f"inotify is unavailable, watching notebooks by polling instead: {e}")
+        self.backend = "polling"
+        self._run_polling()
+
+    def _notebook_for_entry(self, filename):
+        """Maps a file name in the data folder to its notebook name (None for catalog, caches, temp files)."""
+        if filename.endswith('.tmp'):
+            return None
+        for suffix in ('.json', NoteManager.ARCHIVE_SUFFIX, NoteManager.SEGMENT_DIR_SUFFIX):
+            if filename.endswith(suffix):
+                return filename[:-len(suffix)]
+        return None
+
+    def _run_inotify(self):
+        import ctypes
+        import select
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(self.IN_NONBLOCK)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        watches = {} # izleme tanımlayıcısı -> None (veri klasörü), _ASSETS ya da segment klasörünün defter adı
+
+        def add_watch(path, target):
+            wd = libc.inotify_add_watch(fd, os.fsencode(path), self.WATCH_MASK)
+            if wd >= 0:
+                watches[wd] = target
+            return wd
+
+        try:
+            nm = self.note_manager
+            if add_watch(nm.user_data_path, None) < 0:
+                raise OSError(ctypes.get_errno(), f"cannot watch {nm.user_data_path}")
+            add_watch(nm.image_assets_path, self._ASSETS)
+            for name in nm.get_notebooks():
+                if nm.is_segmented(name):
+                    add_watch(nm._segment_dir(name), name) # inotify alt klasörleri kendiliğinden izlemez
+            pending, assets_changed, deadline = set(), False, None
+            while not self._stop_event.is_set():
+                timeout = 0.5 if deadline is None else max(0.0, deadline - time.monotonic())
+                if select.select([fd], [], [], timeout)[0]:
+                    try:
+                        data = os.read(fd, 64 * 1024)
+                    except BlockingIOError:
+                        data = b""
+                    for wd, mask, filename in self._parse_inotify_events(data):
+                        target = watches.get(wd)
+                        if target is self._ASSETS:
+                            assets_changed = True
+                        elif target is not None:
+                            if not filename.endswith('.tmp'):
+                                pending.add(target)
+                        else:
+                            notebook = self._notebook_for_entry(filename)
+                            if notebook is None:
+                                continue
+                            pending.add(notebook)
+                            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                                add_watch(os.path.join(nm.user_data_path, filename), notebook)
+                    if (pending or assets_changed) and deadline is None:
+                        deadline = time.monotonic() + self.DEBOUNCE
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.callback(pending, assets_changed)
+                    pending, assets_changed, deadline = set(), False, None
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _parse_inotify_events(data):
+        """Yields (wd, mask, name) for each struct inotify_event in a read() buffer."""
+        offset = 0
+        while offset + 16 <= len(data):
+            wd, mask, _cookie, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+            yield wd, mask, os.fsdecode(name)
+            offset += 16 + length
+
+    def _snapshot(self):
+        nm = self.note_manager
+        notebooks = {name: nm._file_signature(name) for name in nm.get_notebooks()}
+        try:
+            assets = os.stat(nm.image_assets_path).st_mtime_ns
+        except OSError:
+            assets = None
+        return notebooks, assets
+
+    def _run_polling(self):
+        notebooks, assets = self._snapshot()
+        while not self._stop_event.wait(self.POLL_INTERVAL):
+            try:
+                new_notebooks, new_assets = self._snapshot()
+            except OSError as e:
+                logging.error(f"Polling the data folder failed: {e}")
+                continue
+            changed = {name for name in set(notebooks) | set(new_notebooks) if notebooks.get(name) != new_notebooks.get(name)}
+            if changed or new_assets != assets:
+                self.callback(changed, new_assets != assets)
+            notebooks, assets = new_notebooks, new_assets
+
+class CapturePipeline:
+    """
+    The steps of one hotkey capture, with the platform parts passed in: window_title() returns the
+    active window's title (None if there is none), grab_image() an image on the clipboard or None,
+    send_copy() presses the copy shortcut in the active window and clipboard is a clipboard backend.
+    The app wires in pygetwindow, Pillow and pynput; benchmarks/load_test.py wires in fakes.
+    """
+    COPY_WAIT = 0.1 # Kopyalama kısayolundan sonra panonun güncellenmesi için beklenen süre
+
+    def __init__(self, note_manager, clipboard, window_title, send_copy, grab_image=None, copy_wait=COPY_WAIT):
+        self.note_manager = note_manager
+        self.clipboard = clipboard
+        self.window_title = window_title
+        self.send_copy = send_copy
+        self.grab_image = grab_image
+        self.copy_wait = copy_wait
+
+    def capture(self, notebook, trace):
+        """
+        Captures the selection (or a clipboard image) into notebook, timing each stage on trace.
+        Returns (outcome, annotation): outcome is 'image', 'text', 'empty' (nothing selected) or
+        'error' (the image could not be saved); annotation is the saved note or None.
+        """
+        with trace.span("active_window"):
+            source = self.window_title()
+            if source is None:
+                source = "Unknown Source"
+        tags = self.note_manager.tags_for_source(source)
+
+        # 1. Panoda resim var mı diye kontrol et
+        image = None
+        if self.grab_image:
+            with trace.span("grab_clipboard_image"):
+                image = self.grab_image()
+        if image is not None:
+            with trace.span("save_image"):
+                relative_path = self.note_manager.save_image_from_clipboard(image)
+            if not relative_path:
+                return "error", None
+            annotation = {
+                "timestamp": datetime.now().isoformat(),
+                "source": source,
+                "type": "image",
+                "image_path": relative_path,
+                "text": "" # Resimler için metin alanı şimdilik boş
+            }
+            if tags: annotation["tags"] = tags
+            with trace.span("persist"):
+                self.note_manager.add_annotation(notebook, annotation)
+            return "image", annotation
+
+        # 2. Resim yoksa, metin yakalamaya devam et
+        with trace.span("clipboard_save_clear"):
+            original_clipboard = self.clipboard.paste()
+            self.clipboard.copy('')
+        with trace.span("simulate_copy"):
+            self.send_copy()
+        with trace.span("clipboard_wait"):
+            if self.copy_wait:
+                time.sleep(self.copy_wait)
+            selected_text = self.clipboard.paste()
+        with trace.span("clipboard_restore"):
+            self.clipboard.copy(original_clipboard)
+
+        if not selected_text or selected_text.isspace():
+            return "empty", None
+        annotation = {
+            "timestamp": datetime.now().isoformat(),
+            "source": source,
+            "type": "text",
+            "text": selected_text
+        }
+        if tags: annotation["tags"] = tags
+        with trace.span("persist"):
+            self.note_manager.add_annotation(notebook, annotation)
+        return "text", annotation
+
+class PyperclipClipboard:
+    """
+    The system clipboard through pyperclip, imported on first use. On Linux pyperclip runs
+    xclip, xsel or wl-copy as a new process for every call, so the app only falls back to it there.
+    """
+    name = "pyperclip"
+
+    def __init__(self):
+        self._pyperclip = None
+
+    def _module(self):
+        if self._pyperclip is None:
+            import pyperclip
+            self._pyperclip = pyperclip
+        return self._pyperclip
+
+    def paste(self):
+        return self._module().paste()
+
+    def copy(self, text):
+        self._module().copy(text)
+
+    def close(self):
+        pass
+
+class FakeClipboard:
+    """An in-memory clipboard with the same interface, for scripted captures and benchmarks."""
+    name = "fake"
+
+    def __init__(self, text=""):
+        self.text = text
+        self.copies = 0
+        self.pastes = 0
+
+    def paste(self):
+        self.pastes += 1
+        return self.text
+
+    def copy(self, text):
+        self.copies += 1
+        self.text = text
+
+    def close(self):
+        pass
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(1, math.ceil(p / 100 * len(sorted_values))) - 1]
+
+class LatencyRecorder:
+    """
+    Timing spans for one kind of multi-stage operation (such as a capture). The last WINDOW
+    samples of each stage are kept for rolling percentiles, and every finished operation is
+    appended to log_path as one JSON line, so slow stages show up in numbers across runs.
+    """
+    WINDOW = 500
+    LOG_MAX_BYTES = 5 * 1024 * 1024 # Aşılınca eski günlük .1 uzantısıyla bir kez saklanır
+
+    def __init__(self, operation, log_path=None):
+        self.operation = operation
+        self.log_path = log_path
+        self._samples = OrderedDict() # aşama -> deque(saniye); aşamalar ilk görüldükleri sırada
+        self._lock = threading.Lock()
+
+    def start(self, queued_at=None):
+        """Begins a trace. queued_at, a time.perf_counter() value, adds the time spent waiting in a queue."""
+        trace = LatencyTrace(self)
+        if queued_at is not None:
+            trace.add("queue_wait", trace.started - queued_at)
+        return trace
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.WINDOW)
+            samples.append(seconds)
+
+    def samples(self, stage):
+        with self._lock:
+            return list(self._samples.get(stage, ()))
+
+    def summary(self):
+        """[(stage, sample count, p50, p95, p99, max)] with times in seconds."""
+        with self._lock:
+            stages = [(stage, sorted(samples)) for stage, samples in self._samples.items()]
+        return [(stage, len(values), percentile(values, 50), percentile(values, 95), percentile(values, 99), values[-1])
+                for stage, values in stages if values]
+
+    def write_log(self, record):
+        if not self.log_path:
+            return
+        try:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.LOG_MAX_BYTES:
+                os.replace(self.log_path, self.log_path + ".1")
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.error(f"Could not write latency log {self.log_path}: {e}")
+
+class LatencyTrace:
+    """One traced operation, created by LatencyRecorder.start()."""
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.started = time.perf_counter()
+        self.spans = [] # (aşama, saniye), gerçekleştikleri sırada
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds):
+        self.spans.append((stage, seconds))
+        self.recorder.record(stage, seconds)
+
+    def finish(self, **fields):
+        """Records the total (queue wait included) and logs the trace; fields such as the outcome are logged with it."""
+        total = time.perf_counter() - self.started + sum(s for stage, s in self.spans if stage == "queue_wait")
+        self.recorder.record("total", total)
+        record = {"time": datetime.now().isoformat(timespec="milliseconds"), "operation": self.recorder.operation,
+                  "total_ms": round(total * 1000, 3),
+                  "spans_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.spans}}
+        record.update(fields)
+        self.recorder.write_log(record)
+
+class ActionProfiler:
+    """
+    Runs callbacks under cProfile and groups the statistics per action (the callback's name).
+    save() writes one .pstats file per action, readable with pstats, snakeviz or flameprof (flame
+    graphs), and a summary.txt ranking the actions by total time.
+    """
+    MIN_SECONDS = 0.005 # Daha kısa çağrılar (ör. kuyruk yoklaması) sonuçlara eklenmez
+    SUMMARY_FUNCTIONS = 15
+
+    def __init__(self):
+        self.actions = {} # eylem adı -> [çağrı sayısı, toplam sn, en uzun sn, pstats.Stats]
+        self._active = False
+
+    def call(self, action, func, *args):
+        if self._active:
+            # İç içe geri çağrılar (ör. update() sırasında) dıştaki eylemin profiline dahildir
+            return func(*args)
+        profile = cProfile.Profile()
+        self._active = True
+        start = time.perf_counter()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._active = False
+            if elapsed >= self.MIN_SECONDS:
+                self._add(action, profile, elapsed)
+
+    def _add(self, action, profile, elapsed):
+        entry = self.actions.get(action)
+        if entry is None:
+            self.actions[action] = [1, elapsed, elapsed, pstats.Stats(profile)]
+            return
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+        entry[3].add(profile)
+
+    def ranking(self):
+        """[(action, calls, total seconds, max seconds)], slowest total first."""
+        return sorted(((action, calls, total, worst) for action, (calls, total, worst, _) in self.actions.items()),
+                      key=lambda row: row[2], reverse=True)
+
+    def save(self, folder):
+        """Writes <action>.pstats per action and summary.txt into folder; returns the written paths."""
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        summary_path = os.path.join(folder, "summary.txt")
+        with open(summary_path, 'w', encoding='utf-8') as summary:
+            summary.write(f"{'Action':<60} {'Calls':>6} {'Total ms':>10} {'Max ms':>10}\n")
+            for action, calls, total, worst in self.ranking():
+                summary.write(f"{action:<60} {calls:>6} {total * 1000:>10.1f} {worst * 1000:>10.1f}\n")
+            for action, calls, total, worst in self.ranking():
+                stats = self.actions[action][3]
+                path = os.path.join(folder, re.sub(r'[^\w.-]+', '_', action) + ".pstats")
+                stats.dump_stats(path)
+                paths.append(path)
+                summary.write(f"\n=== {action} ({calls} call(s), {total * 1000:.1f} ms) ===\n")
+                stats.stream = summary
+                stats.sort_stats('cumulative').print_stats(self.SUMMARY_FUNCTIONS)
+        paths.append(summary_path)
+        return paths
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import note_harvester_core as nh # noqa: E402
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return nh.NoteManager(data_folder=str(tmp_path))
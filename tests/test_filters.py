@@ -0,0 +1,189 @@
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import note_harvester_core as nh
+
+
+def make_notes(months=36, per_day=1, start=datetime(2021, 1, 1, 9)):
+    notes = []
+    day = start
+    while day < start + timedelta(days=months * 30.5):
+        for i in range(per_day):
+            moment = day + timedelta(minutes=i)
+            notes.append({"timestamp": moment.isoformat(), "source": "Src", "text": f"note {moment:%Y-%m-%d %H:%M}"})
+        day += timedelta(days=1)
+    return notes
+
+
+def cold_manager(tmp_path, layout, notes):
+    manager = nh.NoteManager(data_folder=str(tmp_path))
+    manager.create_notebook("nb")
+    manager.save_notes("nb", notes)
+    manager.set_notebook_layout("nb", layout)
+    # Yeni yönetici: bellekte defter ya da indeks yok
+    return nh.NoteManager(data_folder=str(tmp_path))
+
+
+def test_date_filter_reads_only_overlapping_segments(tmp_path, monkeypatch):
+    notes = make_notes()
+    manager = cold_manager(tmp_path, nh.NoteManager.LAYOUT_SEGMENTED, notes)
+    loaded = []
+    load_segment = nh.NoteManager._load_segment
+
+    def counting(self, notebook_name, key, *args):
+        loaded.append(key)
+        return load_segment(self, notebook_name, key, *args)
+
+    monkeypatch.setattr(nh.NoteManager, "_load_segment", counting)
+    date_range = (date(2022, 3, 5), date(2022, 3, 14))
+    result, notice = manager.filter_notes("nb", date_range=date_range)
+    assert notice is None
+    assert len(result) == 10
+    assert result[0]["timestamp"] > result[-1]["timestamp"]
+    assert set(loaded) == {"2022-03"}
+    bins = manager.get_timeline("nb", date_range).histogram(*date_range)
+    assert [count for _, count in bins] == [1] * 10
+    result, _ = manager.filter_notes("nb", date_range=date_range, facets=([[("source", "Src")]], ()))
+    assert len(result) == 10
+    assert set(loaded) == {"2022-03"}
+
+
+def test_date_filter_decompresses_only_overlapping_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(nh.NotebookArchive, "BLOCK_SIZE", 32)
+    notes = make_notes(months=21)
+    manager = cold_manager(tmp_path, nh.NoteManager.LAYOUT_ARCHIVE, notes)
+    assert len(nh.NotebookArchive.read_index(manager._archive_path("nb"))["blocks"]) == 21
+    compress, decompress = nh.NotebookArchive.CODECS["zlib"]
+    decompressed = []
+
+    def counting(data):
+        decompressed.append(len(data))
+        return decompress(data)
+
+    monkeypatch.setitem(nh.NotebookArchive.CODECS, "zlib", (compress, counting))
+    result, _ = manager.filter_notes("nb", date_range=(date(2021, 6, 1), date(2021, 6, 10)))
+    assert len(result) == 10
+    assert 1 <= len(decompressed) <= 2, decompressed
+
+
+@pytest.mark.parametrize("layout", [nh.NoteManager.LAYOUT_SINGLE_FILE, nh.NoteManager.LAYOUT_SEGMENTED])
+def test_duplicate_and_missing_timestamps_are_all_listed(tmp_path, layout):
+    notes = [
+        {"timestamp": "2024-05-01T10:00:00", "source": "A", "text": "older"},
+        {"timestamp": "2024-05-02T10:00:00", "source": "A", "text": "first twin"},
+        {"timestamp": "2024-05-02T10:00:00", "source": "B", "text": "second twin"},
+        {"source": "A", "text": "no timestamp"},
+        {"source": "B", "text": "also no timestamp"},
+    ]
+    manager = cold_manager(tmp_path, layout, notes)
+    result, _ = manager.filter_notes("nb")
+    assert [n["text"] for n in result] == ["first twin", "second twin", "older", "no timestamp", "also no timestamp"]
+    result, _ = manager.filter_notes("nb", date_range=(date(2024, 5, 2), date(2024, 5, 2)))
+    assert [n["text"] for n in result] == ["first twin", "second twin"]
+    result, _ = manager.filter_notes("nb", text="twin", ranked=True)
+    assert sorted(n["text"] for n in result) == ["first twin", "second twin"]
+    assert manager.get_timeline("nb").count_between(date(2024, 5, 1), date(2024, 5, 2)) == 3
+
+
+def test_timeline_counts_duplicates_through_sync():
+    index = nh.TimelineIndex()
+    notes = [{"timestamp": "2024-05-02T10:00:00"}, {"timestamp": "2024-05-02T10:00:00"}, {"timestamp": "2024-05-01T10:00:00"}]
+    index.sync(notes)
+    assert index.newest_first() == ["2024-05-02T10:00:00", "2024-05-02T10:00:00", "2024-05-01T10:00:00"]
+    index.sync(notes[1:])
+    assert index.newest_first() == ["2024-05-02T10:00:00", "2024-05-01T10:00:00"]
+    index.add({"timestamp": "2024-05-02T10:00:00"})
+    index.sync(notes + [{"timestamp": "2024-05-03T10:00:00"}])
+    assert index.count_between(date(2024, 5, 1), date(2024, 5, 3)) == 4
+
+
+def test_related_notes_across_notebooks_keep_caches_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(nh.NoteManager, "SEARCH_INDEX_CACHE_SIZE", 3)
+    manager = nh.NoteManager(data_folder=str(tmp_path))
+    for i in range(6):
+        manager.create_notebook(f"nb{i}")
+        manager.save_notes(f"nb{i}", [{"timestamp": "2024-01-01T10:00:00", "source": "S", "text": f"apple banana cherry {i}"},
+                                      {"timestamp": "2024-01-02T10:00:00", "source": "S", "text": f"unrelated words {i}"}])
+    manager.drop_caches()
+    probe = manager.load_notes("nb0")[0]
+    for _ in range(20):
+        results, pending = manager.related_notes("nb0", probe, k=10, all_notebooks=True)
+        if not pending:
+            break
+        time.sleep(0.05)
+    assert pending == 0
+    assert len(manager._search_indexes) <= 3
+    assert len({name for _, name, _ in results}) == 3
+    assert all(note["text"].startswith("apple") for _, name, note in results if name != "nb0")
+    # Arka planda kurulan indeksler defterleri not önbelleğine almaz
+    assert [name for name, *_ in manager.memory_report()] == ["nb0"]
+    for _ in range(3):
+        manager.related_notes("nb0", probe, k=10, all_notebooks=True)
+    assert manager._index_builds == set()
+
+
+def test_ranked_search_does_not_wait_for_the_index(tmp_path, monkeypatch):
+    manager = cold_manager(tmp_path, nh.NoteManager.LAYOUT_SINGLE_FILE, [
+        {"timestamp": "2024-05-01T10:00:00", "source": "A", "text": "apple"},
+        {"timestamp": "2024-05-02T10:00:00", "source": "A", "text": "apple apple apple pie"},
+        {"timestamp": "2024-05-03T10:00:00", "source": "A", "text": "apple pie"},
+    ])
+    builds = []
+    monkeypatch.setattr(manager._index_executor, "submit", lambda *args: builds.append(args))
+    # İndeks kurulana dek düz metin eşleşmeleri en yeniden eskiye listelenir
+    result, notice = manager.filter_notes("nb", text="apple pie", ranked=True)
+    assert [n["text"] for n in result] == ["apple pie", "apple apple apple pie"]
+    assert notice and len(builds) == 1
+    manager.get_search_index("nb")
+    result, notice = manager.filter_notes("nb", text="apple pie", ranked=True)
+    assert notice is None
+    # Sıralama sorgunun kelimelerinden yalnızca birini içeren notları da skorlar
+    assert sorted(n["text"] for n in result) == ["apple", "apple apple apple pie", "apple pie"]
+
+
+def test_fuzzy_search_shows_exact_matches_until_the_index_is_ready(tmp_path, monkeypatch):
+    manager = cold_manager(tmp_path, nh.NoteManager.LAYOUT_SINGLE_FILE, [
+        {"timestamp": "2024-05-01T10:00:00", "source": "A", "text": "Harvest notes"},
+        {"timestamp": "2024-05-02T10:00:00", "source": "A", "text": "harvast notes"},
+    ])
+    monkeypatch.setattr(manager._index_executor, "submit", lambda *args: None)
+    result, notice = manager.filter_notes("nb", text="harvest", fuzzy=True, case_sensitive=True)
+    assert [n["text"] for n in result] == ["Harvest notes"]
+    assert notice
+    manager.get_search_index("nb")
+    result, notice = manager.filter_notes("nb", text="harvest", fuzzy=True, case_sensitive=True)
+    assert [n["text"] for n in result] == ["harvast notes", "Harvest notes"]
+    assert notice is None
+
+
+def test_timeline_keeps_timestamps_of_the_same_instant_apart():
+    index = nh.TimelineIndex()
+    utc, local = "2024-05-02T10:00:00+00:00", "2024-05-02T12:00:00+02:00"
+    for timestamp in (utc, local, utc):
+        index.add({"timestamp": timestamp})
+    assert index.newest_first() == [local, utc, utc]
+    index.remove(utc)
+    assert index.newest_first() == [local]
+    index.add({"timestamp": utc})
+    index.remove(local)
+    assert index.newest_first() == [utc]
+
+
+@pytest.mark.parametrize("layout", [nh.NoteManager.LAYOUT_SINGLE_FILE, nh.NoteManager.LAYOUT_SEGMENTED])
+def test_source_and_month_facets_combine_with_the_source_filter(tmp_path, layout):
+    manager = cold_manager(tmp_path, layout, [
+        {"timestamp": "2024-04-01T10:00:00", "source": "A", "text": "a april"},
+        {"timestamp": "2024-05-01T10:00:00", "source": "A", "text": "a may"},
+        {"timestamp": "2024-05-02T10:00:00", "source": "B", "text": "b may"},
+        {"timestamp": "2024-06-01T10:00:00", "source": "C", "text": "c june"},
+    ])
+    assert manager.get_facet_values("nb", "month") == [("2024-04", 1), ("2024-05", 2), ("2024-06", 1)]
+    facets = ([[("source", "A"), ("source", "B")]], [("month", "2024-04")])
+    result, _ = manager.filter_notes("nb", facets=facets)
+    assert [n["text"] for n in result] == ["b may", "a may"]
+    result, _ = manager.filter_notes("nb", source="A", facets=facets)
+    assert [n["text"] for n in result] == ["a may"]
+    result, _ = manager.filter_notes("nb", source="C", facets=facets)
+    assert result == []
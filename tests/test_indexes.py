@@ -0,0 +1,63 @@
+import random
+
+import note_harvester_core as nh
+
+
+def check(bitmap, expected):
+    assert len(bitmap) == len(expected)
+    assert list(bitmap) == sorted(expected)
+    assert bool(bitmap) == bool(expected)
+
+
+def test_bitmap_matches_set_through_dense_and_sparse_chunks():
+    rng = random.Random(7)
+    values = set(range(0, 70000, 3)) | set(rng.sample(range(200000), 3000))
+    bitmap = nh.Bitmap(values)
+    assert any(isinstance(chunk, bytearray) for chunk in bitmap.chunks.values())
+    check(bitmap, values)
+    for value in rng.sample(sorted(values), 15000) + [5, 1 << 20]:
+        bitmap.discard(value)
+        values.discard(value)
+    check(bitmap, values)
+    other = set(rng.sample(range(150000), 20000))
+    other_bitmap = nh.Bitmap(other)
+    check(bitmap & other_bitmap, values & other)
+    check(bitmap | other_bitmap, values | other)
+    check(bitmap - other_bitmap, values - other)
+    check(other_bitmap - bitmap, other - values)
+
+
+def test_dense_chunk_counts_follow_adds_and_discards():
+    bitmap = nh.Bitmap(range(5000))
+    assert isinstance(bitmap.chunks[0], bytearray) and bitmap.counts[0] == 5000
+    bitmap.add(10)
+    bitmap.discard(70000)
+    assert len(bitmap) == 5000
+    for value in range(0, 5000, 2):
+        bitmap.discard(value)
+    assert isinstance(bitmap.chunks[0], bytearray) and bitmap.counts[0] == 2500
+    for value in range(1, 1000, 2):
+        bitmap.discard(value)
+    # ARRAY_MIN'e inen bit dizisi yeniden sıralı diziye döner
+    assert isinstance(bitmap.chunks[0], nh.array) and 0 not in bitmap.counts
+    check(bitmap, set(range(1001, 5000, 2)))
+    for value in range(1001, 5000, 2):
+        bitmap.discard(value)
+    assert not bitmap and bitmap.chunks == {} and bitmap.counts == {}
+
+
+def test_facet_index_compacts_dead_ordinals_on_sync():
+    notes = [{"timestamp": f"2024-01-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}", "source": f"S{i % 3}",
+              "tags": [f"t{i % 5}"]} for i in range(3000)]
+    index = nh.FacetIndex()
+    index.sync(notes)
+    for rewrite in range(3):
+        notes = [dict(n, source=f"R{rewrite}") for n in notes] # Her notun facet'i değişir, yeni sıra numarası alır
+        index.sync(notes)
+        # Ölü sıra numaraları canlılardan fazla olunca numaralar sıkıştırılır
+        assert len(index.timestamps) <= 2 * len(notes)
+    assert index.select([[("source", "R2")]]) == {n["timestamp"] for n in notes}
+    assert index.select([[("tag", "t1")]], exclude=[("tag", "t2")]) == {n["timestamp"] for n in notes if n["tags"] == ["t1"]}
+    index.compact()
+    assert sorted(ordinal for ordinal, _, _ in index.docs.values()) == list(range(len(notes)))
+    assert index.values("source") == [("R2", len(notes))]
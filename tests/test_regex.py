@@ -0,0 +1,56 @@
+import re
+import time
+
+import pytest
+
+import note_harvester_core as nh
+
+
+@pytest.mark.parametrize("pattern", [r"(a|a)*b", r"(a|aa)+$", r"(a|aa)*", r"(ab|a|b)*", r"((a|a))*"])
+def test_ambiguous_repeated_alternations_are_rejected(pattern):
+    with pytest.raises(re.error):
+        nh.compile_user_regex(pattern)
+
+
+# Diğer yavaş desenler reddedilmez; onları işçi sürecin süre sınırı durdurur
+@pytest.mark.parametrize("pattern", [r"foo.*bar", r"\w+\s+\w+", r"\d+\.\d+\.\d+", r"(foo|bar)", r"(a|b)+",
+                                     r"(\d{3})+", r"https?://\S+", r"^\s*-\s+\w+", r"(foo|bar)+", r"(\d+,)*\d+",
+                                     r"(https?://\S+\s*)+", r"(x|xy)*z", r"(a+)+", r".*.*"])
+def test_ordinary_patterns_are_accepted(pattern):
+    nh.compile_user_regex(pattern)
+
+
+def test_case_sensitive_patterns_compare_exact_characters():
+    nh.compile_user_regex(r"(Ab|ab)*", case_sensitive=True)
+    with pytest.raises(re.error):
+        nh.compile_user_regex(r"(Ab|ab)*")
+
+
+@pytest.fixture
+def regex_manager(manager):
+    yield manager
+    manager.regex_worker.stop()
+
+
+def test_regex_filter_runs_in_worker(regex_manager):
+    regex_manager.create_notebook("nb")
+    regex_manager.save_notes("nb", [{"timestamp": f"2024-01-01T10:00:{i:02d}", "source": "S", "text": f"item {i}"} for i in range(40)])
+    notes, notice = regex_manager.filter_notes("nb", r"item [12]\d", use_regex=True, regex_time_budget=30)
+    assert notice is None
+    assert sorted(n["text"] for n in notes) == [f"item {i}" for i in range(10, 30)]
+    assert regex_manager.regex_worker._process is not None
+
+
+def test_slow_regex_is_stopped_and_reported(regex_manager):
+    regex_manager.create_notebook("nb")
+    regex_manager.save_notes("nb", [{"timestamp": "2024-01-01T10:00:00", "source": "S", "text": "x" * 30000}])
+    regex_manager.regex_worker.start()
+    regex_manager.filter_notes("nb", "warm", use_regex=True, regex_time_budget=30)
+    started = time.perf_counter()
+    # Denetimden geçen ama uzun notta ikinci dereceden geri izleyen bir desen
+    notes, notice = regex_manager.filter_notes("nb", r"\w+\s+\w+", use_regex=True, regex_time_budget=0.2)
+    assert time.perf_counter() - started < 5
+    assert notes == []
+    assert "timed out" in notice
+    notes, notice = regex_manager.filter_notes("nb", "x{5}", use_regex=True, regex_time_budget=30)
+    assert notice is None and len(notes) == 1
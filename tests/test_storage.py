@@ -0,0 +1,166 @@
+import json
+import os
+import time
+import zlib
+from datetime import date
+
+import pytest
+
+import note_harvester_core as nh
+
+
+def test_notes_without_timestamp_are_decoded_as_notes(manager, tmp_path):
+    records = [
+        {"timestamp": "2024-01-02T10:00:00", "source": "A", "text": "first"},
+        {"source": "B", "text": "no timestamp"},
+        {"text": "text only", "meta": {"k": "v"}},
+    ]
+    manager.create_notebook("nb")
+    with open(manager._notebook_path("nb"), 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+    notes = manager.load_notes("nb")
+    assert all(isinstance(n, nh.Note) for n in notes)
+    assert [n.preview(75) for n in notes] == ["first", "no timestamp", "text only"]
+    # İç içe nesneler sözlük olarak kalır
+    assert notes[2]["meta"] == {"k": "v"}
+    manager.memory_report()
+
+
+
+def segmented_year(manager):
+    manager.create_notebook("nb")
+    manager.save_notes("nb", [{"timestamp": f"2024-{month:02d}-01T10:00:00", "text": str(month)} for month in range(1, 13)])
+    manager.set_notebook_layout("nb", nh.NoteManager.LAYOUT_SEGMENTED)
+
+
+def count_segment_loads(monkeypatch):
+    loaded = []
+    load_segment = nh.NoteManager._load_segment
+
+    def counting(self, notebook_name, key, *args):
+        loaded.append(key)
+        return load_segment(self, notebook_name, key, *args)
+
+    monkeypatch.setattr(nh.NoteManager, "_load_segment", counting)
+    return loaded
+
+
+def test_hinted_load_keeps_full_notebook_cached(manager, monkeypatch):
+    segmented_year(manager)
+    assert len(manager.load_notes("nb")) == 12
+    loaded = count_segment_loads(monkeypatch)
+    # İpucu yalnızca bir ipucu: bellekteki tam liste döner, kısmi okuma onu önbellekten atmaz
+    assert len(manager.load_notes("nb", date_range=(date(2024, 3, 1), date(2024, 3, 31)))) == 12
+    assert len(manager.load_notes("nb")) == 12
+    assert loaded == []
+
+
+def test_partial_load_is_not_cached_as_the_notebook(manager, monkeypatch):
+    segmented_year(manager)
+    manager.drop_caches()
+    assert [n["text"] for n in manager.load_notes("nb", date_range=(date(2024, 3, 1), date(2024, 3, 31)))] == ["3"]
+    assert manager.memory_report() == []
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda file, *args, **kwargs: opened.append(file) or real_open(file, *args, **kwargs))
+    assert len(manager.load_notes("nb")) == 12
+    # Mart segmenti zaten okunmuştu; tam okuma yalnızca diğer ayları açar
+    directory = manager._load_segment_directory("nb")
+    assert manager._segment_path("nb", "2024-03", directory) not in opened
+    assert manager._segment_path("nb", "2024-04", directory) in opened
+
+
+def test_partial_loads_do_not_evict_cached_notebooks(manager):
+    segmented_year(manager)
+    names = [f"full{i}" for i in range(nh.NoteManager.NOTES_CACHE_SIZE)]
+    for name in names:
+        manager.create_notebook(name)
+        manager.save_notes(name, [{"timestamp": "2024-01-01T10:00:00", "text": name}])
+    manager.load_notes("nb", date_range=(date(2024, 3, 1), date(2024, 3, 31)))
+    assert sorted(name for name, *_ in manager.memory_report()) == names
+
+
+def test_interrupted_segmented_save_keeps_the_previous_notes(manager, monkeypatch):
+    segmented_year(manager)
+    before = [n.to_dict() for n in manager.load_notes("nb")]
+
+    def crash(notebook_name, directory):
+        raise OSError("power lost")
+
+    # Not bir aydan diğerine taşınır; yeni segmentler yazılmış ama dizin değişmemişken kesilir
+    monkeypatch.setattr(manager, "_save_segment_directory", crash)
+    moved = [dict(n, timestamp="2024-04-15T10:00:00") if n["text"] == "3" else n for n in before]
+    with pytest.raises(OSError):
+        manager.save_notes("nb", moved)
+    manager.drop_caches()
+    assert [n.to_dict() for n in manager.load_notes("nb")] == before
+    monkeypatch.undo()
+    manager.save_notes("nb", moved)
+    manager.drop_caches()
+    assert sorted(n["timestamp"] for n in manager.load_notes("nb")) == sorted(n["timestamp"] for n in moved)
+    directory = manager._load_segment_directory("nb")
+    assert "2024-03" not in directory
+    assert sorted(os.listdir(manager._segment_dir("nb"))) == sorted(
+        [entry["file"] for entry in directory.values()] + [nh.NoteManager.SEGMENT_DIRECTORY_FILENAME])
+
+
+def test_interrupted_archive_append_keeps_the_previous_footer(tmp_path, monkeypatch):
+    path = str(tmp_path / "nb.nharc")
+    notes = [{"timestamp": f"2024-01-{day:02d}T10:00:00", "text": str(day)} for day in range(1, 11)]
+    nh.NotebookArchive.write(path, notes)
+    nh.NotebookArchive.append(path, {"timestamp": "2024-01-11T10:00:00", "text": "11"})
+    assert [n["text"] for n in nh.NotebookArchive.read(path)] == [str(day) for day in range(1, 12)]
+    before = open(path, 'rb').read()
+    write_index = nh.NotebookArchive._write_index
+
+    def torn_index(f, index):
+        # Blok ve indeks yazılmış, altbilginin yalnızca bir kısmı diske ulaşmış
+        data = zlib.compress(json.dumps(index).encode('utf-8'))
+        f.write(data + nh.NotebookArchive.FOOTER.pack(f.tell(), len(data), nh.NotebookArchive.MAGIC)[:10])
+        f.flush()
+        raise OSError("power lost")
+
+    monkeypatch.setattr(nh.NotebookArchive, "_write_index", torn_index)
+    with pytest.raises(OSError):
+        nh.NotebookArchive.append(path, {"timestamp": "2024-01-12T10:00:00", "text": "12"})
+    assert open(path, 'rb').read().startswith(before)
+    assert [n["text"] for n in nh.NotebookArchive.read(path)] == [str(day) for day in range(1, 12)]
+    monkeypatch.setattr(nh.NotebookArchive, "_write_index", write_index)
+    nh.NotebookArchive.append(path, {"timestamp": "2024-01-12T10:00:00", "text": "12"})
+    assert [n["text"] for n in nh.NotebookArchive.read(path)] == [str(day) for day in range(1, 13)]
+
+
+def test_archive_append_only_adds_bytes_until_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(nh.NotebookArchive, "BLOCK_SIZE", 5)
+    path = str(tmp_path / "nb.nharc")
+    nh.NotebookArchive.write(path, [{"timestamp": f"2024-01-{day:02d}T10:00:00", "text": str(day)} for day in range(1, 11)])
+    before = open(path, 'rb').read()
+    nh.NotebookArchive.append(path, {"timestamp": "2024-01-11T10:00:00", "text": "11"})
+    nh.NotebookArchive.append(path, {"timestamp": "2024-01-12T10:00:00", "text": "12"})
+    assert open(path, 'rb').read().startswith(before)
+    assert [block["count"] for block in nh.NotebookArchive.read_index(path)["blocks"]] == [5, 5, 2]
+    assert nh.NotebookArchive.dead_bytes(path) > 0
+    # Ölü baytlar canlı blokları geçince bir sonraki ekleme dosyayı sıkıştırır
+    monkeypatch.setattr(nh.NotebookArchive, "COMPACT_MIN_DEAD", 0)
+    nh.NotebookArchive.append(path, {"timestamp": "2024-01-13T10:00:00", "text": "13"})
+    assert nh.NotebookArchive.dead_bytes(path) == 0
+    assert [n["text"] for n in nh.NotebookArchive.read(path)] == [str(day) for day in range(1, 14)]
+
+
+def test_unreadable_notebook_keeps_its_assets(manager):
+    manager.create_notebook("nb")
+    os.makedirs(manager.image_assets_path, exist_ok=True)
+    image = os.path.join(manager.image_assets_path, "shot.png")
+    with open(image, 'wb') as f:
+        f.write(b"png")
+    manager.save_notes("nb", [{"timestamp": "2024-01-01T10:00:00", "type": "image", "image_path": "_assets/shot.png"}])
+    old = time.time() - 2 * nh.NoteManager.ASSET_GC_GRACE
+    os.utime(image, (old, old))
+    assert manager.collect_unused_assets() == (0, 0)
+    # Bozuk defterin resmi silinmez, indeks de bozuk dosyanın imzasını kaydetmez
+    with open(manager._notebook_path("nb"), 'w', encoding='utf-8') as f:
+        f.write('[{"timestamp": "2024-01-01T10:00:00", "ty')
+    manager.drop_caches()
+    assert manager.collect_unused_assets() == (0, 0)
+    assert os.path.exists(image)
+    assert manager._load_asset_index()["nb"]["signature"] != manager._file_signature("nb")